@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 16 10:31:55 2020
+
+@author: selin
+
+Compare rows/sec of the COPY-based writer and cursor.executemany on a local 
+PostgreSQL. Usage: python benchmark/copy_writer.py [config-file] [rows]
+"""
+import psycopg2
+import sys
+import timeit
+from src.config import config
+from src.database import create_tables, drop_tables
+from src.Filler import TripletFiller
+
+def make_rows(n, offset=0):
+    """Rows in the layout of TripletFiller, every tenth one a duplicate."""
+    rows = []
+    for i in range(offset, offset + n):
+        j = i - i % 10 if i % 10 == 9 else i
+        rows.append((j, 'Douglas Adams', 19, 'in\\b.*geboren', 350, 'Cambridge',
+                     'Adams wurde in Cambridge geboren. ||| Er\tstudierte dort.',
+                     'NE, VVFIN ||| PPER', 'sb, ROOT ||| sb', 'cindex-' + str(j)))
+    return rows
+
+def measure(filler, config_file, n, batch_size=500):
+    connection = psycopg2.connect(**config(config_file))
+    cursor = connection.cursor()
+    cursor.execute("TRUNCATE triplets;")
+    filler.create_staging(cursor)
+    connection.commit()
+    start_time = timeit.default_timer()
+    for offset in range(0, n, batch_size):
+        filler.write_chunk(connection, cursor, [make_rows(batch_size, offset)])
+    seconds = timeit.default_timer() - start_time
+    cursor.execute("SELECT count(*), md5(string_agg(cindex || context, '' ORDER BY cindex)) FROM triplets;")
+    result = cursor.fetchone()
+    connection.close()
+    return n / seconds, result
+
+if __name__ == '__main__':
+    config_file = sys.argv[1] if len(sys.argv) > 1 else 'database.ini'
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    create_tables(config_file)
+    try:
+        slow, slow_result = measure(TripletFiller(bulk=False), config_file, n)
+        fast, fast_result = measure(TripletFiller(bulk=True), config_file, n)
+    finally:
+        drop_tables(config_file)
+    print("executemany: %10.0f rows/sec" % slow)
+    print("COPY:        %10.0f rows/sec (%.1fx)" % (fast, fast / slow))
+    print("identical tables: " + str(slow_result == fast_result))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 25 15:22:51 2020
+
+@author: selin
+
+Compare the formatting of time-values in ObjectFiller with dateparser and
+with src.dates on a skewed sample of wikidata dates, i.e. few dates recur
+often. Usage: python benchmark/dates.py
+"""
+import dateparser
+import datetime
+import random
+import timeit
+import src.dates as dates
+
+def make_times(n, distinct):
+    rng = random.Random(0)
+    start = datetime.date(1800, 1, 1)
+    days = [start + datetime.timedelta(days=rng.randrange(80000)) for _ in range(distinct)]
+    times = []
+    for _ in range(n):
+        day = days[min(int(rng.paretovariate(1.2)) - 1, distinct - 1)]
+        times.append('+%04d-%02d-%02dT00:00:00Z' % (day.year, day.month, day.day))
+    return times
+
+def with_dateparser(times):
+    """Formatting as done before."""
+    values = []
+    for time in times:
+        date = dateparser.parse(time)
+        values.append(', '.join([date.strftime(f) for f in dates.FORMATS]) if date else None)
+    return values
+
+def with_dates(times):
+    return [dates.format_time(time) for time in times]
+
+if __name__ == '__main__':
+    times = make_times(5000, 2000)
+    start_time = timeit.default_timer()
+    slow_result = with_dateparser(times)
+    slow = timeit.default_timer() - start_time
+    start_time = timeit.default_timer()
+    fast_result = with_dates(times)
+    fast = timeit.default_timer() - start_time
+    assert slow_result == fast_result
+    print("%14s %12s %10s %10s" % ('dateparser [s]', 'dates [s]', 'speed-up', 'hit-rate'))
+    print("%14.4f %12.4f %9.0fx %10.3f" % (slow, fast, slow / fast, dates.get_stats()['hit_rate']))
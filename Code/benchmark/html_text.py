@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 24 14:21:37 2020
+
+@author: selin
+
+Compare the pre-processing of TripletFiller as done before (BeautifulSoup and
+regular expressions) with the single-pass extractor of src.html_text. Uses the
+rendered pages saved in the given directory, synthetic pages otherwise.
+Usage: python benchmark/html_text.py [directory with *.html]
+"""
+import glob
+import os
+import re
+import sys
+import timeit
+import unidecode
+from bs4 import BeautifulSoup
+from src.html_text import normalize, paragraph_text
+
+PARAGRAPH = ('<p><b>Douglas Noel Adams</b> (* 11. Maerz 1952 in <a href="/wiki/Cambridge">'
+             'Cambridge</a>; &#8224; 11. Mai 2001 in <a href="/wiki/Santa_Barbara">Santa '
+             'Barbara</a>) war ein &#8222;britischer&#8220; Schriftsteller ( Aussprache '
+             '<span class="audio">?/i</span>)<sup class="reference"><a href="#c-%d">[%d]'
+             '</a></sup>. Er schrieb Romane |H&ouml;rspiele.</p>\n')
+OTHER = ('<table class="infobox"><tr><td>Geboren</td><td>1952</td></tr></table>\n'
+         '<style>.mw-parser-output .x{display:none}</style>\n<ul><li>Werk</li></ul>\n')
+
+def make_pages(n, size):
+    return [''.join((PARAGRAPH % (i, i)) + OTHER for i in range(size)) for _ in range(n)]
+
+def with_soup(text):
+    """Pre-processing as done before."""
+    html = BeautifulSoup(text, 'html.parser')
+    paragraphs = html.select("p")
+    content = "".join([para.text for para in paragraphs])
+    content = unidecode.unidecode(content)
+    content = content.replace(";", ",")
+    content = content.replace(" |", ",")
+    content = re.sub(r"(\s+|\n)", " ", content)
+    content = re.sub(r"[\'`\"']|(\[[^]]*\])|(,,)|(\( .*\?\/i\)\s)", "",content)
+    return content
+
+def with_extractor(text):
+    return normalize(unidecode.unidecode(paragraph_text(text)))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(sys.argv[1], '*.html'))):
+            with open(path, encoding='utf-8') as f:
+                pages.append(f.read())
+    else:
+        pages = make_pages(20, 400)
+    size = sum(len(p) for p in pages)
+    start_time = timeit.default_timer()
+    slow_result = [with_soup(p) for p in pages]
+    slow = timeit.default_timer() - start_time
+    start_time = timeit.default_timer()
+    fast_result = [with_extractor(p) for p in pages]
+    fast = timeit.default_timer() - start_time
+    assert slow_result == fast_result
+    print("%6d pages, %.1f MB" % (len(pages), size / 1e6))
+    print("%12s %12s %10s" % ('soup [s]', 'extractor [s]', 'speed-up'))
+    print("%12.4f %12.4f %9.1fx" % (slow, fast, slow / fast))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 23 11:08:26 2020
+
+@author: selin
+
+Compare the deduplication of matched windows in TripletFiller with lists of
+span-tuples and with the MatchIndex on long synthetic articles in which the
+object is mentioned in every sentence. Usage: python benchmark/match_index.py
+"""
+import spacy
+import timeit
+from src.matcher import MatchIndex
+
+ALIASES = ['Douglas Adams', 'Adams', 'DNA']
+RELATIONS = ['Geburtsort', 'in\\b.*geboren', '\\*']
+
+def make_sentences(n):
+    nlp = spacy.blank('de')
+    nlp.add_pipe('sentencizer')
+    text = ' '.join('Adams wurde %d in Cambridge geboren.' % i for i in range(n))
+    return list(nlp(text).sents)
+
+def with_lists(sentences):
+    """Deduplication as done before: membership-tests on lists of span-tuples."""
+    alias_matches = []
+    for i in range(1, len(sentences) - 1):
+        for oa in ALIASES:
+            span_tuple = (sentences[i-1], sentences[i], sentences[i+1], oa)
+            if span_tuple not in alias_matches:
+                alias_matches.append(span_tuple)
+    rel_matches = []
+    for rel in RELATIONS:
+        for am in alias_matches:
+            span_tuple = (am[0], am[1], am[2], am[3], rel)
+            if span_tuple not in rel_matches:
+                rel_matches.append(span_tuple)
+    return len(rel_matches)
+
+def with_index(sentences):
+    alias_matches = MatchIndex()
+    for i in range(1, len(sentences) - 1):
+        for oa in ALIASES:
+            alias_matches.add(i, oa)
+    rel_matches = MatchIndex()
+    for rel in RELATIONS:
+        for i, oa in alias_matches:
+            rel_matches.add(i, (oa, rel))
+    return len(rel_matches)
+
+if __name__ == '__main__':
+    print("%10s %12s %12s %10s" % ('sentences', 'lists [s]', 'index [s]', 'speed-up'))
+    for n in (100, 200, 400, 800):
+        sentences = make_sentences(n)
+        start_time = timeit.default_timer()
+        slow_result = with_lists(sentences)
+        slow = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        fast_result = with_index(sentences)
+        fast = timeit.default_timer() - start_time
+        assert slow_result == fast_result
+        print("%10d %12.4f %12.4f %9.0fx" % (n, slow, fast, slow / fast))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Apr  1 11:03:52 2020
+
+@author: selin
+
+Compare merging rows of aggregated relations with a nested loop as done before
+and with utils.merge_rows from 1k to 1M rows; the nested loop is quadratic and
+only measured up to 20k rows. Usage: python benchmark/merge_rows.py
+"""
+import copy
+import random
+import timeit
+import src.utils as utils
+
+SIZES = (1000, 10000, 20000, 100000, 1000000)
+MAX_NESTED = 20000
+
+def make_rows(n, seed):
+    """Two thirds of the IDs of the short list are also in the long list."""
+    rng = random.Random(seed)
+    return [(rng.randrange(n * 3 // 2), 'Douglas Adams', 'https://de.wikipedia.org',
+             ['Geburtsort||Cambridge||P19||350']) for _ in range(n)]
+
+def nested_loop(l1, l2):
+    long_list = l2 if len(l2) > len(l1) else l1
+    short_list = l1 if len(l2) > len(l1) else l2
+    for x in short_list:
+        is_contained = False
+        for y in long_list:
+            if x[0] == y[0]:
+                is_contained = True
+                for arr in x[3]:
+                    y[3].append(arr)
+                break
+        if not is_contained:
+            long_list.append(x)
+    return long_list
+
+def measure(func, l1, l2, **kwargs):
+    start_time = timeit.default_timer()
+    result = func(l1, l2, **kwargs)
+    return timeit.default_timer() - start_time, result
+
+if __name__ == '__main__':
+    print("%10s %12s %10s %10s %10s" % ('rows', 'nested [s]', 'dict [s]', 'copy [s]', 'speed-up'))
+    for n in SIZES:
+        l1, l2 = make_rows(n, 0), make_rows(n // 2, 1)
+        nested = '-'
+        if n <= MAX_NESTED:
+            seconds, expected = measure(nested_loop, copy.deepcopy(l1), copy.deepcopy(l2))
+            nested = '%.4f' % seconds
+        copied, result = measure(utils.merge_rows, l1, l2, copy=True)
+        if n <= MAX_NESTED:
+            assert result == expected
+        merged, result = measure(utils.merge_rows, l1, l2)
+        speed_up = '%9.1fx' % (seconds / merged) if n <= MAX_NESTED else '-'
+        print("%10d %12s %10.4f %10.4f %10s" % (n, nested, merged, copied, speed_up))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 26 14:02:44 2020
+
+@author: selin
+
+Compare the normalization of aliases, values and relations as done before
+(unidecode and chains of re.sub) with src.normalization on labels which recur
+like in wikidata. Usage: python benchmark/normalization.py
+"""
+import random
+import re
+import timeit
+import unidecode
+import src.normalization as normalization
+
+LABELS = ['Douglas Adams', 'J. R. R. Tolkien', 'Zürich', 'Karl May (Schriftsteller)',
+          'C++', 'Ångström', 'Gödel, Escher, Bach', 'Ort\\b.*geboren', 'Lage [1]/Position',
+          'Maße ...', 'Düsseldorf', 'Fußball-Weltmeisterschaft 1954']
+
+def make_labels(n):
+    rng = random.Random(0)
+    return [rng.choice(LABELS) + ' ' + str(rng.randrange(n // 10)) for _ in range(n)]
+
+def escape(value):
+    value = re.sub(r"\(", "\\(", value)
+    value = re.sub(r"\)", "\\)", value)
+    value = re.sub(r"\.", "\\.", value)
+    value = re.sub(r"\+", "\\+", value)
+    value = re.sub(r"\*", "\\*", value)
+    return value
+
+def relation_pattern(label):
+    label = label.replace('/', ', ')
+    label = unidecode.unidecode(label)
+    label = re.sub(r"\(.+?\)", "", label)
+    label = re.sub(r" \.\.\.", "", label)
+    label = re.sub(r"\s?\[.+?\]\s?,?", "", label)
+    label = re.sub(r"\+", "\\+", label)
+    label = re.sub(r"\*", "\\*", label)
+    label = re.sub(r"\.", "\\.", label)
+    label = re.sub(r"\\\.\\\*", ".*", label)
+    return label
+
+def with_chains(labels):
+    """Normalization as done before."""
+    values = [escape(unidecode.unidecode(label)) for label in labels]
+    relations = [relation_pattern(label) for label in labels]
+    return values, relations
+
+def with_normalization(labels):
+    values = [normalization.escape(normalization.transliterate(label)) for label in labels]
+    relations = [normalization.relation_pattern(label) for label in labels]
+    return values, relations
+
+if __name__ == '__main__':
+    print("%10s %12s %16s %10s" % ('labels', 'chains [s]', 'translator [s]', 'speed-up'))
+    for n in (10000, 100000):
+        labels = make_labels(n)
+        start_time = timeit.default_timer()
+        slow_result = with_chains(labels)
+        slow = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        fast_result = with_normalization(labels)
+        fast = timeit.default_timer() - start_time
+        assert slow_result == fast_result
+        print("%10d %12.4f %16.4f %9.1fx" % (n, slow, fast, slow / fast))
@@ -7,57 +7,364 @@ Created on Wed Feb 26 15:02:26 2020
 """
 
 import abc
-import dateparser
+import asyncio
+import io
 import logging
+import os
 import psycopg2
-import re
-import requests
-import spacy
+import src.checkpoints as checkpoints
+import src.dates as dates
+import src.dump as dump
+import src.html_text as html_text
+import src.matcher as matcher
+import src.metrics as metrics
+import src.nlp_models as nlp_models
+import src.normalization as normalization
+import src.queries as queries
+import src.streaming as streaming
 import src.utils as utils
 import timeit
-import unidecode
-from bs4 import BeautifulSoup
 from itertools import chain
-from multiprocessing import Pool
 from src.config import config
+from src.fetcher import ArticleFetcher, EntityFetcher
+from src.utils import create_pool
+
+# escape-sequences of the text-format of COPY
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def copy_text(rows):
+    """Serialize rows for COPY ... FROM STDIN in text-format.
+    
+    :param rows: array_like, list of tuples
+    :return: StringIO, tab-separated lines, NULL written as \\N"""
+    
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join('\\N' if v is None else str(v).translate(COPY_ESCAPES) 
+                               for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
 
 class Filler(metaclass=abc.ABCMeta):
     
-    def fill(self, config_file='database.ini'):
+    # target-table and column-layout of the rows returned by get_data
+    table = None
+    columns = ()
+    # whether get_rows yields the rows ordered by the unique key of get_key
+    resumable = False
+    
+    def __init__(self, processes=None, chunksize=1, batch_size=500, cache=None,
+                 bulk=True, itersize=2000, resume=False, queue=None, streaming=False, 
+                 buffer_size=2):
+        """:param processes: int, optional, number of worker-processes
+        :param chunksize: int, optional, number of rows sent to a worker at once
+        :param batch_size: int, optional, number of rows written per commit
+        :param cache: DiskCache, optional, local cache of entities and articles
+        :param bulk: bool, optional, write with COPY instead of executemany
+        :param itersize: int, optional, number of rows fetched at once from the 
+                         server-side cursor of get_rows
+        :param resume: bool, optional, continue after the last committed chunk 
+                       of an interrupted fill; only if the filler is resumable
+        :param queue: WorkQueue, optional, claim the rows from a queue shared 
+                      by several workers instead of reading all rows; get_rows 
+                      must accept the claimed keys
+        :param streaming: bool, optional, read, fetch, parse and write the 
+                          chunks in concurrent stages, see streaming.run
+        :param buffer_size: int, optional, number of chunks queued between 
+                            the stages when streaming"""
+        
+        self.processes = processes
+        self.chunksize = chunksize
+        self.batch_size = batch_size
+        self.cache = cache
+        self.bulk = bulk
+        self.itersize = itersize
+        self.resume = resume
+        self.queue = queue
+        self.streaming = streaming
+        self.buffer_size = buffer_size
+    
+    def fill(self, config_file='database.ini', pool=None):
         """Entry point of class and template method. Fill triplets either for 
             given seeds or for any non-filled items in dataset.
     
         :param config_file: str, optional filename of database-configuration to use
+        :param pool: Pool, optional, shared worker-pool; a pool is created for 
+                     this call if None
+        :return: bool, True if all rows were processed
         """
+        own_pool = pool is None
+        connection = None
+        reader = None
+        stage = type(self).__name__
+        # the registry accumulates over all fills of this process
+        before = self.get_totals(stage)
         try:
             start_time = timeit.default_timer()
             seconds = 0
             rows_count = 0
+            items_count = 0
             params = config(config_file)
             connection = psycopg2.connect(**params)
             cursor = connection.cursor()
-            rows = self.get_rows(cursor)
-            row_chunks = utils.get_chunks(rows)
-            for chunks in row_chunks:
-                rows_count += 1
-                with Pool() as pool:
-                    res = list(pool.imap(self.get_data, chunks))
-                    insert_list = list(chain(*res))
-                    if insert_list:
-                        insert_sql = self.insert_list()
-                        cursor.executemany(insert_sql, insert_list)
-                        connection.commit()
-            connection.close()
+            # rows are streamed from a server-side cursor of a second connection, 
+            # thus the commits of the written chunks do not close it
+            reader = psycopg2.connect(**params)
+            read_cursor = reader.cursor(name='get_rows')
+            read_cursor.itersize = self.itersize
+            if self.queue is not None:
+                self.queue.start_renewal()
+                rows = self.queue.rows(self, reader)
+            else:
+                rows = self.get_rows(read_cursor)
+            self.create_staging(cursor)
+            connection.commit()
+            # the progress of a queue is kept by its items
+            resumable = self.resumable and self.queue is None
+            last_key = None
+            if resumable:
+                last_key = checkpoints.start(cursor, stage, self.resume)
+                connection.commit()
+            if last_key is not None:
+                logging.info("Resuming " + stage + " after key " + str(last_key))
+                rows = (row for row in rows if self.get_key(row) > last_key)
+            if own_pool:
+                pool = create_pool(self.processes, self.init_worker)
+            if self.streaming:
+                rows_count, items_count = streaming.run(self, pool, rows, connection, 
+                                                        cursor, self.buffer_size)
+            else:
+                # the next batch is already processed while the previous is written
+                pending = None
+                for chunk in utils.get_chunks(rows, self.batch_size):
+                    rows_count += 1
+                    items_count += len(chunk)
+                    metrics.inc('pipeline_rows_in_total', len(chunk), stage=stage)
+                    running = (chunk, self.process_chunk(pool, chunk), 
+                               timeit.default_timer(), rows_count)
+                    if pending is not None:
+                        self.write_pending(connection, cursor, pending)
+                    pending = running
+                if pending is not None:
+                    self.write_pending(connection, cursor, pending)
+            self.finish(cursor)
+            connection.commit()
+            if resumable:
+                checkpoints.finish(cursor, stage)
+                connection.commit()
+            read_cursor.close()
             cursor.close()
+            return True
         except (Exception, psycopg2.DatabaseError) as error:
             print("Filler: " + str(error))
             logging.critical("Filler: " + str(error))
+            metrics.inc('pipeline_errors_total', stage=stage, type=type(error).__name__)
+            return False
         finally:
+            if self.queue is not None:
+                self.queue.stop_renewal()
+            if own_pool and pool is not None:
+                pool.close()
+                pool.join()
+            if reader is not None:
+                reader.close()
+            # an uncommitted chunk is rolled back
+            if connection is not None:
+                connection.close()
             second_time = timeit.default_timer() - start_time
             seconds += second_time
-            log = "Processed " + str(rows_count) + " chunks à max 50 of items in " + str(second_time/60) + "" + " minutes"
+            self.record_stage(stage, second_time, before)
+            log = ("Processed " + str(items_count) + " items in " + str(rows_count) + 
+                   " chunks of max " + str(self.batch_size) + " in " + 
+                   str(second_time/60) + " minutes")
             logging.info(log)
 
+    def process_chunk(self, pool, chunk):
+        """Submit a chunk of rows to the worker-pool.
+        
+        :param pool: Pool, the worker-pool
+        :param chunk: array_like, list of rows
+        :return: iterator, yields the result-list of every row"""
+        
+        task = metrics.Task(self.get_data, type(self).__name__)
+        return metrics.merged(pool.imap_unordered(task, chunk, self.chunksize))
+    
+    async def fetch_chunk(self, chunk):
+        """Coroutine retrieving what the rows of a chunk need from the network, 
+        the fetch-stage when streaming; by default the rows are retrieved in 
+        the worker-pool.
+        
+        :param chunk: array_like, list of rows
+        :return: array_like, the items passed to parse_items"""
+        
+        return chunk
+    
+    def parse_items(self, pool, items):
+        """Process the items of a chunk in the worker-pool, the CPU-stage when 
+        streaming.
+        
+        :param pool: Pool, the worker-pool
+        :param items: array_like, the items as returned by fetch_chunk
+        :return: iterator, yields the result-list of every row"""
+        
+        return self.process_chunk(pool, items)
+
+    def write_pending(self, connection, cursor, pending):
+        """Write a processed chunk and record its metrics; the phases are 
+        those measured since the previous chunk, as chunks overlap.
+        
+        :param connection: a connection object
+        :param cursor: a cursor object
+        :param pending: tuple, the chunk, its results, start-time and number"""
+        
+        chunk, results, start_time, number = pending
+        stage = type(self).__name__
+        registry = metrics.get_registry()
+        phases = registry.sums('pipeline_phase_seconds', 'phase', stage=stage)
+        done = [self.get_key(row) for row in chunk] if self.queue is not None else None
+        with metrics.timer(stage, 'write'):
+            written = self.write_chunk(connection, cursor, results, 
+                                       self.get_checkpoint(chunk), done)
+        seconds = timeit.default_timer() - start_time
+        metrics.inc('pipeline_rows_out_total', written, stage=stage)
+        metrics.observe('pipeline_chunk_seconds', seconds, stage=stage)
+        totals = registry.sums('pipeline_phase_seconds', 'phase', stage=stage)
+        metrics.record('chunk', stage=stage, chunk=number, rows_in=len(chunk), 
+                       rows_out=written, seconds=seconds,
+                       phases={p: t - phases.get(p, 0) for p, t in totals.items()})
+
+    def get_totals(self, stage):
+        """Return the totals of a stage recorded so far in this process.
+        
+        :param stage: str, name of the stage
+        :return: dict, busy-seconds of the workers, rows in and out and the 
+                 seconds per phase"""
+        
+        registry = metrics.get_registry()
+        return {'busy': registry.total('pipeline_worker_busy_seconds_total', stage=stage),
+                'rows_in': registry.total('pipeline_rows_in_total', stage=stage),
+                'rows_out': registry.total('pipeline_rows_out_total', stage=stage),
+                'phases': registry.sums('pipeline_phase_seconds', 'phase', stage=stage)}
+
+    def record_stage(self, stage, seconds, before):
+        """Record duration and worker-utilization of a completed fill.
+        
+        :param stage: str, name of the stage
+        :param seconds: float, duration of the fill
+        :param before: dict, the totals at the start of the fill, see get_totals"""
+        
+        totals = self.get_totals(stage)
+        processes = self.processes or os.cpu_count()
+        busy = totals['busy'] - before['busy']
+        utilization = busy / (seconds * processes) if seconds else 0.0
+        metrics.observe('pipeline_stage_seconds', seconds, stage=stage)
+        metrics.gauge('pipeline_worker_utilization', utilization, stage=stage)
+        metrics.record('stage', stage=stage, seconds=seconds, utilization=utilization,
+                       rows_in=totals['rows_in'] - before['rows_in'],
+                       rows_out=totals['rows_out'] - before['rows_out'],
+                       phases={p: t - before['phases'].get(p, 0) 
+                               for p, t in totals['phases'].items()})
+
+    def write_chunk(self, connection, cursor, results, checkpoint=None, done=None):
+        """Insert the results of a chunk into the database and commit.
+        
+        :param connection: a connection object
+        :param cursor: a cursor object
+        :param results: iterable, result-lists of the processed rows
+        :param checkpoint: tuple, optional, stage, first and last key and number 
+                           of rows of the chunk, committed with its results
+        :param done: array_like, optional, keys of the rows of the chunk, 
+                     completed in the queue with its results
+        :return: int, number of written rows"""
+        
+        insert_list = list(chain(*results))
+        if insert_list:
+            if self.bulk and self.table:
+                self.copy_rows(cursor, insert_list)
+            else:
+                insert_sql = self.insert_list()
+                cursor.executemany(insert_sql, insert_list)
+        if checkpoint is not None:
+            checkpoints.save(cursor, *checkpoint)
+        if done is not None:
+            self.queue.complete(cursor, done, len(insert_list))
+        if insert_list or checkpoint is not None or done is not None:
+            connection.commit()
+        return len(insert_list)
+
+    def get_key(self, row):
+        """Hook for resumable fillers, whose fill continues after the key of 
+        the last committed row.
+        
+        :param row: array_like, a row as returned by get_rows
+        :return: int, the key of the row"""
+        
+        return None
+
+    def get_keys(self, cursor):
+        """Return the keys of all rows, e.g. to fill a queue; fillers may 
+        select them without the rest of the rows.
+        
+        :param cursor: a cursor object
+        :yield: int, the key of every row"""
+        
+        for row in self.get_rows(cursor):
+            yield self.get_key(row)
+
+    def get_checkpoint(self, chunk):
+        """:param chunk: array_like, list of rows
+        :return: tuple, stage, first and last key and number of rows of the 
+                 chunk; None if the filler is not resumable"""
+        
+        if not self.resumable or self.queue is not None:
+            return None
+        return (type(self).__name__, self.get_key(chunk[0]), self.get_key(chunk[-1]), 
+                len(chunk))
+
+    def create_staging(self, cursor):
+        """Create the temporary staging-table of copy_rows once per connection; 
+        every commit empties it. The caller commits before the first chunk, 
+        so a rolled back chunk keeps the table.
+        
+        :param cursor: a cursor object"""
+        
+        if not self.bulk or not self.table:
+            return
+        staging = 'staging_' + self.table
+        cursor.execute("""CREATE TEMP TABLE IF NOT EXISTS %s ON COMMIT DELETE ROWS 
+            AS SELECT %s FROM %s WITH NO DATA;""" % (staging, ', '.join(self.columns), 
+                                                     self.table))
+        cursor.execute("""ALTER TABLE %s ADD COLUMN IF NOT EXISTS 
+            staging_order BIGSERIAL;""" % staging)
+
+    def copy_rows(self, cursor, rows):
+        """Stream rows into the staging-table of create_staging with COPY and 
+        merge them into the target-table with a single INSERT. As with 
+        executemany, the first of several conflicting rows wins.
+        
+        :param cursor: a cursor object
+        :param rows: array_like, list of tuples in the order of self.columns"""
+        
+        staging = 'staging_' + self.table
+        columns = ', '.join(self.columns)
+        cursor.copy_expert("COPY %s (%s) FROM STDIN;" % (staging, columns), 
+                           copy_text(rows))
+        cursor.execute("""INSERT INTO %s (%s) SELECT %s FROM %s 
+            ORDER BY staging_order ON CONFLICT DO NOTHING;""" 
+            % (self.table, columns, columns, staging))
+
+    def init_worker(self):
+        """Hook executed once in every worker-process of the pool."""
+        pass
+
+    def finish(self, cursor):
+        """Hook executed once after the last chunk is written; its statements 
+        are committed by the caller.
+        
+        :param cursor: a cursor object"""
+        pass
+
     @abc.abstractmethod
     def get_rows(self, cursor):
         pass
@@ -70,29 +377,103 @@ class Filler(metaclass=abc.ABCMeta):
     def insert_list(self):
         pass
 
-class ObjectFiller(Filler):
+class EntityFiller(Filler):
+    
+    def __init__(self, fetcher=None, **kwargs):
+        """:param fetcher: EntityFetcher, optional, client retrieving the 
+                        entities of a chunk concurrently
+        :param kwargs: optional, pool-settings passed to Filler"""
+        
+        super().__init__(**kwargs)
+        self.fetcher = fetcher if fetcher else EntityFetcher(cache=self.cache)
+    
+    def process_chunk(self, pool, chunk):
+        """Retrieve the entities of all rows in a chunk concurrently and parse 
+        them in the worker-pool.
+        
+        :param pool: Pool, the worker-pool
+        :param chunk: array_like, list of rows
+        :return: iterator, yields the result-list of every row"""
+        
+        with metrics.timer(type(self).__name__, 'fetch'):
+            items = asyncio.run(self.fetch_chunk(chunk))
+        return self.parse_items(pool, items)
+    
+    async def fetch_chunk(self, chunk):
+        """:param chunk: array_like, list of rows
+        :return: array_like, list of tuples of a row and its entity"""
+        
+        ids = [self.get_entity_id(row) for row in chunk]
+        entities = await self.fetcher.fetch_all([i for i in ids if i])
+        return [(row, entities.get(i)) for row, i in zip(chunk, ids)]
+    
+    def parse_items(self, pool, items):
+        """:param pool: Pool, the worker-pool
+        :param items: array_like, list of tuples of a row and its entity
+        :return: iterator, yields the result-list of every row"""
+        
+        task = metrics.Task(self.parse_item, type(self).__name__)
+        return metrics.merged(pool.imap_unordered(task, items, self.chunksize))
+    
+    def parse_item(self, item):
+        """:param item: tuple, a row and its entity
+        :return: array_like, list of rows to insert"""
+        
+        with metrics.timer(type(self).__name__, 'parse'):
+            return self.get_entity_data(*item)
+    
+    def parse_line(self, item):
+        """:param item: tuple, a row and the line of its entity in a dump
+        :return: array_like, list of rows to insert"""
+        
+        row, line = item
+        return self.get_entity_data(row, dump.parse_line(line))
+    
+    def get_data(self, row):
+        """Retrieve the entity of a single row and parse it.
+        
+        :param row: array_like, a row as returned by get_rows
+        :return: array_like, list of rows to insert"""
+        
+        stage = type(self).__name__
+        item_id = self.get_entity_id(row)
+        with metrics.timer(stage, 'fetch'):
+            data = utils.get_data(item_id, self.cache) if item_id else None
+        with metrics.timer(stage, 'parse'):
+            return self.get_entity_data(row, data)
+    
+    @abc.abstractmethod
+    def get_entity_id(self, row):
+        pass
+    
+    @abc.abstractmethod
+    def get_entity_data(self, row, data):
+        pass
+
+class ObjectFiller(EntityFiller):
     
-    def __init__(self, seeds=None):
-        """:param seeds: array_like, optional, list of starting-seeds"""
+    table = 'q_item'
+    columns = ('q_id', 'label', 'aliases', 'url', 'relation_id', 'relation_label', 
+               'value_id', 'value', 'value_text', 'value_type', 'has_context')
+    
+    def __init__(self, seeds=None, **kwargs):
+        """:param seeds: array_like, optional, list of starting-seeds
+        :param kwargs: optional, settings passed to EntityFiller"""
         
+        super().__init__(**kwargs)
         self.seeds = seeds
-        self.formats = ['%d. %B %y', '%d. %b %Y', '%d. %b %y', '%d. %B %Y', 
-                        '%d.%m.%y', '%d.%m.%Y', '%d-%m-%y', '%d-%m-%Y', 
-                        '%d-%b-%Y']
+        self.formats = dates.FORMATS
     
     def get_rows(self, cursor):
         """ Return Q-IDs to fill; seeds if provided, relation-values otherwise.
         :param cursor: a cursor object
-        :return rows: array_like, list of retrieved rows"""
+        :yield: array_like, the retrieved rows"""
         
         if self.seeds:
-            return self.seeds
-        sql = """SELECT DISTINCT q1.value_id FROM q_item q1 WHERE 
-            q1.value_id <> 0 AND NOT EXISTS (SELECT 1 FROM q_item q2 
-            WHERE q2.q_id = q1.value_id);""" 
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        return rows
+            yield from self.seeds
+            return
+        cursor.execute(queries.OBJECT_ROWS)
+        yield from cursor
     
     def get_q_item_data(self, data, item_id):
         """Parses data-dictionary and extracts triplets. Triplets are stored in 
@@ -113,7 +494,7 @@ class ObjectFiller(Filler):
             if label.startswith('Kategorie') or label.startswith('Category'):
                 logging.info("Item Q" + str(item_id) + " is a Category-label " + label)
                 return []
-            label = unidecode.unidecode(label)
+            label = normalization.transliterate(label)
             if 'dewiki' in data['sitelinks'] and 'url' in data['sitelinks']['dewiki']:
                 url = data['sitelinks']['dewiki']['url']
                 has_context = 0
@@ -121,24 +502,20 @@ class ObjectFiller(Filler):
                 url = 'INVALID URL'
                 has_context = 2
             if 'de' in data['aliases']:
-                aliases = sorted(list(set([unidecode.unidecode(item['value']) 
+                aliases = sorted(list(set([normalization.transliterate(item['value']) 
                                            for item in data['aliases']['de']])), key=len, reverse=True)
                 aliases = [a for a in aliases if a != "" and a != '[?]']
                 aliases = ', '.join(item for item in aliases) 
                 aliases = label + ', ' + aliases
             elif 'en' in data['aliases']:
-                aliases = sorted(list(set([unidecode.unidecode(item['value']) 
+                aliases = sorted(list(set([normalization.transliterate(item['value']) 
                                            for item in data['aliases']['en']])), key=len, reverse=True)
                 aliases = [a for a in aliases if a != "" and a != '[?]']
                 aliases = ', '.join(item for item in aliases) 
                 aliases = label + ', ' + aliases
             else:
                 aliases = label
-            aliases = re.sub(r"\(", "\\(", aliases)
-            aliases = re.sub(r"\)", "\\)", aliases)
-            aliases = re.sub(r"\.", "\\.", aliases)
-            aliases = re.sub(r"\+", "\\+", aliases)
-            aliases = re.sub(r"\*", "\\*", aliases)
+            aliases = normalization.escape(aliases)
             claims = data['claims']
             result = []
             for rel in claims:
@@ -154,12 +531,7 @@ class ObjectFiller(Filler):
                         value = str(value_id)
                     elif datatype == 'string' and 'datavalue' in claims[rel][i]['mainsnak']:
                         value = claims[rel][i]['mainsnak']['datavalue']['value']
-                        value = unidecode.unidecode(value)
-                        value = re.sub(r"\(", "\\(", value)
-                        value = re.sub(r"\)", "\\)", value)
-                        value = re.sub(r"\.", "\\.", value)
-                        value = re.sub(r"\+", "\\+", value)
-                        value = re.sub(r"\*", "\\*", value)
+                        value = normalization.escape(normalization.transliterate(value))
                         value_text = value
                         value_type = 'string'
                         if not value:
@@ -168,14 +540,14 @@ class ObjectFiller(Filler):
                         # TODO: resolve and add unit?
                         amount = claims[rel][i]['mainsnak']['datavalue']['value']['amount'] 
                         # unit = claims[rel][0]['mainsnak']['datavalue']['value']['amount'] 
-                        value = re.sub(r"\+", "", amount) # + unit
+                        value = amount.replace('+', '') # + unit
                         value_text = value
                         value_type = 'quantity'
                     elif datatype == 'time' and 'datavalue' in claims[rel][i]['mainsnak']:
-                        time = claims[rel][i]['mainsnak']['datavalue']['value']['time']
-                        date = dateparser.parse(time)
-                        if date:
-                            value = ', '.join([date.strftime(f) for f in self.formats])
+                        time = claims[rel][i]['mainsnak']['datavalue']['value']
+                        value = dates.format_time(time['time'], time.get('precision', dates.DAY),
+                                                  self.formats)
+                        if value:
                             value_text = value
                             value_type = 'time'
                         else:   
@@ -195,17 +567,24 @@ class ObjectFiller(Filler):
         except (Exception) as error:
             print("ObjectFiller: " + str(error))
             logging.critical("ObjectFiller: " + str(error))
+            metrics.inc('pipeline_errors_total', stage='ObjectFiller', type=type(error).__name__)
 
     
-    def get_data(self, row):
-        """Get data for Q-item and extract triplets of it
+    def get_entity_id(self, row):
+        """:param row: array_like, list containing Q-item-ID
+        :return: str, ID of the entity to retrieve"""
+        
+        return 'Q' + str(row[0])
+    
+    def get_entity_data(self, row, data):
+        """Extract triplets of a retrieved Q-item
         
         :param row: array_like, list containing Q-item-ID to retrieve the label for
+        :param data: dict, the wikidata-entity, None if not retrievable
         :return: array_like, list containing the q_id, label, synonyms, url, 
                              relation_id, relation_value, and is_q_item"""
         
         row_id = row[0]
-        data = utils.get_data('Q' + str(row_id))
         q_data = []
         if data:
             q_data = self.get_q_item_data(data, row_id)
@@ -226,31 +605,35 @@ class ObjectFiller(Filler):
         return insert_sql
 
 
-class RelationFiller(Filler):
+class RelationFiller(EntityFiller):
+    
+    table = 'p_relation'
+    columns = ('relation_id', 'label')
     
     def get_rows(self, cursor): 
         """ Return Relation-IDs to fill.
         :param cursor: a cursor object
-        :return rows: array_like, list of relation IDs to fill"""
+        :yield: array_like, the relation IDs to fill"""
         
-        sql = """SELECT DISTINCT q.relation_id FROM q_item q WHERE NOT EXISTS 
-            (SELECT 1 FROM p_relation p WHERE p.relation_id =
-                     CAST(q.relation_id AS INTEGER));"""
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        return rows
+        cursor.execute(queries.RELATION_ROWS)
+        yield from cursor
 
-    def get_data(self, row):
+    def get_entity_id(self, row):
+        """:param row: array_like, list containing relation-ID
+        :return: str, ID of the entity to retrieve"""
+        
+        return 'P' + str(row[0])
+
+    def get_entity_data(self, row, data):
         """Insert a new relation into the relations-table
     
+        :param row: array_like, list containing relation-ID
         :param data: dict, dictionary containing the data for the relation
-        :param item_id: str, ID of the relation, e.g. P31
         :return row_id: int, the id of the P-Relation
         :return label: str, the label of the relation with synonyms, 
                             INVALID if not existent
         """
         row_id = row[0]
-        data = utils.get_data('P' + str(row_id))
         label = 'INVALID'
         if data:
             try:
@@ -274,20 +657,14 @@ class RelationFiller(Filler):
                         else:
                             rel = item['value']
                         label = label + ', ' + rel
-                label = label.replace('/', ', ')
-                label = unidecode.unidecode(label)
-                label = re.sub(r"\(.+?\)", "", label)
-                label = re.sub(r" \.\.\.", "", label)
-                label = re.sub(r"\s?\[.+?\]\s?,?", "", label)
-                label = re.sub(r"\+", "\\+", label)
-                label = re.sub(r"\*", "\\*", label)
-                label = re.sub(r"\.", "\\.", label)
-                label = re.sub(r"\\\.\\\*", ".*", label)
+                label = normalization.relation_pattern(label)
                 if not label:
                     label = 'INVALID'
             except (Exception) as error:
                 print(error)
                 logging.critical('RelationFiller: ' + str(error))
+                metrics.inc('pipeline_errors_total', stage='RelationFiller', 
+                            type=type(error).__name__)
         return [(row_id, label)]
 
     def insert_list(self):
@@ -298,22 +675,141 @@ class RelationFiller(Filler):
 
 class TripletFiller(Filler):
     
-    def get_rows(self, cursor):
+    table = 'triplets'
+    columns = ('object_id', 'object', 'relation_id', 'relation', 'value_id', 'value', 
+               'context', 'pos_tags', 'dependencies', 'cindex')
+    resumable = True
+    
+    def __init__(self, pipe=None, pipe_batch_size=64, n_process=1, lazy=False, 
+                 compare=False, fetcher=None, **kwargs):
+        """:param pipe: bool, optional, retrieve the articles of a chunk in the 
+                     worker-pool and parse them together with nlp.pipe; by 
+                     default only if n_process > 1, since nlp.pipe parses in 
+                     this process otherwise while the workers only fetch
+        :param pipe_batch_size: int, optional, number of articles parsed at once
+        :param n_process: int, optional, number of processes of nlp.pipe
+        :param lazy: bool, optional, only segment the articles into sentences and 
+                     parse the windows around matches; articles are then 
+                     processed one by one in the workers
+        :param compare: bool, optional, extract with and without lazy and log 
+                        where they differ; the result of the full parse is stored
+        :param fetcher: ArticleFetcher, optional, client retrieving the 
+                        articles of a chunk concurrently when streaming
+        :param kwargs: optional, pool-settings passed to Filler"""
+        
+        super().__init__(**kwargs)
+        self.fetcher = fetcher if fetcher else ArticleFetcher(cache=self.cache)
+        if pipe is None:
+            pipe = n_process > 1
+        self.pipe = pipe and not lazy and not compare
+        self.pipe_batch_size = pipe_batch_size
+        self.n_process = n_process
+        self.lazy = lazy
+        self.compare = compare
+    
+    def init_worker(self):
+        """Load the spaCy-model once per worker instead of once per article; 
+        with pipe the workers only retrieve articles."""
+        if not self.pipe:
+            nlp_models.init_worker()
+    
+    def get_rows(self, cursor, keys=None):
         """ Return rows with attributes to fill context.
         :param cursor: a cursor object
-        :return rows: array_like, list attributes"""
+        :param keys: array_like, optional, only the rows of these Q-IDs
+        :yield: array_like, the attributes of a q_item"""
+        
+        if keys is None:
+            cursor.execute(queries.TRIPLET_ROWS % "")
+        else:
+            cursor.execute(queries.TRIPLET_ROWS % "AND q_id = ANY(%s)", (list(keys),))
+        yield from cursor
+    
+    def get_keys(self, cursor):
+        """:param cursor: a cursor object
+        :yield: int, the Q-IDs of the rows of get_rows"""
+        
+        cursor.execute(queries.TRIPLET_KEYS)
+        for row in cursor:
+            yield row[0]
+    
+    def get_key(self, row):
+        """:param row: array_like, a row as returned by get_rows
+        :return: int, the Q-ID of the object"""
+        
+        return row[0]
+    
+    def process_chunk(self, pool, chunk):
+        """Retrieve the articles of a chunk concurrently in the worker-pool and 
+        parse them in batches with nlp.pipe.
         
-        sql = """SELECT DISTINCT q_id, aliases, url, 
-        ARRAY_AGG 
-        (DISTINCT relation_label || '||' || value_text || '||' || 
-        relation_id || '||' || value_id) lab 
-        FROM q_item 
-        WHERE has_context = 0 AND relation_label <> '?' AND value_text <> '?' 
-        AND url <> '' GROUP BY q_id, aliases, url;"""
+        :param pool: Pool, the worker-pool
+        :param chunk: array_like, list of rows
+        :return: iterator, yields the result-list of every row"""
         
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        return rows
+        if not self.pipe:
+            return super().process_chunk(pool, chunk)
+        task = metrics.Task(self.get_content, type(self).__name__)
+        contents = metrics.merged(pool.imap(task, chunk, self.chunksize))
+        return self.parse_chunk(chunk, contents)
+    
+    async def fetch_chunk(self, chunk):
+        """:param chunk: array_like, list of rows
+        :return: array_like, list of tuples of a row and its article, None if 
+                 not retrieved"""
+        
+        urls = [row[2] + "?action=render" for row in chunk]
+        texts = await self.fetcher.fetch_texts(urls)
+        return [(row, texts.get(url)) for row, url in zip(chunk, urls)]
+    
+    def parse_items(self, pool, items):
+        """Pre-process the retrieved articles in the worker-pool and parse them 
+        with nlp.pipe, or extract their triplets one by one in the workers.
+        
+        :param pool: Pool, the worker-pool
+        :param items: array_like, list of tuples of a row and its article
+        :return: iterator, yields the result-list of every row"""
+        
+        stage = type(self).__name__
+        if not self.pipe:
+            task = metrics.Task(self.extract_item, stage)
+            return metrics.merged(pool.imap_unordered(task, items, self.chunksize))
+        task = metrics.Task(self.parse_item, stage)
+        contents = metrics.merged(pool.imap(task, items, self.chunksize))
+        return self.parse_chunk([row for row, _ in items], contents)
+    
+    def parse_item(self, item):
+        """:param item: tuple, a row and its article
+        :return: str, text of all paragraphs, None if not retrieved"""
+        
+        row, text = item
+        if text is not None:
+            return self.parse_content(row, text)
+    
+    def extract_item(self, item):
+        """:param item: tuple, a row and its article
+        :return: array_like, list of triplets, see get_data"""
+        
+        return self.extract(item[0], self.parse_item(item))
+    
+    def parse_chunk(self, chunk, contents):
+        """Parse the retrieved articles of a chunk and extract their triplets.
+        
+        :param chunk: array_like, list of rows
+        :param contents: iterable, the text of every row, None if not retrieved
+        :yield: array_like, the result-list of every retrieved row"""
+        
+        articles = [(row, content) for row, content in zip(chunk, contents) 
+                    if content is not None]
+        nlp = nlp_models.load_model()
+        docs = nlp.pipe((content for _, content in articles), 
+                        batch_size=self.pipe_batch_size, n_process=self.n_process)
+        for row, _ in articles:
+            with metrics.timer('TripletFiller', 'nlp'):
+                doc = next(docs)
+            with metrics.timer('TripletFiller', 'match'):
+                result = self.get_triplets(row, doc)
+            yield result
     
     def get_data(self, row):
         """Retrieve keywords for the given row from wikipedia article.
@@ -325,35 +821,90 @@ class TripletFiller(Filler):
                                     P-Relation ID, ID of relation value
         """
         
+        return self.extract(row, self.get_content(row))
+    
+    def extract(self, row, content):
+        """Parse the pre-processed article of a row and extract its triplets.
+        
+        :param row: array_like, a row as returned by get_rows
+        :param content: str, text of all paragraphs, None if not retrieved
+        :return result: array_like, list of triplets, see get_data"""
+        
+        if content is None:
+            return []
+        try:
+            nlp = nlp_models.load_model()
+            if self.lazy or self.compare:
+                with metrics.timer('TripletFiller', 'nlp'):
+                    sentences = nlp_models.load_sentencizer()(content)
+            if self.lazy and not self.compare:
+                # the windows around matches are parsed while matching
+                with metrics.timer('TripletFiller', 'match'):
+                    return self.get_triplets(row, sentences, nlp)
+            with metrics.timer('TripletFiller', 'nlp'):
+                doc = nlp(content)
+        except(Exception) as e:
+            return self.log_error(row, e)
+        with metrics.timer('TripletFiller', 'match'):
+            result = self.get_triplets(row, doc)
+        if self.compare:
+            self.compare_triplets(row, self.get_triplets(row, sentences, nlp), result)
+        return result
+    
+    def get_content(self, row):
+        """Retrieve the wikipedia article of a row and pre-process its text.
+        
+        :param row: array_like, a row as returned by get_rows
+        :return content: str, text of all paragraphs, None if not retrieved"""
+        
         try:
-            ################ LOAD AND PRE-PROCESS TEXT ########################
             url = row[2] + "?action=render"
-            response = requests.get(url)
-            html = BeautifulSoup(response.text, 'html.parser')
-            paragraphs = html.select("p")
-            content = "".join([para.text for para in paragraphs])
-            content = unidecode.unidecode(content)
-            content = content.replace(";", ",")
-            content = content.replace(" |", ",")
-            content = re.sub(r"(\s+|\n)", " ", content)
-            content = re.sub(r"[\'`\"']|(\[[^]]*\])|(,,)|(\( .*\?\/i\)\s)", "",content)
-            nlp = spacy.load("de_core_news_sm")
-            doc = nlp(content)
+            with metrics.timer('TripletFiller', 'fetch'):
+                text = utils.get_text(url, self.cache)
+        except(Exception) as e:
+            self.log_error(row, e)
+            return None
+        return self.parse_content(row, text)
+    
+    def parse_content(self, row, text):
+        """Pre-process the text of a retrieved article.
+        
+        :param row: array_like, a row as returned by get_rows
+        :param text: str, the rendered article
+        :return content: str, text of all paragraphs, None if not parsable"""
+        
+        try:
+            with metrics.timer('TripletFiller', 'parse'):
+                content = html_text.paragraph_text(text)
+                content = normalization.transliterate(content)
+                return html_text.normalize(content)
+        except(Exception) as e:
+            self.log_error(row, e)
+    
+    def get_triplets(self, row, doc, nlp=None):
+        """Find the relations of a row in the parsed article.
+        
+        :param row: array_like, a row as returned by get_rows
+        :param doc: Doc, the parsed article; only segmented if nlp is given
+        :param nlp: Language, optional, model parsing the windows around matches
+        :return result: array_like, list of triplets, see get_data"""
+        
+        try:
             sentences = list(doc.sents)
+            if nlp is None:
+                windows = matcher.SentenceWindows(sentences)
+            else:
+                windows = matcher.LazyWindows(sentences, nlp)
             ####################### FIND TITLE IN TEXT ########################
-            alias_matches = []
+            # windows are identified by the position of their middle sentence
+            alias_matches = matcher.MatchIndex()
             result = []
             context = ''
             alias_seen = False
             obj_aliases = row[1].split(', ')
-            for i in range(1, len(sentences)-1):
-                for oa in obj_aliases:
-                    search_text = sentences[i-1].text + ' ' + sentences[i].text + ' ' + sentences[i+1].text
-                    span_tuple = (sentences[i-1], sentences[i], sentences[i+1], str(oa))
-                    match = re.findall(r'\b%s\b' % oa, search_text)
-                    if match and span_tuple not in alias_matches:
-                        alias_matches.append(span_tuple)
-                        alias_seen = True
+            for i, oa in matcher.AliasMatcher(obj_aliases).find(windows):
+                if alias_matches.add(i, str(oa)):
+                    alias_seen = True
             agg_items = row[3]
             for ai in agg_items:
                 """ai is EITHER
@@ -363,7 +914,7 @@ class TripletFiller(Filler):
                 """
                 pos_tags = ''
                 deps = ''
-                rel_matches = []
+                rel_matches = matcher.MatchIndex()
                 relations = []
                 rel_seen = False
                 items = ai.split('||')
@@ -378,37 +929,62 @@ class TripletFiller(Filler):
                         if rel == 'INVALID':
                             continue
                         elif rel == '\*' or rel == '†':
-                            pattern = r'%s' % rel
+                            pattern = matcher.compile_pattern(r'%s' % rel)
                         else:
-                            pattern = re.compile(r'\b%s\b' % rel)
-                        for am in alias_matches:
-                            search_text = am[0].text + ' ' + am[1].text + ' ' + am[2].text
-                            span_tuple = (am[0], am[1], am[2], am[3], str(rel))
-                            match = re.findall(pattern, search_text)
-                            if match and span_tuple not in rel_matches:
-                                rel_matches.append(span_tuple)
+                            pattern = matcher.word_pattern(rel)
+                        for i, oa in alias_matches:
+                            match = windows.search(pattern, i)
+                            if match and rel_matches.add(i, (oa, str(rel))):
                                 rel_seen = True
                     if rel_seen:
                         for va in val_aliases:
-                            for rm in rel_matches:
-                                context = rm[0].text + ' ||| ' + rm[1].text + ' ||| ' + rm[2].text
-                                match = re.findall(r'\b%s\b' % va,  context)
+                            pattern = matcher.word_pattern(va)
+                            for i, (oa, rel) in rel_matches:
+                                context = windows.context(i)
+                                match = windows.search(pattern, i, context=True)
                                 if match:
-                                    cindex = rm[3][:80] + '||' +  rm[4][:60] + '||' +  va[:80] + '||' +  context[:20] # cindex has a max length of 246 chars --> 255 allowed!
-                                    pos_tags = pos_tags + ', '.join([item.tag_ for item in rm[0]]) +  ' ||| ' + ', '.join([item.tag_ for item in rm[1]]) +  ' ||| ' + ', '.join([item.tag_ for item in rm[2]])
-                                    deps = deps + ', '.join([item.dep_ for item in rm[0]]) +  ' ||| ' + ', '.join([item.dep_ for item in rm[1]]) +  ' ||| ' + ', '.join([item.dep_ for item in rm[2]])
+                                    cindex = oa[:80] + '||' +  rel[:60] + '||' +  va[:80] + '||' +  context[:20] # cindex has a max length of 246 chars --> 255 allowed!
+                                    pos_tags = pos_tags + windows.annotation(i, 'tag_')
+                                    deps = deps + windows.annotation(i, 'dep_')
                                     # (object_id, object, relation_id, relation, value_id, value, context, pos_tags, dependencies, cindex)
-                                    result.append((int(row[0]), rm[3], int(rel_id), rm[4], rel_value_id, va, context, pos_tags, deps, cindex))
+                                    result.append((int(row[0]), oa, int(rel_id), rel, rel_value_id, va, context, pos_tags, deps, cindex))
                     else:
                         # (object_id, object, relation_id, relation, value_id, value, context, pos_tags, dependencies, cindex)
                         cindex = str(row[0]) + '||' + str(rel_id) + '||' +  str(rel_value_id) + '||' +  'NOTHING'
                         result.append((int(row[0]), None, int(rel_id), None, rel_value_id, None, 'NOTHING', None, None, cindex))
             return result
         except(Exception) as e:
-            error = str(e) + " While requesting " + row[2]
-            print(error)
-            logging.critical("TripletFiller: " + str(error))
-            return []
+            return self.log_error(row, e)
+    
+    def compare_triplets(self, row, lazy, full):
+        """Log the differences of the triplets extracted lazily and with the 
+        full parse of an article.
+        
+        :param row: array_like, a row as returned by get_rows
+        :param lazy: array_like, triplets extracted with lazy
+        :param full: array_like, triplets extracted from the full parse"""
+        
+        lazy = {t[-1]: t for t in lazy}
+        full = {t[-1]: t for t in full}
+        missing = len(full.keys() - lazy.keys())
+        added = len(lazy.keys() - full.keys())
+        changed = sum(1 for k in full.keys() & lazy.keys() if full[k] != lazy[k])
+        if missing or added or changed:
+            log = ("TripletFiller: lazy parse of " + row[2] + " misses " + str(missing) + 
+                   ", adds " + str(added) + " and annotates " + str(changed) + 
+                   " differently of " + str(len(full)) + " triplets")
+            logging.warning(log)
+    
+    def log_error(self, row, e):
+        """:param row: array_like, the row whose article failed
+        :param e: Exception, the error
+        :return: array_like, empty list of triplets"""
+        
+        error = str(e) + " While requesting " + row[2]
+        print(error)
+        logging.critical("TripletFiller: " + str(error))
+        metrics.inc('pipeline_errors_total', stage='TripletFiller', type=type(e).__name__)
+        return []
     
     def insert_list(self):
         """Generate object-specific SQL for inserting values in insert-list 
@@ -420,67 +996,69 @@ class TripletFiller(Filler):
                 VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) ON CONFLICT DO NOTHING;"""
         return insert_sql
 
-class ObjectTypeFiller(Filler):
+class ObjectTypeFiller(EntityFiller):
+    
+    table = 'type_labels'
+    columns = ('type_id', 'label')
+    classes = queries.OBJECT_CLASSES
     
     def get_rows(self, cursor):
-        """ Return QId, relation-value to fill in as object-types.
+        """Return the IDs of the types whose label is still unknown, i.e. 
+        neither joined as value, resolved in an earlier run nor crawled as 
+        q_item. Every type is retrieved once, however many objects share it.
         
         :param cursor: a cursor object
-        :return: array_like, list of retrieved rows"""
-        
-        sql = """SELECT DISTINCT q_id, 
-        ARRAY_AGG(DISTINCT value) agg FROM q_item 
-        WHERE object_type IS NULL AND relation_id=31
-        GROUP BY q_id ORDER BY q_id;"""
-        cursor.execute(sql)
-        tmp1 = cursor.fetchall()
-        sql = """SELECT DISTINCT q_id, 
-        ARRAY_AGG(DISTINCT value) agg FROM q_item 
-        WHERE object_type IS NULL AND relation_id=279
-        GROUP BY q_id ORDER BY q_id;"""
-        sql = """SELECT 
-        DISTINCT q_id, value, value_id, label FROM q_item 
-        WHERE relation_id=31;"""
-        cursor.execute(sql)
-        tmp1 = cursor.fetchall()
-        sql = """SELECT 
-        DISTINCT q_id, value, value_id, label FROM q_item 
-        WHERE relation_id=279;"""
-        cursor.execute(sql)
-        tmp2 = cursor.fetchall()
-        firsts = [t[0] for t in tmp1]
-        tmp2 = [t for t in tmp2 if t[0] not in firsts]
-        return tmp1 + tmp2
+        :yield: array_like, rows containing the ID of a type"""
+        
+        cursor.execute(queries.OBJECT_TYPE_ROWS)
+        yield from cursor
 
-    def get_data(self, row):
+    def get_entity_id(self, row):
+        """:param row: array_like, list containing the ID of a type
+        :return: str, ID of the type-entity"""
+        
+        return 'Q' + str(row[0])
+
+    def get_entity_data(self, row, data):
         """Find label in data
         
-        :param row: array_like, list containing item_id, relation_value_id to retrieve the labels
-        :return: array_like, list containing the label, and the item_id"""
+        :param row: array_like, list containing the ID of a type
+        :param data: dict, the type-entity, None if not retrieved
+        :return: array_like, list containing the type_id and its label"""
                 
-        item_id = row[0]
-        label = 'UNKNOWN'
-        if row[1].isdigit():
-            data = utils.get_data('Q' + row[1])
-            if data:
-                if 'de' in data['labels']:
-                    label = data['labels']['de']['value']
-                elif 'en' in data['labels']:
-                    label = data['labels']['en']['value']
-            label = unidecode.unidecode(label)
-        else:
-            label = row[1]
-        if label != 'UNKNOWN':
-            return [(item_id, label, row[2], row[3])]
-        else:
+        label = None
+        if data:
+            if 'de' in data['labels']:
+                label = data['labels']['de']['value']
+            elif 'en' in data['labels']:
+                label = data['labels']['en']['value']
+        if label is None:
             return []
+        return [(row[0], normalization.transliterate(label))]
+
+    def finish(self, cursor):
+        """Resolve the types of all objects with a single join: a type is the 
+        value if it was joined already, its label in type_labels otherwise. 
+        Labels of types crawled as q_item are added to type_labels first.
+        
+        :param cursor: a cursor object"""
+        
+        cursor.execute("""INSERT INTO type_labels (type_id, label) 
+            SELECT DISTINCT ON (s.q_id) s.q_id, s.label FROM q_item s 
+            WHERE s.q_id IN (SELECT value_id FROM (%s) c WHERE value ~ '^[0-9]+$') 
+            ORDER BY s.q_id ON CONFLICT DO NOTHING;""" % self.classes)
+        cursor.execute("""INSERT INTO types (object_id, type, type_id, label) 
+            SELECT c.q_id, CASE WHEN c.value ~ '^[0-9]+$' THEN t.label ELSE c.value END, 
+            c.value_id, c.label FROM (%s) c 
+            LEFT JOIN type_labels t ON t.type_id = c.value_id 
+            WHERE c.value !~ '^[0-9]+$' OR t.label IS NOT NULL 
+            ON CONFLICT DO NOTHING;""" % self.classes)
+        logging.info("Resolved " + str(cursor.rowcount) + " object-types")
 
     def insert_list(self):
         """Generate object-specific SQL for inserting values in insert-list 
         :return insert_sql: str"""
         
-        insert_sql = """INSERT INTO types (object_id, type, type_id, label) 
-                VALUES (%s,%s,%s,%s) ON CONFLICT DO NOTHING;"""
-        #insert_sql = """UPDATE q_item SET object_type = %s 
-        #            WHERE q_id = %s AND object_type IS NULL;"""
+        insert_sql = """INSERT INTO type_labels (type_id, label) 
+                VALUES (%s,%s) ON CONFLICT DO NOTHING;"""
         return insert_sql
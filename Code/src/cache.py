@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar  9 11:27:04 2020
+
+@author: selin
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+class DiskCache:
+
+    def __init__(self, path='cache', max_bytes=2 * 1024 ** 3, ttl=None):
+        """Persistent cache of retrieved entities and articles. Contents are
+        stored compressed in files named by their hash, an index maps every key
+        (entity-ID or URL) to its content. The least recently used entries are
+        evicted once the cache grows beyond max_bytes.
+
+        :param path: str, optional, directory of the cache
+        :param max_bytes: int, optional, maximal size of the stored contents
+        :param ttl: float, optional, seconds after which an entry is stale,
+                    entries never expire if None"""
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        # every process opens its own connection to the index
+        state = dict(self.__dict__)
+        state['_connection'] = None
+        state['_pid'] = None
+        return state
+
+    def connect(self):
+        """Return the index-connection of the current process.
+
+        :return: Connection, connection to the sqlite-index"""
+
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(self.path, exist_ok=True)
+            connection = sqlite3.connect(os.path.join(self.path, 'index.sqlite'),
+                                         timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL;")
+            connection.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                accessed REAL NOT NULL,
+                etag TEXT);""")
+            connection.execute("""CREATE INDEX IF NOT EXISTS entries_accessed
+                ON entries (accessed);""")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def lookup(self, key):
+        """Return a cached entry, fresh or stale.
+
+        :param key: str, entity-ID or URL
+        :return: tuple, content, ETag and whether the entry is still fresh;
+                 None if key is not cached"""
+
+        connection = self.connect()
+        row = connection.execute("SELECT digest, stored, etag FROM entries WHERE key = ?;",
+                                 (key,)).fetchone()
+        if row is None:
+            return
+        content = self._read(row[0])
+        if content is None:
+            connection.execute("DELETE FROM entries WHERE key = ?;", (key,))
+            return
+        connection.execute("UPDATE entries SET accessed = ? WHERE key = ?;",
+                           (time.time(), key))
+        fresh = self.ttl is None or time.time() - row[1] < self.ttl
+        return content, row[2], fresh
+
+    def get(self, key):
+        """Return the content of a fresh entry.
+
+        :param key: str, entity-ID or URL
+        :return: str, the cached content, None if missing or stale"""
+
+        entry = self.lookup(key)
+        if entry and entry[2]:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+
+    def put(self, key, content, etag=None):
+        """Store content under key.
+
+        :param key: str, entity-ID or URL
+        :param content: str, the content to store
+        :param etag: str, optional, ETag for revalidating the entry"""
+
+        data = content.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        filename = self._filename(digest)
+        if not os.path.exists(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            tmp = filename + '.' + str(os.getpid())
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(data))
+            os.replace(tmp, filename)
+        now = time.time()
+        self.connect().execute("""INSERT OR REPLACE INTO entries
+            (key, digest, size, stored, accessed, etag) VALUES (?,?,?,?,?,?);""",
+            (key, digest, os.path.getsize(filename), now, now, etag))
+        self._puts += 1
+        if self._puts % 100 == 1:
+            self.evict()
+
+    def touch(self, key):
+        """Mark an entry as fresh again, e.g. after its ETag was revalidated.
+
+        :param key: str, entity-ID or URL"""
+
+        now = time.time()
+        self.connect().execute("UPDATE entries SET stored = ?, accessed = ? WHERE key = ?;",
+                               (now, now, key))
+
+    def evict(self):
+        """Delete the least recently used entries until the cache is smaller
+        than 90% of max_bytes."""
+
+        connection = self.connect()
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries;").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = connection.execute("SELECT key, digest, size FROM entries ORDER BY accessed;")
+        evicted = []
+        for key, digest, size in rows:
+            if total <= target:
+                break
+            evicted.append((key, digest))
+            total -= size
+        for key, digest in evicted:
+            connection.execute("DELETE FROM entries WHERE key = ?;", (key,))
+            still_used = connection.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1;",
+                                            (digest,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._filename(digest))
+                except OSError:
+                    pass
+        logging.info("DiskCache: evicted " + str(len(evicted)) + " entries")
+
+    def stats(self):
+        """Return the number of hits and misses of the current process.
+
+        :return: dict, hits, misses and hit_rate"""
+
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
+
+    def _filename(self, digest):
+        return os.path.join(self.path, digest[:2], digest[2:] + '.z')
+
+    def _read(self, digest):
+        try:
+            with open(self._filename(digest), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            return
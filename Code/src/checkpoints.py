@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 30 09:21:44 2020
+
+@author: selin
+
+Progress of the stages of the pipeline. A checkpoint is written in the same
+transaction as the rows of a chunk, so it never differs from the committed work.
+"""
+
+import psycopg2
+from src.config import config
+
+def start(cursor, stage, resume=False):
+    """Begin a stage: continue an unfinished checkpoint if resume, discard it
+    otherwise.
+
+    :param cursor: a cursor object
+    :param stage: str, name of the stage, e.g. TripletFiller
+    :param resume: bool, optional, continue after the last committed chunk
+    :return: key of the last processed row, None to start from the beginning"""
+
+    if resume:
+        cursor.execute("""SELECT last_key FROM checkpoints
+            WHERE stage = %s AND NOT finished;""", (stage,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+    cursor.execute("DELETE FROM checkpoints WHERE stage = %s;", (stage,))
+
+def save(cursor, stage, first_key, last_key, rows):
+    """Record a processed chunk; commit together with the rows of the chunk.
+
+    :param cursor: a cursor object
+    :param stage: str, name of the stage
+    :param first_key: key of the first row of the chunk
+    :param last_key: key of the last row of the chunk
+    :param rows: int, number of rows in the chunk"""
+
+    cursor.execute("""INSERT INTO checkpoints (stage, first_key, last_key, chunks, rows)
+        VALUES (%s, %s, %s, 1, %s) ON CONFLICT (stage) DO UPDATE SET
+        last_key = EXCLUDED.last_key, chunks = checkpoints.chunks + 1,
+        rows = checkpoints.rows + EXCLUDED.rows, updated_at = CURRENT_TIMESTAMP;""",
+        (stage, first_key, last_key, rows))
+
+def finish(cursor, stage):
+    """Mark a stage as completed; a resumed stage then starts from the beginning.
+
+    :param cursor: a cursor object
+    :param stage: str, name of the stage"""
+
+    cursor.execute("""UPDATE checkpoints SET finished = TRUE,
+        updated_at = CURRENT_TIMESTAMP WHERE stage = %s;""", (stage,))
+
+def get_checkpoints(config_file='database.ini'):
+    """:param config_file: str, optional, file-name, default database.ini
+    :return: dict, stage mapped to dict with the processed range of keys,
+             chunks, rows and whether the stage finished"""
+
+    conn = None
+    try:
+        params = config(config_file)
+        conn = psycopg2.connect(**params)
+        cur = conn.cursor()
+        cur.execute("""SELECT stage, first_key, last_key, chunks, rows, finished
+            FROM checkpoints ORDER BY stage;""")
+        return {row[0]: {'first_key': row[1], 'last_key': row[2], 'chunks': row[3],
+                         'rows': row[4], 'finished': row[5]} for row in cur.fetchall()}
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        return {}
+    finally:
+        if conn is not None:
+            conn.close()
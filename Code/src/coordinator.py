@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Apr  3 14:18:09 2020
+
+@author: selin
+
+Distributed TripletFiller: enqueue the open q_items once, start workers on any
+number of hosts against the same database and watch their throughput.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from multiprocessing import Process
+from extraction_pipeline import clean_up_triplets
+from Filler import TripletFiller
+from work_queue import WorkQueue
+
+STAGE = 'TripletFiller'
+
+def enqueue():
+    """Mark the q_items of completed items and enqueue the open ones.
+
+    :return: int, number of added items"""
+
+    clean_up_triplets()
+    return WorkQueue(STAGE).enqueue(TripletFiller())
+
+def work(lease_seconds=600, n_process=1, batch_size=500):
+    """Fill triplets from the queue until it is empty.
+
+    :param lease_seconds: int, optional, time to complete a claimed chunk
+    :param n_process: int, optional, number of processes parsing the articles
+    :param batch_size: int, optional, number of items claimed at once
+    :return: bool, True if the queue was emptied without errors"""
+
+    queue = WorkQueue(STAGE, lease_seconds=lease_seconds)
+    logging.info("Worker " + queue.worker + " started")
+    filler = TripletFiller(n_process=n_process, batch_size=batch_size, queue=queue)
+    return filler.fill()
+
+def run_worker(lease_seconds, n_process, batch_size):
+    """Target of a worker-process; exits with 1 if work failed."""
+
+    sys.exit(0 if work(lease_seconds, n_process, batch_size) else 1)
+
+def report():
+    """:return: str, the items per state and the throughput of every worker"""
+
+    queue = WorkQueue(STAGE)
+    lines = ["items: " + ", ".join(state + " " + str(count) for state, count in
+                                   sorted(queue.get_stats().items()))]
+    lines.append("%-32s %8s %10s %10s %10s %8s" % ('worker', 'chunks', 'rows in', 'rows out',
+                                                  'rows/s', 'idle [s]'))
+    total = 0.0
+    for worker in queue.get_workers():
+        lines.append("%-32s %8d %10d %10d %10.2f %8.0f" % (
+            worker['worker'], worker['chunks'], worker['rows_in'], worker['rows_out'],
+            worker['throughput'], worker['idle']))
+        total += worker['throughput']
+    lines.append("%-32s %41.2f" % ('total', total))
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distribute TripletFiller over several workers.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('enqueue', help="enqueue the q_items without context")
+    worker_parser = subparsers.add_parser('work', help="fill triplets until the queue is empty")
+    worker_parser.add_argument('--workers', type=int, default=1,
+                               help="worker-processes started on this host")
+    worker_parser.add_argument('--lease', type=int, default=600,
+                               help="seconds until the items of a stopped worker are claimed "
+                               "again; renewed while the worker runs")
+    worker_parser.add_argument('--batch', type=int, default=500, help="items claimed at once")
+    worker_parser.add_argument('--nlp-processes', type=int, default=1,
+                               help="processes parsing the articles with nlp.pipe per "
+                               "worker; with 1 the worker-pool parses the articles")
+    status_parser = subparsers.add_parser('status', help="report throughput per worker")
+    status_parser.add_argument('--watch', type=int, help="repeat every WATCH seconds")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(process)d %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO,
+                        filename=os.getcwd() + '/logs/coordinator' +
+                        str(time.time()).replace('.', '') + '.log')
+    if args.command == 'enqueue':
+        print("enqueued: " + str(enqueue()))
+    elif args.command == 'work':
+        workers = [Process(target=run_worker, args=(args.lease, args.nlp_processes, args.batch))
+                   for _ in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        print(report())
+        failed = [worker.pid for worker in workers if worker.exitcode != 0]
+        if failed:
+            print("failed workers: " + ", ".join(str(pid) for pid in failed))
+            logging.critical("Failed workers: " + ", ".join(str(pid) for pid in failed))
+            sys.exit(1)
+    else:
+        print(report())
+        while args.watch:
+            time.sleep(args.watch)
+            print()
+            print(report())
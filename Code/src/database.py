@@ -8,6 +8,7 @@ Created on Mon Feb  3 15:54:00 2020
 
 import psycopg2
 from src.config import config
+from src.migrations import migrate
 
 def execute_sql(config_file, commands):
     """Generate a new database with the configuration specified in the config_file.
@@ -32,7 +33,8 @@ def execute_sql(config_file, commands):
             conn.close()
             
 def create_tables(config_file='database.ini'):
-    """Create tables in the PostgreSQL database
+    """Create tables in the PostgreSQL database and migrate them to the latest
+    schema-version.
     :param config_file: str, optional, file-name, default database.ini
     """
     
@@ -56,6 +58,7 @@ def create_tables(config_file='database.ini'):
             object_type VARCHAR(255),
             value_type VARCHAR(255),
             has_context INTEGER NOT NULL,
+            seq BIGSERIAL,
             UNIQUE(q_id, relation_id, value),
             PRIMARY KEY (q_id, relation_id, value)
         );
@@ -83,6 +86,10 @@ def create_tables(config_file='database.ini'):
                 type VARCHAR(255),
                 PRIMARY KEY(object_id, type_id)
         );""",
+        """CREATE TABLE pipeline_state (
+                name VARCHAR(255) PRIMARY KEY,
+                value BIGINT NOT NULL
+        );""",
         """INSERT INTO p_relation (relation_id, label)
             VALUES (0, 'NON-Q-ITEM');
         """,
@@ -100,6 +107,8 @@ def create_tables(config_file='database.ini'):
         """
         )
     execute_sql(config_file, commands)
+    # indexes and later changes of the schema are applied by the migrations
+    migrate(config_file)
          
 def drop_tables(config_file='database.ini'):
     """Drop all tables of the database specified in the configuration file.
@@ -110,7 +119,14 @@ def drop_tables(config_file='database.ini'):
         """ DROP TABLE q_item;""",
         """ DROP TABLE p_relation;""",
         """ DROP TABLE triplets;""",
-        """ DROP TABLE types;"""
+        """ DROP TABLE types;""",
+        """ DROP TABLE IF EXISTS pipeline_state;""",
+        """ DROP TABLE IF EXISTS frontier;""",
+        """ DROP TABLE IF EXISTS checkpoints;""",
+        """ DROP TABLE IF EXISTS type_labels;""",
+        """ DROP TABLE IF EXISTS work_items;""",
+        """ DROP TABLE IF EXISTS queue_workers;""",
+        """ DROP TABLE IF EXISTS schema_migrations;"""
         )
     execute_sql(config_file, commands)
  
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 25 10:12:36 2020
+
+@author: selin
+"""
+
+import dateparser
+import datetime
+import locale
+import logging
+import os
+import re
+from functools import lru_cache
+from multiprocessing import util
+
+# formats of a date as written in german articles
+FORMATS = ('%d. %B %y', '%d. %b %Y', '%d. %b %y', '%d. %B %Y',
+           '%d.%m.%y', '%d.%m.%Y', '%d-%m-%y', '%d-%m-%Y',
+           '%d-%b-%Y')
+# canonical time-value of wikidata, e.g. +1952-03-11T00:00:00Z
+WIKIDATA_TIME = re.compile(r'([+-])(\d{1,16})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)Z')
+# precision of a time-value exact to the day
+DAY = 11
+CACHE_SIZE = 65536
+
+_stats = {'fast': 0, 'fallback': 0}
+_finalizer = None
+
+def format_time(time, precision=DAY, formats=FORMATS):
+    """Format a wikidata time-value in all given formats, e.g. '11. März 52,
+    11. Mär 1952, ...'. The formatted strings are cached per process, since the
+    same dates recur in many entities.
+
+    :param time: str, time-value of a claim, e.g. +1952-03-11T00:00:00Z
+    :param precision: int, optional, precision of the time-value, 11 = day
+    :param formats: tuple, optional, strftime-formats
+    :return: str, the formatted dates separated by comma; None if the value is
+             not a date exact to the day"""
+
+    global _finalizer
+    if _finalizer is None:
+        _finalizer = util.Finalize(None, log_stats, exitpriority=10)
+    return _format_time(time, precision, tuple(formats), locale.setlocale(locale.LC_TIME))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format_time(time, precision, formats, lc_time):
+    """Cached implementation of format_time; the locale is part of the key as
+    it determines the names of months."""
+
+    date = parse_time(time, precision)
+    if date is None:
+        return None
+    return ', '.join([date.strftime(f) for f in formats])
+
+def parse_time(time, precision=DAY):
+    """Parse the canonical shape of a wikidata time-value directly; anything
+    else is left to dateparser.
+
+    :param time: str, time-value of a claim
+    :param precision: int, optional, precision of the time-value, 11 = day
+    :return: datetime, the date; None if it is invalid, before the common era
+             or less precise than a day"""
+
+    match = WIKIDATA_TIME.fullmatch(time)
+    if match is None:
+        _stats['fallback'] += 1
+        return dateparser.parse(time)
+    _stats['fast'] += 1
+    sign, year, month, day, hour, minute, second = match.groups()
+    if sign == '-' or precision < DAY:
+        return None
+    try:
+        # month or day 00 (unknown) and years beyond 9999 are invalid as well
+        return datetime.datetime(int(year), int(month), int(day), int(hour),
+                                 int(minute), int(second), tzinfo=datetime.timezone.utc)
+    except (ValueError, OverflowError):
+        return None
+
+def get_stats():
+    """Return the number of parsed time-values and the hit-rate of the cache.
+
+    :return: dict, with hits, misses, hit_rate, fast and fallback, i.e. the
+             values parsed directly and by dateparser"""
+
+    info = _format_time.cache_info()
+    requests = info.hits + info.misses
+    return {'hits': info.hits, 'misses': info.misses,
+            'hit_rate': info.hits / requests if requests else 0.0,
+            'fast': _stats['fast'], 'fallback': _stats['fallback']}
+
+def log_stats():
+    """Create a log entry with the cache-statistics of this process."""
+
+    stats = get_stats()
+    log = ("Formatted " + str(stats['hits'] + stats['misses']) + " dates with hit-rate " +
+           str(round(stats['hit_rate'], 3)) + ", parsed " + str(stats['fast']) +
+           " directly and " + str(stats['fallback']) + " with dateparser (pid " +
+           str(os.getpid()) + ")")
+    logging.info(log)
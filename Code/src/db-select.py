@@ -6,37 +6,34 @@ Created on Mon Feb  3 15:54:00 2020
 @author: selin
 """
 
+import argparse
+import logging
 import os
-import pandas as pd
-import psycopg2
-from config import config
-
-def get_entries(sql, columns):
-    """ create tables in the PostgreSQL database"""
-    conn = None
-    try:
-        params = config('database.ini')
-        conn = psycopg2.connect(**params)
-        sql_query = pd.read_sql_query(sql, conn)
-        df = pd.DataFrame(sql_query, columns=columns)
-        conn.close()
-        return df
-    except (Exception, psycopg2.DatabaseError) as error:
-        print(error)
+from export import COMPRESSIONS, TABLES, export_tables
 
 if __name__ == '__main__':
-	# get triplets
-	columns = ['object_id','cindex','context']
-	sql = "SELECT object_id, cindex, context FROM triplets WHERE context <> 'NOTHING' ORDER BY object_id;"
-    triplets = get_entries(sql, columns)
-    #triplets = triplets.sample(n=10000)
-    path = os.getcwd() + '/df-triplets.parquet.gzip'
-    triplets.to_parquet(path, compression='gzip')
-	# get types
-	columns = ['label','type']
-	sql = "SELECT label, type FROM types;"
-    types = get_entries(sql, columns)
-    path = os.getcwd() + '/df-types.parquet.gzip'
-    types.to_parquet(path, compression='gzip')
-	
-    
+    parser = argparse.ArgumentParser(description="Export triplets and types as parquet.")
+    parser.add_argument('--output', default=os.getcwd(), 
+                        help="directory receiving df-triplets.parquet and df-types.parquet")
+    parser.add_argument('--tables', nargs='+', choices=sorted(TABLES), default=sorted(TABLES))
+    parser.add_argument('--incremental', action='store_true', 
+                        help="only export rows added since the last export")
+    parser.add_argument('--compression', choices=COMPRESSIONS, 
+                        help="codec of the files, default zstd, gzip for a single file")
+    parser.add_argument('--partition-size', type=int, default=1000000, 
+                        help="number of object-IDs per partition")
+    parser.add_argument('--row-group-size', type=int, default=100000)
+    parser.add_argument('--single-file', action='store_true', 
+                        help="write df-triplets.parquet.gzip and df-types.parquet.gzip "
+                        "without partitions, as read by the notebooks")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S", level=logging.INFO)
+    counts = export_tables(args.output, args.tables, args.incremental, 
+                           partition_size=args.partition_size, 
+                           row_group_size=args.row_group_size, 
+                           compression=args.compression or 
+                           ('gzip' if args.single_file else 'zstd'),
+                           single_file=args.single_file)
+    for table, count in counts.items():
+        print(table + ": " + str(count) + " rows")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 12 13:50:31 2020
+
+@author: selin
+"""
+
+import bz2
+import gzip
+import json
+import logging
+import os
+import psycopg2
+import re
+import timeit
+from src.config import config
+from src.utils import create_pool
+from urllib.parse import quote
+
+# every line of a dump starts with {"type":"item","id":"Q31",...
+ENTITY_ID = re.compile(rb'"id":\s*"([QP]\d+)"')
+WIKI_URL = "https://de.wikipedia.org/wiki/"
+
+def open_dump(path):
+    """Open a wikidata-dump for incremental decompression.
+
+    :param path: str, path of a .json, .json.gz or .json.bz2 dump
+    :return: file, binary file-object"""
+
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def read_dump(path, wanted, offset=0):
+    """Stream a dump line by line and yield the lines of wanted entities only;
+    all other lines are skipped without being parsed.
+
+    :param path: str, path of the dump
+    :param wanted: set_like, IDs of entities to yield (e.g. Q42, P31)
+    :param offset: int, optional, position in the decompressed dump to start at;
+                   a compressed dump is still decompressed from its start up
+                   to offset, only the parsing of these lines is skipped
+    :yield: tuple, offset after the line, entity-ID and the line"""
+
+    with open_dump(path) as f:
+        if offset:
+            # bz2 and gzip decompress up to offset but nothing is parsed
+            f.seek(offset)
+        for line in f:
+            offset += len(line)
+            match = ENTITY_ID.search(line, 0, 256)
+            if match:
+                item_id = match.group(1).decode()
+                if item_id in wanted:
+                    yield offset, item_id, line
+
+def parse_line(line):
+    """Decode a line of a dump into an entity as returned by the API.
+
+    :param line: bytes, a line of the dump
+    :return: dict, the entity"""
+
+    entity = json.loads(line.rstrip().rstrip(b','))
+    # dumps contain the titles of sitelinks but not always their URL
+    sitelink = entity.get('sitelinks', {}).get('dewiki')
+    if sitelink and 'url' not in sitelink:
+        sitelink['url'] = WIKI_URL + quote(sitelink['title'].replace(' ', '_'))
+    return entity
+
+def load_state(state_file, path):
+    """:param state_file: str, file storing the progress of an ingestion
+    :param path: str, path of the dump
+    :return: dict, round and offset to resume at"""
+
+    if state_file and os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+        if state.get('path') == path:
+            return state
+    return {'path': path, 'round': 0, 'offset': 0}
+
+def save_state(state_file, state):
+    """:param state_file: str, file storing the progress of an ingestion
+    :param state: dict, round and offset of the last committed batch"""
+
+    if state_file:
+        tmp = state_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, state_file)
+
+def ingest(fillers, path, config_file='database.ini', pool=None, offset=0,
+           state=None, state_file=None, batch_size=5000):
+    """Fill the rows of several entity-fillers from a single pass over a dump
+    instead of the wikidata-API.
+
+    :param fillers: array_like, list of EntityFiller, e.g. ObjectFiller
+    :param path: str, path of the dump
+    :param config_file: str, optional filename of database-configuration to use
+    :param pool: Pool, optional, worker-pool parsing the lines, created with
+                 the settings of the first filler if None
+    :param offset: int, optional, position in the decompressed dump to resume
+                   at, see read_dump
+    :param state: dict, optional, progress stored after every committed batch
+    :param state_file: str, optional, file to store the progress in
+    :param batch_size: int, optional, number of entities parsed per commit"""
+
+    own_pool = pool is None
+    connection = None
+    try:
+        start_time = timeit.default_timer()
+        params = config(config_file)
+        connection = psycopg2.connect(**params)
+        cursor = connection.cursor()
+        # only the IDs of the current frontier are kept in memory
+        wanted = {}
+        for n, filler in enumerate(fillers):
+            for row in filler.get_rows(cursor):
+                item_id = filler.get_entity_id(row)
+                if item_id:
+                    wanted.setdefault(item_id, []).append((n, row))
+        for filler in fillers:
+            filler.create_staging(cursor)
+        connection.commit()
+        logging.info("Ingesting " + str(len(wanted)) + " entities from " + path)
+        if own_pool:
+            pool = create_pool(fillers[0].processes, fillers[0].init_worker)
+        batch = []
+        entities = 0
+        for offset, item_id, line in read_dump(path, wanted, offset):
+            entities += 1
+            batch.extend((n, row, line) for n, row in wanted[item_id])
+            if len(batch) >= batch_size:
+                _write_batch(fillers, pool, connection, cursor, batch)
+                batch = []
+                if state is not None:
+                    state['offset'] = offset
+                    save_state(state_file, state)
+        if batch:
+            _write_batch(fillers, pool, connection, cursor, batch)
+        for filler in fillers:
+            filler.finish(cursor)
+        connection.commit()
+        cursor.close()
+        minutes = (timeit.default_timer() - start_time) / 60
+        logging.info("Ingested " + str(entities) + " of " + str(len(wanted)) +
+                     " entities in " + str(minutes) + " minutes")
+    finally:
+        if own_pool and pool is not None:
+            pool.close()
+            pool.join()
+        if connection is not None:
+            connection.close()
+
+def _write_batch(fillers, pool, connection, cursor, batch):
+    """Parse a batch of lines in the pool and write the rows of every filler."""
+
+    for n, filler in enumerate(fillers):
+        items = [(row, line) for m, row, line in batch if m == n]
+        if items:
+            results = pool.imap_unordered(filler.parse_line, items, filler.chunksize)
+            filler.write_chunk(connection, cursor, results)
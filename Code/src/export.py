@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Apr  2 09:37:18 2020
+
+@author: selin
+
+Export of the triplets and types as training-data. Rows are streamed from a
+server-side cursor into Arrow record-batches and written as parquet-files,
+partitioned by ranges of the object-ID, without holding a table in memory.
+A single file per table can be written as well, e.g. for the notebooks.
+"""
+
+import logging
+import os
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shutil
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from src.config import config
+
+# exported tables: columns with their Arrow-types and the exported rows
+TABLES = {
+    'triplets': (
+        pa.schema([('object_id', pa.int32()), ('cindex', pa.string()),
+                   ('context', pa.string())]),
+        "context <> 'NOTHING'"),
+    'types': (
+        pa.schema([('object_id', pa.int32()), ('label', pa.string()),
+                   ('type', pa.string())]),
+        "TRUE"),
+    }
+COMPRESSIONS = ('zstd', 'snappy', 'gzip', 'none')
+
+class TableExporter:
+
+    def __init__(self, table, output, config_file='database.ini', partition_size=1000000,
+                 row_group_size=100000, compression='zstd', itersize=10000,
+                 single_file=False):
+        """Export a table into a directory of parquet-files, one directory per
+        range of object-IDs, e.g. df-triplets.parquet/object_range=1000000/,
+        or into the single file df-<table>.parquet.gzip.
+
+        :param table: str, name of the table, see TABLES
+        :param output: str, directory receiving df-<table>.parquet
+        :param config_file: str, optional, file-name, default database.ini
+        :param partition_size: int, optional, number of object-IDs per partition
+        :param row_group_size: int, optional, maximum number of rows per row-group
+        :param compression: str, optional, codec of the files, see COMPRESSIONS
+        :param itersize: int, optional, number of rows fetched at once
+        :param single_file: bool, optional, write a single file without
+                            partitions, only for full exports"""
+
+        self.table = table
+        self.schema, self.condition = TABLES[table]
+        self.single_file = single_file
+        self.path = os.path.join(output, 'df-' + table +
+                                 ('.parquet.gzip' if single_file else '.parquet'))
+        self.config_file = config_file
+        self.partition_size = partition_size
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.itersize = itersize
+
+    def export(self, incremental=False):
+        """Stream the rows ordered by object-ID into the partitions or the
+        single file. An
+        incremental export adds a file with the rows inserted since the last
+        export to every affected partition; otherwise all files are replaced.
+
+        :param incremental: bool, optional, only export new rows
+        :return: int, number of exported rows"""
+
+        conn = None
+        reader = None
+        try:
+            start_time = timeit.default_timer()
+            params = config(self.config_file)
+            if incremental and self.single_file:
+                raise ValueError("a single file can only be exported completely")
+            conn = psycopg2.connect(**params)
+            cur = conn.cursor()
+            name = 'export_' + self.table
+            last_seq = 0
+            if incremental:
+                cur.execute("SELECT value FROM pipeline_state WHERE name = %s;", (name,))
+                row = cur.fetchone()
+                last_seq = row[0] if row else 0
+            elif os.path.isdir(self.path):
+                shutil.rmtree(self.path)
+            elif os.path.isfile(self.path):
+                os.remove(self.path)
+            # a seq is taken when a row is inserted, not when it is committed:
+            # the lock waits for all writing transactions, e.g. of concurrent
+            # workers, so no row below the watermark is committed afterwards
+            cur.execute("LOCK TABLE " + self.table + " IN SHARE MODE;")
+            cur.execute("SELECT COALESCE(MAX(seq), 0) FROM " + self.table + ";")
+            max_seq = cur.fetchone()[0]
+            conn.commit()
+            # rows are read in a second connection; the state is only written
+            # once all files are complete
+            reader = psycopg2.connect(**params)
+            read_cursor = reader.cursor(name='export')
+            read_cursor.itersize = self.itersize
+            read_cursor.execute("SELECT " + ', '.join(self.schema.names) + " FROM " +
+                                self.table + " WHERE " + self.condition +
+                                " AND seq > %s AND seq <= %s ORDER BY object_id;",
+                                (last_seq, max_seq))
+            # a re-run after an interruption overwrites the files of the same start
+            file_name = 'part-' + str(last_seq) + '.parquet'
+            count = self.write(read_cursor, file_name)
+            read_cursor.close()
+            # the watermark belongs to the partitioned export
+            if not self.single_file:
+                cur.execute("""INSERT INTO pipeline_state (name, value) VALUES (%s, %s)
+                    ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value;""", (name, max_seq))
+            conn.commit()
+            cur.close()
+            minutes = (timeit.default_timer() - start_time) / 60
+            logging.info("Exported " + str(count) + " rows of " + self.table + " to " +
+                         self.path + " in " + str(minutes) + " minutes")
+            return count
+        except (Exception, psycopg2.DatabaseError) as error:
+            print("Export " + self.table + ": " + str(error))
+            logging.critical("Export " + self.table + ": " + str(error))
+            return 0
+        finally:
+            if reader is not None:
+                reader.close()
+            if conn is not None:
+                conn.close()
+
+    def write(self, cursor, file_name):
+        """Write the rows of a cursor ordered by object-ID; only a single file
+        and a single row-group are open at once.
+
+        :param cursor: a cursor object with an executed query
+        :param file_name: str, name of the file in every partition
+        :return: int, number of written rows"""
+
+        writer = None
+        partition = None
+        count = 0
+        try:
+            while True:
+                rows = cursor.fetchmany(self.row_group_size)
+                if not rows:
+                    break
+                start = 0
+                # a fetched batch spans one or more partitions
+                while start < len(rows):
+                    current = 0 if self.single_file else rows[start][0] // self.partition_size
+                    end = start
+                    while end < len(rows) and (self.single_file or
+                                               rows[end][0] // self.partition_size == current):
+                        end += 1
+                    if current != partition:
+                        if writer is not None:
+                            writer.close()
+                        partition = current
+                        writer = self.open(partition, file_name)
+                    writer.write_batch(self.to_batch(rows[start:end]),
+                                       row_group_size=self.row_group_size)
+                    count += end - start
+                    start = end
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+    def open(self, partition, file_name):
+        """:param partition: int, number of the partition
+        :param file_name: str, name of the file
+        :return: ParquetWriter, writer of the file in the partition"""
+
+        compression = None if self.compression == 'none' else self.compression
+        if self.single_file:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return pq.ParquetWriter(self.path, self.schema, compression=compression)
+        directory = os.path.join(self.path, 'object_range=' +
+                                 str(partition * self.partition_size))
+        os.makedirs(directory, exist_ok=True)
+        return pq.ParquetWriter(os.path.join(directory, file_name), self.schema,
+                                compression=compression)
+
+    def to_batch(self, rows):
+        """:param rows: array_like, list of tuples in the order of the schema
+        :return: RecordBatch, the rows as columns"""
+
+        columns = list(zip(*rows))
+        return pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema)
+
+def export_tables(output, tables=tuple(TABLES), incremental=False, **kwargs):
+    """Export several tables concurrently, each in its own connection.
+
+    :param output: str, directory receiving the exports
+    :param tables: array_like, optional, names of the tables, default all
+    :param incremental: bool, optional, only export rows added since the last
+                        export
+    :param kwargs: optional, settings of TableExporter, e.g. compression
+    :return: dict, table mapped to the number of exported rows"""
+
+    exporters = [TableExporter(table, output, **kwargs) for table in tables]
+    with ThreadPoolExecutor(max_workers=len(exporters)) as executor:
+        counts = executor.map(lambda exporter: exporter.export(incremental), exporters)
+        return dict(zip(tables, counts))
@@ -5,36 +5,47 @@ Created on Thu Feb 13 15:57:30 2020
 
 @author: selin
 """
+import argparse
 import gc
 import locale
 import logging
 import os
 import psycopg2
+import src.metrics as metrics
+import src.queries as queries
 import time
 import timeit
+from cache import DiskCache
 from config import config
-from Filler import (ObjectFiller, RelationFiller, TripletFiller, ObjectTypeFiller)
+from dump import ingest, load_state, save_state
+from frontier import POLICIES, Frontier
+from Filler import (ObjectFiller, RelationFiller, TripletFiller, ObjectTypeFiller,
+                    create_pool)
 
-def join_table_values():
-    """"Update q_items; insert all values from other tables to avoid joins."""
+def join_table_values(incremental=False):
+    """"Update q_items; insert all values from other tables to avoid joins.
+    :param incremental: bool, optional, only join q_items inserted since the last 
+                        call, and q_items whose value was inserted since then"""
     try:
         params = config()
         connection = psycopg2.connect(**params)
         cursor = connection.cursor()
-        sql = """SELECT label, relation_id FROM p_relation;"""
-        cursor.execute(sql)
-        insert_list = cursor.fetchall()
-        insert_sql = """UPDATE q_item set relation_label=%s 
-            WHERE relation_id=%s AND relation_label = '?';"""
-        cursor.executemany(insert_sql, insert_list)
-        connection.commit()
-        sql = """SELECT distinct label, aliases, q_id, label from q_item;"""
-        cursor.execute(sql)
-        insert_list = cursor.fetchall()
-        insert_sql = """UPDATE q_item set value = %s, value_text = %s
-            WHERE value_id = %s AND value_text = '?' 
-            AND NOT EXISTS (SELECT 1 FROM q_item WHERE value = %s);"""
-        cursor.executemany(insert_sql, insert_list)
+        last_seq = 0
+        if incremental:
+            sql = """SELECT value FROM pipeline_state WHERE name = 'join_table_values';"""
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            last_seq = row[0] if row else 0
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM q_item;")
+        max_seq = cursor.fetchone()[0]
+        sql = """UPDATE q_item q SET relation_label = p.label FROM p_relation p
+            WHERE q.relation_id = p.relation_id AND q.relation_label = '?'
+            AND q.seq > %s;"""
+        cursor.execute(sql, (last_seq,))
+        cursor.execute(queries.JOIN_VALUES, (last_seq, last_seq))
+        sql = """INSERT INTO pipeline_state (name, value) VALUES ('join_table_values', %s)
+            ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value;"""
+        cursor.execute(sql, (max_seq,))
         connection.commit()
         """# ignore all values which start with a '+'
         sql = "UPDATE q_item SET has_context=2 WHERE value LIKE '+%';"
@@ -45,27 +56,21 @@ def join_table_values():
     except (Exception, psycopg2.DatabaseError) as error:
         print(error) 
 
-def clean_up_triplets():
-    """Update q_items in order to avoid looking up triplets multiple times."""
+def clean_up_triplets(unretrieved=False):
+    """Update q_items in order to avoid looking up triplets multiple times.
+    :param unretrieved: bool, optional, mark the q_items whose article could 
+                        not be retrieved by the last TripletFiller with 
+                        has_context 3, thus later batches do not request it again"""
     
     try:
         params = config()
         connection = psycopg2.connect(**params)
         cursor = connection.cursor()
-        sql = """UPDATE q_item q set has_context = 2 WHERE EXISTS
-                (SELECT 1 FROM triplets tr 
-                WHERE q.q_id = tr.object_id AND 
-                q.relation_id = tr.relation_id AND 
-                q.value_id = tr.value_id AND
-                tr.context = 'NOTHING');"""
-        cursor.execute(sql)
-        sql = """UPDATE q_item q set has_context = 1 WHERE EXISTS
-                (SELECT 1 FROM triplets tr 
-                WHERE q.q_id = tr.object_id AND 
-                q.relation_id = tr.relation_id AND 
-                q.value_id = tr.value_id AND
-                tr.context <> 'NOTHING');"""
-        cursor.execute(sql)
+        cursor.execute(queries.MARK_NOTHING)
+        cursor.execute(queries.MARK_CONTEXT)
+        if unretrieved:
+            cursor.execute(queries.MARK_UNRETRIEVED)
+            logging.info("Articles of " + str(cursor.rowcount) + " q_items not retrieved")
         sql = """DELETE FROM triplets WHERE context='NOTHING';"""
         cursor.execute(sql)
         connection.commit()
@@ -102,28 +107,148 @@ def calculate_statistics(start_time, seconds):
     except (Exception, psycopg2.DatabaseError) as error:
         logging.error(error)  
         
-def run(seeds = []):
+def run(seeds = [], pool=None, cache=None, n_process=1, streaming=False):
     """Entry point of extraction pipeline.
-    :param seeds: array_like, an optional set of Q-IDs provided as starting-seeds"""
+    :param seeds: array_like, an optional set of Q-IDs provided as starting-seeds
+    :param pool: Pool, optional, worker-pool shared by all stages
+    :param cache: DiskCache, optional, local cache of entities and articles
+    :param n_process: int, optional, number of processes parsing the articles
+    :param streaming: bool, optional, overlap fetching, parsing and writing of 
+                      the chunks within every stage"""
     try:
         logging.info("Starting execution")
         logging.info("Getting objects")
         locale.setlocale(locale.LC_TIME, 'de_DE.utf8')
-        filler = ObjectFiller(seeds = seeds)
-        filler.fill()
+        filler = ObjectFiller(seeds = seeds, cache=cache, streaming=streaming)
+        filler.fill(pool=pool)
         logging.info("Getting relations")
-        re_filler = RelationFiller()
-        re_filler.fill()
-        join_table_values()
+        re_filler = RelationFiller(cache=cache, streaming=streaming)
+        re_filler.fill(pool=pool)
+        join_table_values(incremental=True)
         logging.info("Getting triplets")        
-        triplet_filler = TripletFiller()
-        triplet_filler.fill()
+        triplet_filler = TripletFiller(cache=cache, n_process=n_process, 
+                                       streaming=streaming)
+        triplet_filler.fill(pool=pool)
+        clean_up_triplets()
+    except (Exception) as e:
+        print(e)
+        logging.critical('extraction_pipeline.py: ' + str(e))
+
+def crawl(seeds, frontier, batch_size=500, pool=None, cache=None, n_process=1, 
+          resume=False, streaming=False):
+    """Entry point of extraction pipeline crawling from the seeds. Batches of
+    objects are taken from the frontier and passed through all stages, i.e.
+    objects, new relations, values and triplets, before the next batch; the
+    values of a batch extend the frontier until its budgets are reached.
+    :param seeds: array_like, a set of Q-IDs provided as starting-seeds
+    :param frontier: Frontier, the persistent frontier with policy and budgets
+    :param batch_size: int, optional, number of objects taken at once
+    :param pool: Pool, optional, worker-pool shared by all stages
+    :param cache: DiskCache, optional, local cache of entities and articles
+    :param n_process: int, optional, number of processes parsing the articles
+    :param resume: bool, optional, continue an interrupted stage after its last
+                   committed chunk instead of starting it over
+    :param streaming: bool, optional, overlap fetching, parsing and writing of 
+                      the chunks within every stage
+    :return: bool, True if the frontier was crawled completely; the pipeline 
+             stops at the first failing stage"""
+    try:
+        logging.info("Starting crawl")
+        locale.setlocale(locale.LC_TIME, 'de_DE.utf8')
+        frontier.seed(seeds)
+        frontier.reset()
+        batch = frontier.claim(batch_size)
+        while batch:
+            logging.info("Getting " + str(len(batch)) + " objects")
+            fill(ObjectFiller(seeds=batch, cache=cache, streaming=streaming), pool)
+            added = frontier.expand(batch)
+            logging.info("Getting relations")
+            fill(RelationFiller(cache=cache, streaming=streaming), pool)
+            join_table_values(incremental=True)
+            logging.info("Getting triplets")
+            fill(TripletFiller(cache=cache, n_process=n_process, resume=resume, 
+                               streaming=streaming), pool)
+            clean_up_triplets(unretrieved=True)
+            logging.info("Added " + str(added) + " objects to frontier " + 
+                         str(frontier.get_stats()))
+            batch = frontier.claim(batch_size)
+            gc.collect()
+        return True
+    except (Exception) as e:
+        print(e)
+        logging.exception('extraction_pipeline.py: ' + str(e))
+        return False
+
+def fill(filler, pool):
+    """Run a stage of the pipeline; raise if it did not complete, its committed 
+    chunks are continued with --resume.
+    :param filler: Filler, the stage
+    :param pool: Pool, the shared worker-pool"""
+    
+    if not filler.fill(pool=pool):
+        raise Exception(type(filler).__name__ + " stopped, continue with --resume")
+
+def run_offline(seeds, dump_path, depth=10, pool=None, state_file=None, n_process=1,
+                resume=False):
+    """Entry point of extraction pipeline reading wikidata-entities from a dump
+    instead of the API. Objects reachable from the seeds are filled in depth 
+    rounds, each a full pass over the dump; an interrupted ingestion 
+    continues at the round and offset stored in state_file, a compressed dump
+    is still decompressed up to that offset.
+    :param seeds: array_like, a set of Q-IDs provided as starting-seeds
+    :param dump_path: str, path of a wikidata-dump, e.g. latest-all.json.bz2
+    :param depth: int, optional, number of rounds following relation-values
+    :param pool: Pool, optional, worker-pool shared by all stages
+    :param state_file: str, optional, file to store the progress in
+    :param n_process: int, optional, number of processes parsing the articles
+    :param resume: bool, optional, continue an interrupted TripletFiller after
+                   its last committed chunk"""
+    try:
+        logging.info("Starting offline execution")
+        locale.setlocale(locale.LC_TIME, 'de_DE.utf8')
+        state = load_state(state_file, dump_path)
+        for n in range(state['round'], depth + 2):
+            if n == 0:
+                fillers = [ObjectFiller(seeds=seeds)]
+            elif n <= depth:
+                fillers = [ObjectFiller()]
+            else:
+                fillers = [RelationFiller(), ObjectTypeFiller()]
+            logging.info("Dump round " + str(n))
+            ingest(fillers, dump_path, pool=pool, offset=state['offset'], 
+                   state=state, state_file=state_file)
+            state = {'path': dump_path, 'round': n + 1, 'offset': 0}
+            save_state(state_file, state)
+        join_table_values()
+        logging.info("Getting triplets")
+        triplet_filler = TripletFiller(n_process=n_process, resume=resume)
+        fill(triplet_filler, pool)
         clean_up_triplets()
     except (Exception) as e:
         print(e)
         logging.critical('extraction_pipeline.py: ' + str(e))
         
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract triplets from wikidata and wikipedia.")
+    parser.add_argument('--dump', help="read entities from a wikidata-dump instead of the API; "
+                        "every depth-round is a full pass over the dump, resuming skips the "
+                        "parsing but not the decompression of its start")
+    parser.add_argument('--depth', type=int, default=10, 
+                        help="maximum distance of crawled objects from the seeds")
+    parser.add_argument('--max-items', type=int, help="maximum number of crawled objects")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='breadth',
+                        help="order of crawling: lowest depth or most referred first")
+    parser.add_argument('--batch', type=int, default=500, help="objects crawled at once")
+    parser.add_argument('--resume', action='store_true', 
+                        help="continue an interrupted stage after its last committed chunk")
+    parser.add_argument('--streaming', action='store_true', 
+                        help="overlap fetching, parsing and writing within every stage")
+    parser.add_argument('--metrics-port', type=int, 
+                        help="serve metrics for Prometheus on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--nlp-processes', type=int, default=1, 
+                        help="processes parsing the articles with nlp.pipe next to "
+                        "the worker-pool; with 1 the workers parse the articles")
+    args = parser.parse_args()
     start_time = timeit.default_timer()
     seconds = 0
     cwd = os.getcwd()
@@ -132,17 +257,32 @@ if __name__ == '__main__':
     logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s",
                         datefmt="%Y-%m-%d %H:%M:%S", filemode='w', level=logging.INFO,
                         filename = cwd + '/logs/db-filler-log' + str(time.time()).replace('.','') + '.log')
+    # timings per stage and chunk, next to the log
+    metrics.configure(cwd + '/logs/metrics' + str(time.time()).replace('.','') + '.jsonl', 
+                      args.metrics_port)
     # 42: Douglas Adams, 34660: Joanne K. Rowling, 5879: J.Goethe, 1339: J.S.Bach, 
     # 1299: The Beatles, 47875: Robbie Williams, 584: Rhine, 513: Mount Everest, 
     # 207773: Howard Shore, 1374: Matterhorn
     seeds = [[42],[34660],[5879],[1339],[1299],[47875],[584],[513],[207773],[1374]]
-    run(seeds)
-    for i in range(10):
-        run(seeds=None)
-        gc.collect()
-    logging.info("Fill object types")
-    obj_val_filler = ObjectTypeFiller()
-    obj_val_filler.fill()
+    # one pool for all rounds; it retrieves entities and articles, the articles 
+    # are parsed in batches by separate spaCy-processes
+    pool = create_pool()
+    if args.dump:
+        run_offline(seeds, args.dump, args.depth, pool, cwd + '/dump-state.json', 
+                    args.nlp_processes, args.resume)
+    else:
+        # entities and articles of earlier runs are read from disk
+        cache = DiskCache(cwd + '/cache')
+        frontier = Frontier(max_depth=args.depth, max_items=args.max_items, 
+                            policy=args.policy)
+        if crawl(seeds, frontier, args.batch, pool, cache, args.nlp_processes, 
+                 args.resume, args.streaming):
+            logging.info("Fill object types")
+            obj_val_filler = ObjectTypeFiller(cache=cache, streaming=args.streaming)
+            obj_val_filler.fill(pool=pool)
+    pool.close()
+    pool.join()
     gc.collect()
     logging.info("Execution finished.")
-    calculate_statistics(start_time, seconds)
\ No newline at end of file
+    calculate_statistics(start_time, seconds)
+    metrics.shutdown()
\ No newline at end of file
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar  4 14:18:53 2020
+
+@author: selin
+"""
+
+import aiohttp
+import asyncio
+import json
+import logging
+import random
+import src.metrics as metrics
+import src.utils as utils
+import timeit
+from urllib.parse import urlsplit
+
+ENTITY_URL = "https://www.wikidata.org/wiki/Special:EntityData/{}.json"
+API_URL = "https://www.wikidata.org/w/api.php"
+# wbgetentities accepts at most 50 IDs per request
+MAX_BATCH_SIZE = 50
+# only these parts of an entity are read by the fillers
+BATCH_PARAMS = {'action': 'wbgetentities', 'format': 'json',
+                'props': 'labels|aliases|sitelinks/urls|claims',
+                'languages': 'de|en', 'sitefilter': 'dewiki'}
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+class RateLimiter:
+
+    def __init__(self, rate):
+        """:param rate: float, maximal number of requests per second and host,
+                        unlimited if None"""
+
+        self.rate = rate
+        self.locks = {}
+        self.next_slot = {}
+
+    async def wait(self, host):
+        """Sleep until the next request to host is allowed.
+
+        :param host: str, the host to send a request to"""
+
+        if not self.rate:
+            return
+        loop = asyncio.get_running_loop()
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = loop.time()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class EntityFetcher:
+
+    def __init__(self, url=ENTITY_URL, api_url=API_URL, batch_size=MAX_BATCH_SIZE,
+                 max_in_flight=20, rate=50.0, retries=3, backoff=0.5, timeout=30,
+                 cache=None):
+        """:param url: str, optional, URL-template of an entity, {} is the ID
+        :param api_url: str, optional, URL of the wikibase-API
+        :param batch_size: int, optional, number of IDs per wbgetentities-request,
+                           every entity is requested from url if 1
+        :param max_in_flight: int, optional, maximal number of open requests
+        :param rate: float, optional, maximal requests per second and host
+        :param retries: int, optional, number of retries of a failed request
+        :param backoff: float, optional, initial waiting time before a retry
+        :param timeout: float, optional, timeout of a request in seconds
+        :param cache: DiskCache, optional, local cache to read through"""
+
+        self.url = url
+        self.api_url = api_url
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+
+    def get_entities(self, item_ids):
+        """Retrieve many wikidata-entities concurrently.
+
+        :param item_ids: array_like, IDs of entities to retrieve (e.g. Q42, P31)
+        :return: dict, ID mapped to the entity as dictionary; IDs which could
+                 not be retrieved are missing"""
+
+        return asyncio.run(self.fetch_all(item_ids))
+
+    async def fetch_all(self, item_ids):
+        """Coroutine retrieving many wikidata-entities with a pooled client.
+
+        :param item_ids: array_like, IDs of entities to retrieve
+        :return: dict, ID mapped to the entity as dictionary"""
+
+        item_ids = list(dict.fromkeys(i for i in item_ids if i))
+        cached = {}
+        if self.cache:
+            for item_id in item_ids:
+                content = self.cache.get(item_id)
+                if content:
+                    cached[item_id] = json.loads(content)
+            item_ids = [i for i in item_ids if i not in cached]
+        if not item_ids:
+            return cached
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        limiter = RateLimiter(self.rate)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            if self.batch_size > 1:
+                batches = list(utils.get_chunks(item_ids, self.batch_size))
+                tasks = [self.fetch_batch(session, semaphore, limiter, batch)
+                         for batch in batches]
+            else:
+                tasks = [self.fetch(session, semaphore, limiter, item_id)
+                         for item_id in item_ids]
+            results = await asyncio.gather(*tasks)
+        entities = {}
+        for result in results:
+            entities.update(result)
+        if self.cache:
+            for item_id, entity in entities.items():
+                self.cache.put(item_id, json.dumps(entity))
+        entities.update(cached)
+        return entities
+
+    async def fetch(self, session, semaphore, limiter, item_id):
+        """Coroutine retrieving a single wikidata-entity from Special:EntityData.
+
+        :param session: ClientSession, the pooled HTTP-client
+        :param semaphore: Semaphore, bounds the number of open requests
+        :param limiter: RateLimiter, the per-host rate-limit
+        :param item_id: str, ID of entity to retrieve (e.g. Q42)
+        :return: dict, the ID mapped to the entity, empty if not retrievable"""
+
+        link = self.url.format(item_id)
+        data = await self.request(session, semaphore, limiter, link)
+        if data and 'entities' in data:
+            return utils.resolve_entities([item_id], data['entities'])
+        return {}
+
+    async def fetch_batch(self, session, semaphore, limiter, item_ids):
+        """Coroutine retrieving up to 50 wikidata-entities with one 
+        wbgetentities-request.
+
+        :param session: ClientSession, the pooled HTTP-client
+        :param semaphore: Semaphore, bounds the number of open requests
+        :param limiter: RateLimiter, the per-host rate-limit
+        :param item_ids: array_like, IDs of entities to retrieve
+        :return: dict, ID mapped to the entity as dictionary"""
+
+        params = dict(BATCH_PARAMS, ids='|'.join(item_ids))
+        data = await self.request(session, semaphore, limiter, self.api_url, params)
+        if data and 'entities' in data:
+            entities = utils.resolve_entities(item_ids, data['entities'])
+            # a redirect requested together with its target may be left out of
+            # the response, it is requested on its own
+            for item_id in item_ids:
+                if item_id not in entities and item_id not in data['entities']:
+                    entities.update(await self.fetch(session, semaphore, limiter, item_id))
+            return entities
+        if data and 'error' in data:
+            logging.critical("EntityFetcher: " + str(data['error'].get('info')) +
+                             " while requesting " + '|'.join(item_ids))
+        return {}
+
+    async def request(self, session, semaphore, limiter, link, params=None, headers=None):
+        """Coroutine sending a GET-request, retried with exponential backoff on 
+        connection-errors and overload.
+
+        :param session: ClientSession, the pooled HTTP-client
+        :param semaphore: Semaphore, bounds the number of open requests
+        :param limiter: RateLimiter, the per-host rate-limit
+        :param link: str, the URL to request
+        :param params: dict, optional, query-parameters
+        :param headers: dict, optional, request-headers
+        :return: the response as read by read, None if not retrievable"""
+
+        host = urlsplit(link).netloc
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    await limiter.wait(host)
+                    start_time = timeit.default_timer()
+                    status = 'error'
+                    try:
+                        async with session.get(link, params=params, 
+                                               headers=headers) as response:
+                            status = str(response.status)
+                            if response.status not in RETRY_STATUS:
+                                return await self.read(response)
+                            retry_after = response.headers.get('Retry-After', '')
+                            if retry_after.isdigit():
+                                delay = max(delay, int(retry_after))
+                            error = "HTTP " + str(response.status)
+                    finally:
+                        metrics.observe('pipeline_http_request_seconds', 
+                                        timeit.default_timer() - start_time,
+                                        host=host, status=status)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = type(e).__name__ + " " + str(e)
+            if attempt < self.retries:
+                await asyncio.sleep(delay * (1 + random.random() / 2))
+                delay *= 2
+        logging.critical("EntityFetcher: " + error + " while requesting " + link)
+
+    async def read(self, response):
+        """:param response: ClientResponse, a response which is not retried
+        :return: dict, the decoded JSON-response, None if not successful"""
+
+        if response.status != 200:
+            return
+        return await response.json(content_type=None)
+
+class ArticleFetcher(EntityFetcher):
+
+    def __init__(self, **kwargs):
+        """Client retrieving rendered wikipedia-articles concurrently. Cached 
+        articles are revalidated with their ETag once they are stale, like 
+        utils.get_text.
+
+        :param kwargs: optional, settings of EntityFetcher, e.g. max_in_flight"""
+
+        super().__init__(**kwargs)
+
+    def get_texts(self, urls):
+        """Retrieve many pages concurrently.
+
+        :param urls: array_like, URLs of the pages
+        :return: dict, URL mapped to the content of the page; URLs which could 
+                 not be retrieved are missing"""
+
+        return asyncio.run(self.fetch_texts(urls))
+
+    async def fetch_texts(self, urls):
+        """Coroutine retrieving many pages with a pooled client.
+
+        :param urls: array_like, URLs of the pages
+        :return: dict, URL mapped to the content of the page"""
+
+        urls = list(dict.fromkeys(urls))
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        limiter = RateLimiter(self.rate)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            texts = await asyncio.gather(*[self.fetch_text(session, semaphore, limiter, url)
+                                           for url in urls])
+        return {url: text for url, text in zip(urls, texts) if text is not None}
+
+    async def fetch_text(self, session, semaphore, limiter, url):
+        """Coroutine retrieving a page through the cache.
+
+        :param session: ClientSession, the pooled HTTP-client
+        :param semaphore: Semaphore, bounds the number of open requests
+        :param limiter: RateLimiter, the per-host rate-limit
+        :param url: str, URL of the page
+        :return: str, content of the page, None if not retrievable"""
+
+        entry = self.cache.lookup(url) if self.cache else None
+        headers = {}
+        if entry:
+            content, etag, fresh = entry
+            if fresh:
+                self.cache.hits += 1
+                return content
+            if etag:
+                headers['If-None-Match'] = etag
+        response = await self.request(session, semaphore, limiter, url, headers=headers)
+        if response is None:
+            return None
+        status, text, etag = response
+        if entry and status == 304:
+            self.cache.touch(url)
+            self.cache.hits += 1
+            return content
+        if self.cache:
+            self.cache.misses += 1
+            if status == 200:
+                self.cache.put(url, text, etag)
+        return text
+
+    async def read(self, response):
+        """:param response: ClientResponse, a response which is not retried
+        :return: tuple, status, content and ETag of the response"""
+
+        return response.status, await response.text(), response.headers.get('ETag')
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 27 09:48:15 2020
+
+@author: selin
+"""
+
+import logging
+import psycopg2
+from src.config import config
+
+# order in which pending objects are claimed; seeds (depth 0) come first
+POLICIES = {
+    'breadth': 'depth, priority DESC, q_id',
+    'degree': 'depth > 0, priority DESC, depth, q_id',
+    }
+
+# pending objects in the order of a policy are marked active
+CLAIM = """UPDATE frontier SET state = 'active' WHERE q_id IN
+    (SELECT q_id FROM frontier WHERE state = 'pending'
+    ORDER BY %s LIMIT %%s) RETURNING q_id;"""
+
+# values of the objects of a claimed batch, with their depth and the number of
+# objects referring to them as degree
+FOUND = """SELECT q.value_id AS q_id, MIN(f.depth) + 1 AS depth,
+        COUNT(DISTINCT q.q_id) AS degree
+    FROM q_item q JOIN frontier f ON f.q_id = q.q_id
+    WHERE f.q_id = ANY(%s) AND f.depth < %s AND q.value_id <> 0
+    GROUP BY q.value_id"""
+
+class Frontier:
+
+    def __init__(self, config_file='database.ini', max_depth=10, max_items=None,
+                 policy='breadth'):
+        """Persistent frontier of the crawl: every object reachable from the
+        seeds is added once with its depth and the number of objects referring
+        to it as priority. Objects are claimed in batches and marked done when
+        their values were added, so an interrupted crawl continues where it
+        stopped.
+
+        :param config_file: str, optional, file-name, default database.ini
+        :param max_depth: int, optional, values of objects at this depth are
+                          not followed
+        :param max_items: int, optional, maximum number of objects in the
+                          frontier, unlimited if None
+        :param policy: str, optional, breadth (lowest depth first) or degree
+                       (most referred first), see POLICIES"""
+
+        self.config_file = config_file
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.order = POLICIES[policy]
+
+    def execute(self, sql, args=None, fetch=False):
+        """Execute a statement in its own transaction.
+
+        :param sql: str, the statement
+        :param args: tuple, optional, parameters of the statement
+        :param fetch: bool, optional, return the resulting rows
+        :return: array_like, the rows if fetch, the number of rows otherwise
+        :raises: psycopg2.DatabaseError, e.g. if the connection was lost"""
+
+        conn = None
+        try:
+            params = config(self.config_file)
+            conn = psycopg2.connect(**params)
+            cur = conn.cursor()
+            cur.execute(sql, args)
+            result = cur.fetchall() if fetch else cur.rowcount
+            conn.commit()
+            cur.close()
+            return result
+        except (Exception, psycopg2.DatabaseError) as error:
+            print("Frontier: " + str(error))
+            logging.critical("Frontier: " + str(error))
+            # an empty claim would end the crawl as complete
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def seed(self, seeds):
+        """Add the seeds at depth 0; seeds crawled before are left as they are.
+
+        :param seeds: array_like, list of rows containing a Q-ID
+        :return: int, number of added seeds"""
+
+        return self.execute("""INSERT INTO frontier (q_id, depth)
+            SELECT UNNEST(%s::INTEGER[]), 0 ON CONFLICT DO NOTHING;""",
+            ([row[0] for row in seeds],))
+
+    def reset(self):
+        """Return the objects claimed by an interrupted crawl to the frontier.
+
+        :return: int, number of returned objects"""
+
+        return self.execute("UPDATE frontier SET state = 'pending' WHERE state = 'active';")
+
+    def claim(self, size):
+        """Claim the next batch of pending objects according to the policy.
+
+        :param size: int, maximum number of objects
+        :return: array_like, list of rows containing a Q-ID"""
+
+        return sorted(self.execute(CLAIM % self.order, (size,), fetch=True))
+
+    def expand(self, batch):
+        """Add the values of a filled batch to the frontier and mark the batch
+        done. Values already pending gain priority and keep the lower depth;
+        new values are added up to the size-budget, most referred first.
+
+        :param batch: array_like, list of rows containing a Q-ID
+        :return: int, number of added objects"""
+
+        ids = [row[0] for row in batch]
+        self.execute("""UPDATE frontier f SET priority = f.priority + v.degree,
+            depth = LEAST(f.depth, v.depth) FROM (%s) v
+            WHERE f.q_id = v.q_id AND f.state = 'pending';""" % FOUND,
+            (ids, self.max_depth))
+        limit = None
+        if self.max_items is not None:
+            count = self.execute("SELECT COUNT(*) FROM frontier;", fetch=True)
+            limit = max(self.max_items - count[0][0], 0)
+        added = self.execute("""INSERT INTO frontier (q_id, depth, priority)
+            SELECT q_id, depth, degree FROM (%s) v WHERE NOT EXISTS
+            (SELECT 1 FROM frontier f WHERE f.q_id = v.q_id)
+            ORDER BY degree DESC, q_id LIMIT %%s ON CONFLICT DO NOTHING;""" % FOUND,
+            (ids, self.max_depth, limit))
+        self.execute("UPDATE frontier SET state = 'done' WHERE q_id = ANY(%s);", (ids,))
+        return added
+
+    def get_stats(self):
+        """:return: dict, number of objects per state"""
+
+        return dict(self.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state;",
+                                 fetch=True))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 24 09:52:14 2020
+
+@author: selin
+
+Extract the text of all paragraphs of a rendered wikipedia-article. Used by
+the extraction-pipeline; the question-generator (notebook) holds a copy in a
+cell, therefore it only depends on the standard library.
+"""
+
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# the text within these elements is not part of a paragraph's text
+SKIPPED = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+# elements without content and end-tag
+VOID = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+                  'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+                  'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+                  'nextid', 'spacer'))
+# whitespace is kept as is within these elements only
+PRESERVED = frozenset(('pre', 'textarea'))
+ASCII_SPACES = str.maketrans('', '', '\x20\x0a\x09\x0c\x0d')
+CHUNK_SIZE = 64 * 1024
+
+SEPARATORS = str.maketrans({';': ','})
+# quotes, references like [1], doubled commas and pronunciations (Audio-Datei ?/i)
+REMOVED = re.compile(r"[\'`\"']|(\[[^]]*\])|(,,)|(\( .*\?\/i\)\s)")
+# same without pronunciations; only used if the text cannot contain one, since
+# the greedy .* of that alternative makes every '( ' scan the rest of the text
+REMOVED_WITHOUT_AUDIO = re.compile(r"[\'`\"']|(\[[^]]*\])|(,,)")
+
+class ParagraphParser(HTMLParser):
+
+    def __init__(self):
+        """Incremental parser collecting the text of every <p>-element. Like
+        BeautifulSoup's html.parser-tree, unclosed elements are closed by the
+        end-tag of an enclosing element, strings of whitespace between tags are
+        reduced to a single blank or newline and nested paragraphs contain the
+        text of their children."""
+
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.skipped = 0
+        self.preserved = 0
+        self.data = []
+        self.open = []
+        self.paragraphs = []
+        self.done = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.end_data()
+        if tag in VOID:
+            return
+        self.stack.append(tag)
+        if tag == 'p':
+            self.open.append(len(self.paragraphs))
+            self.paragraphs.append([])
+        elif tag in SKIPPED:
+            self.skipped += 1
+        elif tag in PRESERVED:
+            self.preserved += 1
+
+    def handle_endtag(self, tag):
+        self.end_data()
+        if tag not in self.stack:
+            return
+        while True:
+            name = self.stack.pop()
+            if name == 'p':
+                self.open.pop()
+            elif name in SKIPPED:
+                self.skipped -= 1
+            elif name in PRESERVED:
+                self.preserved -= 1
+            if name == tag:
+                break
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def end_data(self):
+        """Add the string read since the last tag to all open paragraphs."""
+
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if not self.preserved and not data.translate(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if self.open and not self.skipped:
+            for i in self.open:
+                self.paragraphs[i].append(data)
+
+    def handle_comment(self, data):
+        self.end_data()
+
+    def handle_decl(self, decl):
+        self.end_data()
+
+    def handle_pi(self, data):
+        self.end_data()
+
+    def handle_charref(self, name):
+        if name[0] in 'xX':
+            code = int(name[1:], 16)
+        else:
+            code = int(name)
+        data = None
+        if code < 256:
+            # numeric references below 256 are often meant as windows-1252
+            try:
+                data = bytes([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        self.handle_data(html5.get(name + ';', '&' + name))
+
+    def unknown_decl(self, data):
+        self.end_data()
+        if data.upper().startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+            self.end_data()
+
+    def pop_paragraphs(self):
+        """:return: array_like, texts of the paragraphs completed since the
+                    last call, in the order of their start-tags"""
+
+        end = self.open[0] if self.open else len(self.paragraphs)
+        texts = [''.join(p) for p in self.paragraphs[self.done:end]]
+        for i in range(self.done, end):
+            self.paragraphs[i] = None
+        self.done = max(self.done, end)
+        return texts
+
+def paragraphs(html, chunk_size=CHUNK_SIZE):
+    """Parse html in a single pass and yield the text of every paragraph as
+    soon as it is complete.
+
+    :param html: str, the html of an article
+    :param chunk_size: int, optional, number of characters parsed at once
+    :yield: str, text of a paragraph"""
+
+    parser = ParagraphParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        yield from parser.pop_paragraphs()
+    parser.close()
+    parser.end_data()
+    parser.open = []
+    yield from parser.pop_paragraphs()
+
+def paragraph_text(html):
+    """:param html: str, the html of an article
+    :return: str, text of all paragraphs"""
+
+    return ''.join(paragraphs(html))
+
+def normalize(content):
+    """Pre-process the text of an article: semicolons and ' |' become commas,
+    whitespace is collapsed, quotes, references and pronunciations are removed.
+
+    :param content: str, text of an article
+    :return: str, the normalized text"""
+
+    content = content.translate(SEPARATORS).replace(' |', ',')
+    words = content.split()
+    collapsed = ' '.join(words)
+    if content and content[0].isspace():
+        collapsed = ' ' + collapsed
+    if words and content[-1].isspace():
+        collapsed = collapsed + ' '
+    removed = REMOVED if '?/i)' in collapsed else REMOVED_WITHOUT_AUDIO
+    return removed.sub('', collapsed)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 20 10:17:45 2020
+
+@author: selin
+"""
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+# aliases using these constructs depend on their position in the text and are
+# never combined into a prefilter
+POSITIONAL = re.compile(r'\(\?|\^|\$|\\[AZ0-9]')
+
+@lru_cache(maxsize=4096)
+def compile_pattern(pattern):
+    """Compile a pattern once per process; aliases and relations recur in
+    many articles.
+
+    :param pattern: str, a regular expression
+    :return: Pattern, the compiled expression"""
+
+    return re.compile(pattern)
+
+def word_pattern(text):
+    """:param text: str, an alias, relation or value (itself a regular expression)
+    :return: Pattern, text enclosed by word-boundaries"""
+
+    return compile_pattern(r'\b%s\b' % text)
+
+class SentenceWindows:
+
+    def __init__(self, sentences):
+        """The windows of three consecutive sentences of an article, i.e. the
+        text searched for aliases, relations and values. All windows are
+        slices of the article joined once, so every window-text is built once
+        and every search result is reused.
+
+        :param sentences: array_like, list of spaCy-spans"""
+
+        self.sentences = sentences
+        texts = [s.text for s in sentences]
+        self.text = ' '.join(texts)
+        self.starts = []
+        self.ends = []
+        offset = 0
+        for t in texts:
+            self.starts.append(offset)
+            offset += len(t)
+            self.ends.append(offset)
+            offset += 1
+        self._positions = {s.start: i for i, s in enumerate(sentences)}
+        self._windows = {}
+        self._contexts = {}
+        self._annotations = {}
+        self._results = {}
+
+    def __len__(self):
+        return max(len(self.sentences) - 2, 0)
+
+    def indexes(self):
+        """:return: range, positions of the middle sentences of all windows"""
+
+        return range(1, len(self.sentences) - 1)
+
+    def position(self, sentence):
+        """:param sentence: Span, the middle sentence of a window
+        :return: int, position of the sentence in the article"""
+
+        return self._positions[sentence.start]
+
+    def window(self, i):
+        """:param i: int, position of the middle sentence
+        :return: str, the three sentences separated by a blank"""
+
+        if i not in self._windows:
+            self._windows[i] = self.text[self.starts[i-1]:self.ends[i+1]]
+        return self._windows[i]
+
+    def context(self, i):
+        """:param i: int, position of the middle sentence
+        :return: str, the three sentences separated by ' ||| '"""
+
+        if i not in self._contexts:
+            self._contexts[i] = ' ||| '.join(s.text for s in self.sentences[i-1:i+2])
+        return self._contexts[i]
+
+    def annotation(self, i, attribute):
+        """:param i: int, position of the middle sentence
+        :param attribute: str, token-attribute, e.g. tag_ or dep_
+        :return: str, the attributes of the three sentences separated by ' ||| '"""
+
+        key = (i, attribute)
+        if key not in self._annotations:
+            self._annotations[key] = ' ||| '.join(', '.join([getattr(t, attribute) for t in s])
+                                                  for s in self.sentences[i-1:i+2])
+        return self._annotations[key]
+
+    def search(self, pattern, i, context=False):
+        """Search a window once per pattern.
+
+        :param pattern: Pattern, compiled expression
+        :param i: int, position of the middle sentence
+        :param context: bool, optional, search the context instead of the window
+        :return: bool, whether pattern occurs in the window"""
+
+        key = (pattern, i, context)
+        if key not in self._results:
+            text = self.context(i) if context else self.window(i)
+            self._results[key] = pattern.search(text) is not None
+        return self._results[key]
+
+    def candidates(self, pattern):
+        """Scan the article once and return the windows containing a match. A
+        window is returned as soon as a match starts within it, thus the result
+        may contain windows without a match but never misses one.
+
+        :param pattern: Pattern, compiled expression
+        :return: set, positions of the middle sentences of candidate windows"""
+
+        found = set()
+        last = len(self.sentences) - 2
+        pos = 0
+        while pos <= len(self.text):
+            match = pattern.search(self.text, pos)
+            if match is None:
+                break
+            start = match.start()
+            j = bisect_right(self.starts, start) - 1
+            for i in range(max(j - 1, 1), min(j + 2, last) + 1):
+                if self.starts[i-1] <= start <= self.ends[i+1]:
+                    found.add(i)
+            # further matches within sentence j start in the same windows
+            pos = max(start + 1, self.ends[j])
+        return found
+
+class LazyWindows(SentenceWindows):
+
+    def __init__(self, sentences, nlp):
+        """Windows of an article which was only segmented into sentences. The
+        sentences of a window are parsed when its annotations are read, i.e.
+        only around matches.
+
+        :param sentences: array_like, list of spaCy-spans
+        :param nlp: Language, model parsing a single sentence"""
+
+        super().__init__(sentences)
+        self.nlp = nlp
+        self._parsed = {}
+
+    def parsed(self, j):
+        """:param j: int, position of a sentence
+        :return: Doc, the parsed sentence"""
+
+        if j not in self._parsed:
+            self._parsed[j] = self.nlp(self.sentences[j].text)
+        return self._parsed[j]
+
+    def annotation(self, i, attribute):
+        key = (i, attribute)
+        if key not in self._annotations:
+            self._annotations[key] = ' ||| '.join(', '.join([getattr(t, attribute) for t in self.parsed(j)])
+                                                  for j in range(i - 1, i + 2))
+        return self._annotations[key]
+
+class AliasMatcher:
+
+    def __init__(self, aliases):
+        """Find the windows of an article mentioning any of the given aliases.
+
+        :param aliases: array_like, list of aliases (regular expressions)"""
+
+        self.aliases = aliases
+
+    def prefilter(self):
+        """Combine all aliases into a single alternation.
+
+        :return: Pattern, matches wherever an alias matches; None if an alias
+                 cannot be combined"""
+
+        if any(POSITIONAL.search(a) for a in self.aliases):
+            return
+        try:
+            return compile_pattern('|'.join(r'(?:\b%s\b)' % a for a in self.aliases))
+        except (re.error, RecursionError, OverflowError):
+            return
+
+    def find(self, windows):
+        """Return all pairs of window and matching alias, ordered by window
+        first and by alias second.
+
+        :param windows: SentenceWindows, the windows of the article
+        :return: array_like, list of tuples (position of middle sentence, alias)"""
+
+        if not len(windows):
+            return []
+        # an invalid alias raises re.error, even if it would never match
+        patterns = [word_pattern(a) for a in self.aliases]
+        prefilter = self.prefilter()
+        if prefilter is not None:
+            indexes = sorted(windows.candidates(prefilter))
+        else:
+            indexes = windows.indexes()
+        hits = []
+        for i in indexes:
+            for alias, pattern in zip(self.aliases, patterns):
+                if windows.search(pattern, i):
+                    hits.append((i, alias))
+        return hits
+
+class MatchIndex:
+
+    def __init__(self):
+        """Matches of an article, e.g. of aliases or pairs of alias and relation,
+        in the order they were found. Every window maps to a bitset of its
+        matched keys, so adding and looking up a match takes constant time."""
+
+        self.bits = {}
+        self.windows = {}
+        self.matches = []
+
+    def add(self, i, key):
+        """Add a match unless the window contains it already.
+
+        :param i: int, position of the middle sentence
+        :param key: hashable, the matched alias or relation
+        :return: bool, whether the match is new"""
+
+        bit = self.bits.get(key)
+        if bit is None:
+            bit = self.bits[key] = 1 << len(self.bits)
+        found = self.windows.get(i, 0)
+        if found & bit:
+            return False
+        self.windows[i] = found | bit
+        self.matches.append((i, key))
+        return True
+
+    def __contains__(self, match):
+        i, key = match
+        return key in self.bits and bool(self.windows.get(i, 0) & self.bits[key])
+
+    def __iter__(self):
+        return iter(self.matches)
+
+    def __len__(self):
+        return len(self.matches)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 31 09:14:27 2020
+
+@author: selin
+
+Metrics of the pipeline: counters, gauges and histograms per process. Workers
+of the pool return their metrics together with the result of every task, so
+the main process holds the metrics of all processes. They are exported as
+JSON-lines and in the text-format of Prometheus.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import timeit
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds of the histogram-buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Registry:
+
+    def __init__(self):
+        """Counters, gauges and histograms of a process, identified by name and
+        labels."""
+
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """Add a value to a histogram, e.g. the duration of a request.
+
+        :param name: str, name of the histogram
+        :param value: float, the observed value
+        :param labels: str, optional, labels of the histogram"""
+
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # counts per bucket and +Inf, sum, count
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 3)
+            i = 0
+            while i < len(BUCKETS) and value > BUCKETS[i]:
+                i += 1
+            histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def drain(self):
+        """Return all metrics recorded since the last call and reset them.
+
+        :return: tuple, counters, gauges and histograms as dicts"""
+
+        with self.lock:
+            snapshot = (self.counters, self.gauges, self.histograms)
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """:param snapshot: tuple, metrics of another process, see drain"""
+
+        counters, gauges, histograms = snapshot
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(gauges)
+            for key, values in histograms.items():
+                histogram = self.histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    histogram[i] += value
+
+    def total(self, name, **labels):
+        """:param name: str, name of a counter or histogram
+        :param labels: str, optional, only metrics with these labels
+        :return: float, sum of all matching counters and histogram-values"""
+
+        wanted = set(labels.items())
+        with self.lock:
+            result = sum(v for (n, l), v in self.counters.items()
+                         if n == name and wanted <= set(l))
+            result += sum(h[-2] for (n, l), h in self.histograms.items()
+                          if n == name and wanted <= set(l))
+        return result
+
+    def sums(self, name, label, **labels):
+        """:param name: str, name of a histogram
+        :param label: str, label to group by, e.g. phase
+        :param labels: str, optional, only histograms with these labels
+        :return: dict, value of label mapped to the sum of the observed values"""
+
+        wanted = set(labels.items())
+        result = {}
+        with self.lock:
+            for (n, l), h in self.histograms.items():
+                if n == name and wanted <= set(l):
+                    value = dict(l).get(label)
+                    result[value] = result.get(value, 0) + h[-2]
+        return result
+
+    def to_prometheus(self):
+        """:return: str, all metrics in the text-format of Prometheus"""
+
+        lines = []
+        with self.lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted({n for n, _ in metrics}):
+                    lines.append("# TYPE " + name + " " + kind)
+                    for (n, labels), value in sorted(metrics.items()):
+                        if n == name:
+                            lines.append(name + _labels(labels) + " " + repr(float(value)))
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append("# TYPE " + name + " histogram")
+                for (n, labels), histogram in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    count = 0
+                    for bound, value in zip(BUCKETS + ('+Inf',), histogram):
+                        count += value
+                        le = labels + (('le', str(bound)),)
+                        lines.append(name + "_bucket" + _labels(le) + " " + str(count))
+                    lines.append(name + "_sum" + _labels(labels) + " " + repr(float(histogram[-2])))
+                    lines.append(name + "_count" + _labels(labels) + " " + str(histogram[-1]))
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """:return: dict, all metrics by name with their labels, for JSON"""
+
+        result = {}
+        with self.lock:
+            for metrics in (self.counters, self.gauges):
+                for (name, labels), value in sorted(metrics.items()):
+                    result.setdefault(name, []).append(dict(labels, value=value))
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                result.setdefault(name, []).append(dict(labels, sum=histogram[-2],
+                                                        count=histogram[-1]))
+        return result
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k, v in labels) + "}"
+
+_registry = None
+_registry_pid = None
+_writer = None
+_writer_pid = None
+_server = None
+
+def get_registry():
+    """Return the registry of the current process; a forked worker starts
+    with an empty one instead of the copy of its parent.
+
+    :return: Registry, the registry"""
+
+    global _registry, _registry_pid
+    if _registry is None or _registry_pid != os.getpid():
+        _registry = Registry()
+        _registry_pid = os.getpid()
+    return _registry
+
+def inc(name, value=1, **labels):
+    get_registry().inc(name, value, **labels)
+
+def gauge(name, value, **labels):
+    get_registry().set(name, value, **labels)
+
+def observe(name, value, **labels):
+    get_registry().observe(name, value, **labels)
+
+@contextmanager
+def timer(stage, phase):
+    """Measure the duration of a phase of a stage, e.g. fetch, parse, nlp,
+    match or write of TripletFiller.
+
+    :param stage: str, name of the stage
+    :param phase: str, name of the phase"""
+
+    start_time = timeit.default_timer()
+    try:
+        yield
+    finally:
+        observe('pipeline_phase_seconds', timeit.default_timer() - start_time,
+                stage=stage, phase=phase)
+
+class Task:
+
+    def __init__(self, func, stage):
+        """Wrap a function executed in the worker-pool; its result is returned
+        together with the metrics recorded by the worker since its last task.
+
+        :param func: callable, the task, e.g. a bound get_data
+        :param stage: str, name of the stage"""
+
+        self.func = func
+        self.stage = stage
+
+    def __call__(self, *args):
+        start_time = timeit.default_timer()
+        try:
+            result = self.func(*args)
+        finally:
+            inc('pipeline_worker_busy_seconds_total', timeit.default_timer() - start_time,
+                stage=self.stage)
+        return result, get_registry().drain()
+
+def merged(results):
+    """Unwrap the results of Tasks and merge the metrics of the workers into the
+    registry of this process.
+
+    :param results: iterable, pairs of result and metrics as returned by Task
+    :yield: the results"""
+
+    for result, snapshot in results:
+        get_registry().merge(snapshot)
+        yield result
+
+def configure(path=None, port=None):
+    """Export the metrics of this process.
+
+    :param path: str, optional, JSON-lines file receiving a record per chunk
+                 and stage
+    :param port: int, optional, port of a local HTTP-endpoint serving /metrics
+                 in the text-format of Prometheus"""
+
+    global _writer, _writer_pid, _server
+    if path:
+        _writer = open(path, 'a', buffering=1)
+        _writer_pid = os.getpid()
+    if port is not None:
+        _server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        logging.info("Serving metrics on http://127.0.0.1:" + str(_server.server_port) + "/metrics")
+
+def record(event, **fields):
+    """Append a record to the JSON-lines file, if configured.
+
+    :param event: str, kind of the record, e.g. chunk or stage
+    :param fields: optional, content of the record"""
+
+    # forked workers inherit the file but only return their metrics
+    if _writer is not None and _writer_pid == os.getpid():
+        _writer.write(json.dumps(dict(fields, time=time.time(), event=event)) + "\n")
+
+def shutdown():
+    """Write all metrics as a final record and stop the exports."""
+
+    global _writer, _server
+    record('summary', metrics=get_registry().to_dict())
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = get_registry().to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
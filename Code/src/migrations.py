@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 18 14:05:37 2020
+
+@author: selin
+"""
+
+import logging
+import psycopg2
+import src.frontier as frontier
+import src.queries as queries
+import src.work_queue as work_queue
+import sys
+from src.config import config
+
+# (version, description, SQL-commands); append new migrations, never edit old ones
+MIGRATIONS = (
+    (1, "q_item.seq and pipeline_state for incremental joins", (
+        """ALTER TABLE q_item ADD COLUMN IF NOT EXISTS seq BIGSERIAL;""",
+        """CREATE TABLE IF NOT EXISTS pipeline_state (
+                name VARCHAR(255) PRIMARY KEY,
+                value BIGINT NOT NULL
+        );""")),
+    (2, "secondary and partial indexes of the pipeline-queries", (
+        # ObjectFiller-frontier and join_table_values
+        """CREATE INDEX IF NOT EXISTS q_item_value_id ON q_item (value_id);""",
+        """CREATE INDEX IF NOT EXISTS q_item_value ON q_item (value);""",
+        """CREATE INDEX IF NOT EXISTS q_item_open_value ON q_item (value_id)
+            WHERE value_text = '?';""",
+        """CREATE INDEX IF NOT EXISTS q_item_seq ON q_item (seq);""",
+        # RelationFiller and ObjectTypeFiller
+        """CREATE INDEX IF NOT EXISTS q_item_relation_id ON q_item (relation_id, q_id);""",
+        """CREATE INDEX IF NOT EXISTS q_item_object_type ON q_item (object_type);""",
+        # TripletFiller
+        """CREATE INDEX IF NOT EXISTS q_item_open_context ON q_item (q_id)
+            WHERE has_context = 0;""",
+        # clean_up_triplets
+        """CREATE INDEX IF NOT EXISTS triplets_object_relation_value
+            ON triplets (object_id, relation_id, value_id);""",
+        """ANALYZE q_item;""",
+        """ANALYZE triplets;""")),
+    (3, "frontier of the crawler", (
+        """CREATE TABLE IF NOT EXISTS frontier (
+                q_id INTEGER PRIMARY KEY,
+                depth INTEGER NOT NULL,
+                state VARCHAR(16) NOT NULL DEFAULT 'pending',
+                priority INTEGER NOT NULL DEFAULT 0
+        );""",
+        """CREATE INDEX IF NOT EXISTS frontier_pending ON frontier (depth, priority)
+            WHERE state = 'pending';""")),
+    (4, "checkpoints of the pipeline-stages", (
+        """CREATE TABLE IF NOT EXISTS checkpoints (
+                stage VARCHAR(64) PRIMARY KEY,
+                first_key BIGINT,
+                last_key BIGINT NOT NULL,
+                chunks INTEGER NOT NULL,
+                rows BIGINT NOT NULL,
+                finished BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );""",)),
+    (5, "labels of the object-types, kept across runs", (
+        """CREATE TABLE IF NOT EXISTS type_labels (
+                type_id INTEGER PRIMARY KEY,
+                label VARCHAR(255) NOT NULL
+        );""",)),
+    (6, "triplets.seq and types.seq for incremental exports", (
+        """ALTER TABLE triplets ADD COLUMN IF NOT EXISTS seq BIGSERIAL;""",
+        """ALTER TABLE types ADD COLUMN IF NOT EXISTS seq BIGSERIAL;""",
+        """CREATE INDEX IF NOT EXISTS triplets_seq ON triplets (seq);""",
+        """CREATE INDEX IF NOT EXISTS types_seq ON types (seq);""")),
+    (7, "work-queue shared by distributed workers", (
+        """CREATE TABLE IF NOT EXISTS work_items (
+                stage VARCHAR(64) NOT NULL,
+                key BIGINT NOT NULL,
+                state VARCHAR(16) NOT NULL DEFAULT 'pending',
+                worker VARCHAR(255),
+                leased_until TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stage, key)
+        );""",
+        """CREATE INDEX IF NOT EXISTS work_items_open ON work_items (stage, key)
+            WHERE state <> 'done';""",
+        """CREATE TABLE IF NOT EXISTS queue_workers (
+                worker VARCHAR(255) NOT NULL,
+                stage VARCHAR(64) NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                rows_in BIGINT NOT NULL DEFAULT 0,
+                rows_out BIGINT NOT NULL DEFAULT 0,
+                started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (worker, stage)
+        );""")),
+    )
+
+# the queries of the pipeline whose plans are reported, with example-parameters
+PIPELINE_QUERIES = {
+    'ObjectFiller.get_rows': (queries.OBJECT_ROWS, None),
+    'RelationFiller.get_rows': (queries.RELATION_ROWS, None),
+    'TripletFiller.get_rows': (queries.TRIPLET_ROWS % "", None),
+    'ObjectTypeFiller.get_rows': (queries.OBJECT_TYPE_ROWS, None),
+    'join_table_values': (queries.JOIN_VALUES, (0, 0)),
+    'clean_up_triplets': (queries.MARK_CONTEXT, None),
+    'Frontier.claim': (frontier.CLAIM % frontier.POLICIES['breadth'], (500,)),
+    'WorkQueue.claim': (work_queue.CLAIM, ('TripletFiller', 3, 500, 'report', 600,
+                                           'TripletFiller')),
+    }
+
+def get_version(cursor):
+    """Return the schema-version of a database.
+
+    :param cursor: a cursor object
+    :return: int, highest applied migration, 0 if none"""
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );""")
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+    return cursor.fetchone()[0]
+
+def migrate(config_file='database.ini', target=None):
+    """Upgrade the database in place by applying all pending migrations, each
+    one in its own transaction.
+
+    :param config_file: str, optional, file-name, default database.ini
+    :param target: int, optional, version to upgrade to, latest if None
+    :return: int, schema-version after the upgrade"""
+
+    conn = None
+    try:
+        params = config(config_file)
+        conn = psycopg2.connect(**params)
+        cur = conn.cursor()
+        version = get_version(cur)
+        conn.commit()
+        for number, description, commands in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            for command in commands:
+                cur.execute(command)
+            cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                        (number, description))
+            conn.commit()
+            version = number
+            logging.info("Migrated database to version " + str(number) + ": " + description)
+        cur.close()
+        return version
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        logging.critical("migrate: " + str(error))
+    finally:
+        if conn is not None:
+            conn.close()
+
+def report(config_file='database.ini', analyze=False):
+    """Report the usage of all indexes and the plans of the pipeline-queries.
+
+    :param config_file: str, optional, file-name, default database.ini
+    :param analyze: bool, optional, execute the SELECT-queries to report actual
+                    times; UPDATE-queries are never executed
+    :return: str, the report"""
+
+    conn = None
+    lines = []
+    try:
+        params = config(config_file)
+        conn = psycopg2.connect(**params)
+        cur = conn.cursor()
+        lines.append("schema-version: " + str(get_version(cur)))
+        cur.execute("""SELECT relname, indexrelname, idx_scan, idx_tup_read,
+            pg_size_pretty(pg_relation_size(indexrelid))
+            FROM pg_stat_user_indexes ORDER BY relname, indexrelname;""")
+        lines.append("%-12s %-32s %10s %12s %10s" % ('table', 'index', 'scans', 'tuples', 'size'))
+        for row in cur.fetchall():
+            lines.append("%-12s %-32s %10s %12s %10s" % row)
+        for name, (sql, args) in PIPELINE_QUERIES.items():
+            explain = "EXPLAIN ANALYZE " if analyze and sql.startswith('SELECT') else "EXPLAIN "
+            cur.execute(explain + sql, args)
+            lines.append("")
+            lines.append("-- " + name)
+            lines.extend(row[0] for row in cur.fetchall())
+        conn.rollback()
+        cur.close()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    finally:
+        if conn is not None:
+            conn.close()
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    config_file = sys.argv[1] if len(sys.argv) > 1 else 'database.ini'
+    print("schema-version: " + str(migrate(config_file)))
+    if '--report' in sys.argv:
+        print(report(config_file))
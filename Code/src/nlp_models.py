@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar  2 09:41:12 2020
+
+@author: selin
+"""
+
+import logging
+import os
+import spacy
+import timeit
+from multiprocessing import util
+
+DEFAULT_MODEL = "de_core_news_sm"
+# TripletFiller only reads sentences, tags and dependencies
+UNUSED_COMPONENTS = ('ner', 'lemmatizer', 'morphologizer')
+# prefix of the names of rule-based sentencizers, e.g. sentencizer:de
+SENTENCIZER = "sentencizer:"
+
+_models = {}
+_stats = {}
+
+def load_model(name=DEFAULT_MODEL, disable=UNUSED_COMPONENTS):
+    """Return the spaCy-model of the current process, load it on first use only.
+
+    :param name: str, optional, name of the spaCy-model
+    :param disable: array_like, optional, pipeline-components to disable
+    :return nlp: Language, the loaded spaCy-model"""
+
+    nlp = _get_model(name, disable)
+    _stats[(name, tuple(disable))]['uses'] += 1
+    return nlp
+
+def load_sentencizer(lang='de'):
+    """Return a blank pipeline of the current process which only segments 
+    sentences by punctuation; much faster than the parser of a model.
+
+    :param lang: str, optional, language of the tokenizer
+    :return nlp: Language, the sentencizer"""
+
+    return load_model(SENTENCIZER + lang, ())
+
+def init_worker(name=DEFAULT_MODEL, disable=UNUSED_COMPONENTS):
+    """Initializer for pool-workers: load the model before the first task.
+
+    :param name: str, optional, name of the spaCy-model
+    :param disable: array_like, optional, pipeline-components to disable"""
+
+    _get_model(name, disable)
+
+def _get_model(name, disable):
+    """Load the model once per process; log its statistics at process-exit."""
+
+    key = (name, tuple(disable))
+    if key in _models:
+        return _models[key]
+    start_time = timeit.default_timer()
+    if name.startswith(SENTENCIZER):
+        nlp = spacy.blank(name[len(SENTENCIZER):])
+        nlp.add_pipe('sentencizer')
+    else:
+        nlp = spacy.load(name, disable=list(disable))
+    seconds = timeit.default_timer() - start_time
+    _models[key] = nlp
+    _stats[key] = {'load_seconds': seconds, 'uses': 0}
+    if len(_models) == 1:
+        util.Finalize(None, log_stats, exitpriority=10)
+    logging.info("Loaded spaCy-model " + name + " in " + str(seconds) +
+                 " seconds (pid " + str(os.getpid()) + ")")
+    return nlp
+
+def get_stats():
+    """Return load-time and number of uses for every model of this process.
+
+    :return: dict, model-name mapped to dict with load_seconds and uses"""
+
+    return {key[0]: dict(value) for key, value in _stats.items()}
+
+def log_stats():
+    """Create a log entry with load-time and reuse-count of each loaded model."""
+
+    for name, stats in get_stats().items():
+        log = ("spaCy-model " + name + " loaded once in " +
+               str(stats['load_seconds']) + " seconds and used " +
+               str(stats['uses']) + " times (pid " + str(os.getpid()) + ")")
+        logging.info(log)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 26 09:35:48 2020
+
+@author: selin
+
+Normalization of the labels, aliases and values shared by all fillers. Aliases,
+values and relations are later used as regular expressions by TripletFiller.
+"""
+
+import re
+import unidecode
+from functools import lru_cache
+
+# characters escaped in aliases and string-values
+ESCAPES = str.maketrans({'(': '\\(', ')': '\\)', '.': '\\.', '+': '\\+', '*': '\\*'})
+# characters escaped in relations; parentheses are removed beforehand
+RELATION_ESCAPES = str.maketrans({'+': '\\+', '*': '\\*', '.': '\\.'})
+PARENTHESES = re.compile(r"\(.+?\)")
+ELLIPSIS = re.compile(r" \.\.\.")
+BRACKETS = re.compile(r"\s?\[.+?\]\s?,?")
+# longer texts, e.g. articles, rarely recur and are not cached
+MAX_CACHED_LENGTH = 256
+CACHE_SIZE = 65536
+
+def transliterate(text):
+    """Transliterate a text into ASCII like unidecode; short texts are cached
+    per process, since labels and aliases recur in many entities.
+
+    :param text: str, a label, alias, value or article
+    :return: str, the ASCII-text"""
+
+    if text.isascii():
+        return text
+    if len(text) > MAX_CACHED_LENGTH:
+        return unidecode.unidecode(text)
+    return _transliterate(text)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _transliterate(text):
+    return unidecode.unidecode(text)
+
+def escape(text):
+    """:param text: str, an alias or a string-value
+    :return: str, text with parentheses, dots, plus and asterisk escaped"""
+
+    return text.translate(ESCAPES)
+
+def relation_pattern(label):
+    """Turn the label and aliases of a relation into the pattern searched by
+    TripletFiller: slashes separate aliases, parenthesized and bracketed parts
+    as well as ellipses are removed and all but the wildcards (.*) inserted
+    for participles are escaped.
+
+    :param label: str, label and aliases separated by comma
+    :return: str, the pattern"""
+
+    label = transliterate(label.replace('/', ', '))
+    if '(' in label:
+        label = PARENTHESES.sub("", label)
+    if '...' in label:
+        label = ELLIPSIS.sub("", label)
+    if '[' in label:
+        label = BRACKETS.sub("", label)
+    return label.translate(RELATION_ESCAPES).replace('\\.\\*', '.*')
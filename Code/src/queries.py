@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Apr  7 10:12:36 2020
+
+@author: selin
+
+Queries of the pipeline on q_item, shared by the stages running them and the
+report of their plans in migrations.
+"""
+
+# values of q_items which are not crawled yet
+OBJECT_ROWS = """SELECT DISTINCT q1.value_id FROM q_item q1 WHERE
+    q1.value_id <> 0 AND NOT EXISTS (SELECT 1 FROM q_item q2
+    WHERE q2.q_id = q1.value_id);"""
+
+# relations without label
+RELATION_ROWS = """SELECT DISTINCT q.relation_id FROM q_item q WHERE NOT EXISTS
+    (SELECT 1 FROM p_relation p WHERE p.relation_id =
+             CAST(q.relation_id AS INTEGER));"""
+
+# q_items without context with all their relations and values; %s takes an
+# additional condition, e.g. the keys of a work-queue
+TRIPLET_ROWS = """SELECT DISTINCT q_id, aliases, url,
+    ARRAY_AGG
+    (DISTINCT relation_label || '||' || value_text || '||' ||
+    relation_id || '||' || value_id) lab
+    FROM q_item
+    WHERE has_context = 0 AND relation_label <> '?' AND value_text <> '?'
+    AND url <> '' %s GROUP BY q_id, aliases, url ORDER BY q_id;"""
+
+TRIPLET_KEYS = """SELECT DISTINCT q_id FROM q_item
+    WHERE has_context = 0 AND relation_label <> '?' AND value_text <> '?'
+    AND url <> '' ORDER BY q_id;"""
+
+# instances (P31) of an item, its subclasses (P279) only if it has none
+OBJECT_CLASSES = """SELECT DISTINCT q_id, value, value_id, label FROM q_item q
+    WHERE relation_id=31 OR (relation_id=279 AND NOT EXISTS
+        (SELECT 1 FROM q_item i WHERE i.q_id = q.q_id AND i.relation_id=31))"""
+
+# types whose label is neither joined as value, resolved before nor crawled
+OBJECT_TYPE_ROWS = """SELECT DISTINCT value_id FROM (%s) c
+    WHERE value ~ '^[0-9]+$' AND NOT EXISTS
+        (SELECT 1 FROM type_labels t WHERE t.type_id = c.value_id)
+    AND NOT EXISTS (SELECT 1 FROM q_item s WHERE s.q_id = c.value_id)
+    ORDER BY value_id;""" % OBJECT_CLASSES
+
+# among q_items sharing a label, only the one with the lowest ID becomes the
+# value; the others are blocked like rows that hold the label already
+JOIN_VALUES = """WITH candidates AS (
+        SELECT DISTINCT s.label, s.aliases, s.q_id FROM q_item s
+        JOIN q_item t ON t.value_id = s.q_id AND t.value_text = '?'
+        WHERE (t.seq > %s OR s.seq > %s)
+        AND NOT EXISTS (SELECT 1 FROM q_item x WHERE x.value = s.label)
+    ), chosen AS (
+        SELECT DISTINCT ON (label) label, aliases, q_id FROM candidates
+        ORDER BY label, q_id
+    )
+    UPDATE q_item t SET value = c.label, value_text = c.aliases
+    FROM chosen c WHERE t.value_id = c.q_id AND t.value_text = '?';"""
+
+# rows already marked are not rewritten, thus repeated calls only update the
+# rows of the last TripletFiller
+MARK_NOTHING = """UPDATE q_item q set has_context = 2 WHERE q.has_context <> 2 AND EXISTS
+        (SELECT 1 FROM triplets tr
+        WHERE q.q_id = tr.object_id AND
+        q.relation_id = tr.relation_id AND
+        q.value_id = tr.value_id AND
+        tr.context = 'NOTHING');"""
+
+MARK_CONTEXT = """UPDATE q_item q set has_context = 1 WHERE q.has_context <> 1 AND EXISTS
+        (SELECT 1 FROM triplets tr
+        WHERE q.q_id = tr.object_id AND
+        q.relation_id = tr.relation_id AND
+        q.value_id = tr.value_id AND
+        tr.context <> 'NOTHING');"""
+
+# after a completed TripletFiller, the rows it selected without triplet are
+# those whose article could not be retrieved
+MARK_UNRETRIEVED = """UPDATE q_item SET has_context = 3
+    WHERE has_context = 0 AND relation_label <> '?' AND value_text <> '?'
+    AND url <> '';"""
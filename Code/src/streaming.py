@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Apr  6 09:28:41 2020
+
+@author: selin
+
+Streaming fill of a Filler: the chunks pass through four concurrent stages,
+reading, fetching, parsing and writing, connected by bounded queues. A full
+queue stops the stages before it, so the network, the worker-pool and the
+database work at the same time without buffering more than a few chunks.
+"""
+
+import asyncio
+import src.metrics as metrics
+import src.utils as utils
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+# marks the end of the chunks in a queue
+END = None
+
+class MeteredQueue(asyncio.Queue):
+
+    def __init__(self, maxsize, stage, name):
+        """Bounded queue recording its depth and how long the stages wait for
+        it: waiting puts show a slow consumer, waiting gets a slow producer.
+
+        :param maxsize: int, maximal number of chunks in the queue
+        :param stage: str, name of the filler
+        :param name: str, name of the consuming stage"""
+
+        super().__init__(maxsize)
+        self.stage = stage
+        self.name = name
+
+    async def put(self, item):
+        start_time = timeit.default_timer()
+        await super().put(item)
+        self.record('put', start_time)
+
+    async def get(self):
+        start_time = timeit.default_timer()
+        item = await super().get()
+        self.record('get', start_time)
+        return item
+
+    def record(self, side, start_time):
+        metrics.observe('pipeline_queue_wait_seconds', timeit.default_timer() - start_time,
+                        stage=self.stage, queue=self.name, side=side)
+        metrics.gauge('pipeline_queue_depth', self.qsize(), stage=self.stage, queue=self.name)
+
+def run(filler, pool, rows, connection, cursor, buffer_size=2):
+    """Fill the rows of a filler in streaming stages:
+
+    - read: chunks of batch_size rows from the iterator of get_rows
+    - fetch: Filler.fetch_chunk retrieves the entities or articles of a chunk
+      concurrently in the event-loop
+    - parse: Filler.parse_items processes the chunk in the worker-pool
+    - write: Filler.write_pending commits the chunk with its checkpoint
+
+    Every stage handles one chunk at a time, so chunks are committed in order.
+
+    :param filler: Filler, the stage of the pipeline
+    :param pool: Pool, the worker-pool
+    :param rows: iterator, the rows to fill
+    :param connection: a connection object to write with
+    :param cursor: a cursor object of connection
+    :param buffer_size: int, optional, maximal number of chunks between two stages
+    :return: tuple, number of chunks and rows"""
+
+    return asyncio.run(_run(filler, pool, rows, connection, cursor, buffer_size))
+
+async def _run(filler, pool, rows, connection, cursor, buffer_size):
+    stage = type(filler).__name__
+    loop = asyncio.get_running_loop()
+    fetch_queue = MeteredQueue(buffer_size, stage, 'fetch')
+    parse_queue = MeteredQueue(buffer_size, stage, 'parse')
+    write_queue = MeteredQueue(buffer_size, stage, 'write')
+    counts = [0, 0]
+
+    async def read(executor):
+        chunks = utils.get_chunks(rows, filler.batch_size)
+        chunk = await loop.run_in_executor(executor, next, chunks, END)
+        while chunk is not END:
+            counts[0] += 1
+            counts[1] += len(chunk)
+            metrics.inc('pipeline_rows_in_total', len(chunk), stage=stage)
+            await fetch_queue.put((chunk, timeit.default_timer(), counts[0]))
+            chunk = await loop.run_in_executor(executor, next, chunks, END)
+        await fetch_queue.put(END)
+
+    async def fetch():
+        item = await fetch_queue.get()
+        while item is not END:
+            chunk, start_time, number = item
+            with metrics.timer(stage, 'fetch'):
+                items = await filler.fetch_chunk(chunk)
+            await parse_queue.put((chunk, items, start_time, number))
+            item = await fetch_queue.get()
+        await parse_queue.put(END)
+
+    async def parse(executor):
+        item = await parse_queue.get()
+        while item is not END:
+            chunk, items, start_time, number = item
+            results = await loop.run_in_executor(
+                executor, lambda: list(filler.parse_items(pool, items)))
+            await write_queue.put((chunk, results, start_time, number))
+            item = await parse_queue.get()
+        await write_queue.put(END)
+
+    async def write(executor):
+        item = await write_queue.get()
+        while item is not END:
+            await loop.run_in_executor(executor, filler.write_pending, connection, cursor, item)
+            item = await write_queue.get()
+
+    # a thread per blocking stage: the cursor of get_rows, the pool and the
+    # connection are each used by a single thread
+    executors = [ThreadPoolExecutor(max_workers=1) for _ in range(3)]
+    tasks = [asyncio.ensure_future(read(executors[0])), asyncio.ensure_future(fetch()),
+             asyncio.ensure_future(parse(executors[1])), asyncio.ensure_future(write(executors[2]))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # a failing stage stops the others, uncommitted chunks are rolled back
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return tuple(counts)
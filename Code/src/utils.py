@@ -6,56 +6,195 @@ Created on Wed Feb 26 14:41:57 2020
 @author: selin
 """
 import json
-import requests
 import logging
+import os
+import requests
+import src.metrics as metrics
+import timeit
+from itertools import islice
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+
+TIMEOUT = 30
+_session = None
+_session_pid = None
+
+def create_pool(processes=None, initializer=None):
+    """Create a pool of worker-processes which can be shared by several fillers.
+
+    :param processes: int, optional, number of workers, os.cpu_count() if None
+    :param initializer: callable, optional, executed once in every worker
+    :return: Pool, the worker-pool"""
+
+    return Pool(processes=processes, initializer=initializer)
+
+def get_session():
+    """Return the HTTP-session of the current process; connections are kept 
+    alive and reused by all requests of the process.
+    
+    :return: Session, the requests-session"""
+    
+    global _session, _session_pid
+    # a forked worker must not share the sockets of its parent
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        _session_pid = os.getpid()
+    return _session
+
+def http_get(url, **kwargs):
+    """Send a GET-request with the session of the process and record its 
+    latency per host and status.
+    
+    :param url: str, the URL to request
+    :param kwargs: optional, arguments of requests, e.g. headers
+    :return: Response, the response"""
+    
+    start_time = timeit.default_timer()
+    status = 'error'
+    try:
+        response = get_session().get(url, timeout=TIMEOUT, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.observe('pipeline_http_request_seconds', timeit.default_timer() - start_time,
+                        host=urlsplit(url).netloc, status=status)
 
-def get_data(item_id):
+def get_data(item_id, cache=None):
     """Helper method to retrieve data from wikidata.
     
     :param item_id: int, ID of entity to retrieve (e.g. P123 or Q123)
+    :param cache: DiskCache, optional, local cache to read through
     :returns data[item_id]: dict, the wikidata-item as a dictionary"""
     
     try:
         if item_id:
+            if cache:
+                content = cache.get(item_id)
+                if content:
+                    return json.loads(content)
             link = "https://www.wikidata.org/wiki/Special:EntityData/" + item_id + ".json"
-            page = requests.get(link)
+            page = http_get(link)
             if 'entities' in page.text:
                 data = json.loads(page.text)['entities']
             else:
                 return
-        if item_id in data: # ATTENTION: we get nothing back if item is re-directed from another one!
-            return data[item_id]
+        # a re-directed item comes back under the ID of its target
+        entity = resolve_entities([item_id], data).get(item_id)
+        if cache and entity:
+            cache.put(item_id, json.dumps(entity))
+        return entity
     except (Exception) as error:
         logging.critical(error)
+
+def get_text(url, cache=None):
+    """Helper method to retrieve a page, e.g. a rendered wikipedia-article. 
+    Cached pages are revalidated with their ETag once they are stale.
+    
+    :param url: str, URL of the page
+    :param cache: DiskCache, optional, local cache to read through
+    :return: str, content of the page"""
+    
+    entry = cache.lookup(url) if cache else None
+    headers = {}
+    if entry:
+        content, etag, fresh = entry
+        if fresh:
+            cache.hits += 1
+            return content
+        if etag:
+            headers['If-None-Match'] = etag
+    response = http_get(url, headers=headers)
+    if entry and response.status_code == 304:
+        cache.touch(url)
+        cache.hits += 1
+        return content
+    if cache:
+        cache.misses += 1
+        if response.status_code == 200:
+            cache.put(url, response.text, response.headers.get('ETag'))
+    return response.text
+
+def resolve_entities(item_ids, entities):
+    """Helper method to map retrieved entities to the requested IDs. An entity 
+    is returned under every requested ID resolving to it, i.e. its own ID and 
+    the ID redirected to it.
+    
+    :param item_ids: array_like, the requested IDs (e.g. Q42)
+    :param entities: dict, the 'entities' of a wikidata-response
+    :return: dict, requested ID mapped to its entity; missing IDs are left out"""
+    
+    requested = set(item_ids)
+    result = {}
+    unused = []
+    for key, entity in entities.items():
+        if 'missing' in entity:
+            continue
+        redirect = entity.get('redirects', {}).get('from')
+        if key in requested:
+            result[key] = entity
+        if redirect in requested:
+            result[redirect] = entity
+        if key not in requested and redirect not in requested:
+            unused.append(entity)
+    unresolved = [i for i in requested if i not in result]
+    # Special:EntityData follows a redirect without telling where it came from
+    if len(unresolved) == 1 and len(unused) == 1:
+        result[unresolved[0]] = unused[0]
+    return result
         
 def get_chunks(lst, n=500):
-    """Helper method that yields successive n-sized chunks from a list lst.
+    """Helper method that yields successive n-sized chunks from an iterable lst;
+    only a single chunk is held in memory if lst is a generator.
     
-    :param lst: array_like, a list
+    :param lst: iterable, a list or generator
     :param n: int, chunk-size optional
     :yield: array_like, n-sized chunks from lst"""
     
-    for i in range(0, len(lst), n):
-        yield lst[i:i + n]
+    iterator = iter(lst)
+    chunk = list(islice(iterator, n))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, n))
         
-def merge_rows(l1, l2):
+def merge_rows(l1, l2, copy=False):
     """Helper method to merge two lists of rows with inequal length into a 
-    single long one based on the q-object-ID.
+    single long one based on the q-object-ID. The aggregated values (4th column) 
+    of rows in the short list are appended to the first row of the long list 
+    with the same ID, rows with a new ID are appended to the long list.
     
     :param l1: array_like, the first list of rows
     :param l2: array_like, the second list of rows
+    :param copy: bool, optional, leave both lists and their rows unchanged 
+                 instead of merging into the longer list
     :return: array_like, a single long list """
     
     long_list = l2 if len(l2) > len(l1) else l1
     short_list = l1 if len(l2) > len(l1) else l2
+    if copy:
+        long_list = [_copy_row(y) for y in long_list]
+    # first row per ID; setdefault keeps the first of duplicate IDs
+    index = {}
+    for y in long_list:
+        index.setdefault(y[0], y)
     for x in short_list:
-        is_contained = False
-        for y in long_list:
-            if x[0] == y[0]:
-                is_contained = True
-                for arr in x[3]:
-                    y[3].append(arr)
-                break
-        if not is_contained:
+        y = index.get(x[0])
+        if y is None:
+            if copy:
+                x = _copy_row(x)
             long_list.append(x)
-    return long_list
\ No newline at end of file
+            index[x[0]] = x
+        else:
+            y[3].extend(x[3])
+    return long_list
+
+def _copy_row(row):
+    """Copy a row for merge_rows, including its aggregated values (4th column),
+    a list which is extended when rows with the same ID are merged.
+    
+    :param row: array_like, a row of q-object-ID, aliases, URL and list of 
+                aggregated values
+    :return: array_like, the copied row, a tuple if row is one """
+    
+    copied = list(row)
+    copied[3] = list(row[3])
+    return tuple(copied) if isinstance(row, tuple) else copied
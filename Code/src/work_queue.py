@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Apr  3 09:52:36 2020
+
+@author: selin
+
+Queue of work-items in the database shared by workers on any number of hosts.
+Items are leased with SELECT ... FOR UPDATE SKIP LOCKED and marked done in the
+transaction writing their rows; the leases of a running worker are renewed
+in the background, the items of a worker that stops are leased again once
+their lease expired. All times are those of the database-server.
+"""
+
+import logging
+import os
+import psycopg2
+import socket
+import threading
+from src.config import config
+
+# open items of a stage; expired leases are claimed again until max_attempts. The
+# CTE is evaluated once, a subquery might be scanned again by the join
+CLAIM = """WITH c AS (SELECT key FROM work_items WHERE stage = %s AND state <> 'done' AND
+        (state = 'pending' OR (leased_until < CURRENT_TIMESTAMP AND attempts < %s))
+        ORDER BY key LIMIT %s FOR UPDATE SKIP LOCKED)
+    UPDATE work_items w SET state = 'leased', worker = %s, attempts = w.attempts + 1,
+        leased_until = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+    FROM c WHERE w.stage = %s AND w.key = c.key RETURNING w.key;"""
+
+class WorkQueue:
+
+    def __init__(self, stage, config_file='database.ini', lease_seconds=600,
+                 max_attempts=3, worker=None):
+        """:param stage: str, name of the stage, e.g. TripletFiller
+        :param config_file: str, optional, file-name, default database.ini
+        :param lease_seconds: int, optional, time until the items of a stopped
+                              worker are claimed again; renewed every third
+                              of it while the worker runs
+        :param max_attempts: int, optional, items leased as often are left as
+                             failed instead of claimed again
+        :param worker: str, optional, name of the worker, default host:pid"""
+
+        self.stage = stage
+        self.config_file = config_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker = worker if worker else socket.gethostname() + ':' + str(os.getpid())
+        self._renewal = None
+        self._stopped = None
+
+    def __getstate__(self):
+        # the renewal runs in the worker only, not in its pool
+        state = dict(self.__dict__)
+        state['_renewal'] = None
+        state['_stopped'] = None
+        return state
+
+    def execute(self, sql, args=None, fetch=False):
+        """Execute a statement in its own transaction.
+
+        :param sql: str, the statement
+        :param args: tuple, optional, parameters of the statement
+        :param fetch: bool, optional, return the resulting rows
+        :return: array_like, the rows if fetch, the number of rows otherwise
+        :raises: psycopg2.DatabaseError, e.g. if the connection was lost"""
+
+        conn = None
+        try:
+            params = config(self.config_file)
+            conn = psycopg2.connect(**params)
+            cur = conn.cursor()
+            cur.execute(sql, args)
+            result = cur.fetchall() if fetch else cur.rowcount
+            conn.commit()
+            cur.close()
+            return result
+        except (Exception, psycopg2.DatabaseError) as error:
+            # an empty result would look like an empty queue
+            print("WorkQueue: " + str(error))
+            logging.critical("WorkQueue: " + str(error))
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def enqueue(self, filler):
+        """Add the open rows of a filler as items; items completed before are
+        replaced, leased items are left to their workers.
+
+        :param filler: Filler, the stage, see Filler.get_keys
+        :return: int, number of added items
+        :raises: psycopg2.DatabaseError, e.g. if the connection was lost"""
+
+        conn = None
+        try:
+            params = config(self.config_file)
+            conn = psycopg2.connect(**params)
+            cur = conn.cursor()
+            keys = list(filler.get_keys(cur))
+            cur.execute("DELETE FROM work_items WHERE stage = %s AND state = 'done';",
+                        (self.stage,))
+            cur.execute("""INSERT INTO work_items (stage, key)
+                SELECT %s, UNNEST(%s::BIGINT[]) ON CONFLICT DO NOTHING;""", (self.stage, keys))
+            added = cur.rowcount
+            conn.commit()
+            cur.close()
+            logging.info("Enqueued " + str(added) + " items of " + self.stage)
+            return added
+        except (Exception, psycopg2.DatabaseError) as error:
+            print("WorkQueue: " + str(error))
+            logging.critical("WorkQueue: " + str(error))
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def claim(self, size):
+        """Lease the next open items to this worker.
+
+        :param size: int, maximum number of items
+        :return: array_like, sorted keys of the claimed items"""
+
+        self.execute("""INSERT INTO queue_workers (worker, stage) VALUES (%s, %s)
+            ON CONFLICT (worker, stage) DO UPDATE SET seen_at = CURRENT_TIMESTAMP;""",
+            (self.worker, self.stage))
+        rows = self.execute(CLAIM, (self.stage, self.max_attempts, size, self.worker,
+                                    self.lease_seconds, self.stage), fetch=True)
+        return sorted(row[0] for row in rows)
+
+    def rows(self, filler, connection):
+        """Claim items until the queue is empty and yield their rows; items
+        without rows are completed at once.
+
+        :param filler: Filler, the stage, see Filler.get_rows with keys
+        :param connection: a connection object to read the rows with
+        :yield: array_like, the rows of the claimed items"""
+
+        keys = self.claim(filler.batch_size)
+        while keys:
+            cursor = connection.cursor()
+            found = set()
+            for row in filler.get_rows(cursor, keys):
+                found.add(filler.get_key(row))
+                yield row
+            cursor.close()
+            missing = [key for key in keys if key not in found]
+            if missing:
+                self.execute("""UPDATE work_items SET state = 'done' WHERE stage = %s
+                    AND key = ANY(%s) AND worker = %s;""", (self.stage, missing, self.worker))
+            keys = self.claim(filler.batch_size)
+
+    def renew(self):
+        """Extend the leases of all items of this worker."""
+
+        self.execute("""UPDATE work_items
+            SET leased_until = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+            WHERE stage = %s AND worker = %s AND state = 'leased';""",
+            (self.lease_seconds, self.stage, self.worker))
+
+    def start_renewal(self):
+        """Renew the leases every third of lease_seconds until stop_renewal,
+        as a chunk may take longer to process than a lease."""
+
+        self._stopped = threading.Event()
+        self._renewal = threading.Thread(target=self._renew, args=(self._stopped,),
+                                         daemon=True)
+        self._renewal.start()
+
+    def stop_renewal(self):
+        if self._renewal is not None:
+            self._stopped.set()
+            self._renewal.join()
+            self._renewal = None
+
+    def _renew(self, stopped):
+        while not stopped.wait(self.lease_seconds / 3.0):
+            try:
+                self.renew()
+            except (Exception, psycopg2.DatabaseError):
+                # logged by execute; retried with the next interval
+                pass
+
+    def complete(self, cursor, keys, rows_out):
+        """Mark the items of a chunk done and renew the other leases of this
+        worker; commit together with the rows of the chunk.
+
+        :param cursor: a cursor object
+        :param keys: array_like, keys of the items
+        :param rows_out: int, number of rows written for the items"""
+
+        cursor.execute("""UPDATE work_items SET state = 'done' WHERE stage = %s
+            AND key = ANY(%s) AND worker = %s;""", (self.stage, list(keys), self.worker))
+        cursor.execute("""UPDATE work_items
+            SET leased_until = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+            WHERE stage = %s AND worker = %s AND state = 'leased';""",
+            (self.lease_seconds, self.stage, self.worker))
+        cursor.execute("""INSERT INTO queue_workers (worker, stage, chunks, rows_in, rows_out)
+            VALUES (%s, %s, 1, %s, %s) ON CONFLICT (worker, stage) DO UPDATE SET
+            chunks = queue_workers.chunks + 1, rows_in = queue_workers.rows_in + EXCLUDED.rows_in,
+            rows_out = queue_workers.rows_out + EXCLUDED.rows_out,
+            seen_at = CURRENT_TIMESTAMP;""", (self.worker, self.stage, len(keys), rows_out))
+
+    def get_stats(self):
+        """:return: dict, number of items per state, i.e. pending, leased,
+                 expired, failed and done"""
+
+        return dict(self.execute("""SELECT CASE WHEN state <> 'leased' THEN state
+            WHEN leased_until >= CURRENT_TIMESTAMP THEN 'leased'
+            WHEN attempts < %s THEN 'expired' ELSE 'failed' END, COUNT(*)
+            FROM work_items WHERE stage = %s GROUP BY 1;""",
+            (self.max_attempts, self.stage), fetch=True))
+
+    def get_workers(self):
+        """:return: array_like, list of dicts with the chunks and rows of every
+                 worker, its throughput in rows per second and the seconds since
+                 it was last seen"""
+
+        rows = self.execute("""SELECT worker, chunks, rows_in, rows_out,
+            EXTRACT(EPOCH FROM seen_at - started_at),
+            EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - seen_at)
+            FROM queue_workers WHERE stage = %s ORDER BY worker;""", (self.stage,), fetch=True)
+        return [{'worker': row[0], 'chunks': row[1], 'rows_in': row[2], 'rows_out': row[3],
+                 'throughput': row[2] / float(row[4]) if row[4] else 0.0,
+                 'idle': float(row[5])} for row in rows]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 10 09:12:44 2020
+
+@author: selin
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.cache import DiskCache
+from src import utils
+
+ARTICLE = '<p>Douglas Noel Adams war ein britischer Schriftsteller.</p>'
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    """Stand-in for a rendered wikipedia-article supporting ETags."""
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ARTICLE.encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class DiskCacheTest (unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_put_get(self):
+        # SETUP
+        tester = DiskCache(self.path)
+        # SUT
+        tester.put('Q42', ARTICLE * 100)
+        # VERIFY
+        self.assertEqual(DiskCache(self.path).get('Q42'), ARTICLE * 100)
+        self.assertIsNone(tester.get('Q1'))
+        self.assertEqual(tester.stats()['hits'], 0)
+        self.assertEqual(tester.stats()['misses'], 1)
+        blobs = [os.path.join(root, f) for root, _, files in os.walk(self.path) 
+                 for f in files if f.endswith('.z')]
+        size = os.path.getsize(blobs[0])
+        self.assertLess(size, len(ARTICLE) * 10)
+
+    def test_content_addressed(self):
+        # SETUP
+        tester = DiskCache(self.path)
+        # SUT
+        tester.put('Q42', ARTICLE)
+        tester.put('Q43', ARTICLE)
+        # VERIFY
+        blobs = [f for _, _, files in os.walk(self.path) for f in files if f.endswith('.z')]
+        self.assertEqual(len(blobs), 1)
+
+    def test_ttl(self):
+        # SETUP
+        tester = DiskCache(self.path, ttl=0.05)
+        tester.put('Q42', ARTICLE)
+        # SUT
+        time.sleep(0.1)
+        # VERIFY
+        self.assertIsNone(tester.get('Q42'))
+        self.assertFalse(tester.lookup('Q42')[2])
+
+    def test_lru_eviction(self):
+        # SETUP
+        tester = DiskCache(self.path, max_bytes=1000)
+        for i in range(50):
+            tester.put('Q%d' % i, os.urandom(100).hex())
+        tester.get('Q0')
+        # SUT
+        tester.evict()
+        # VERIFY
+        self.assertIsNotNone(tester.get('Q0'))
+        self.assertIsNone(tester.get('Q1'))
+        self.assertIsNotNone(tester.get('Q49'))
+
+class GetTextTest (unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ArticleHandler)
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/wiki/Douglas_Adams?action=render' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.path)
+
+    def test_read_through(self):
+        # SETUP
+        tester = DiskCache(self.path)
+        # SUT
+        first = utils.get_text(self.url, tester)
+        second = utils.get_text(self.url, tester)
+        # VERIFY
+        self.assertEqual(first, ARTICLE)
+        self.assertEqual(second, ARTICLE)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_revalidate(self):
+        # SETUP
+        tester = DiskCache(self.path, ttl=0.05)
+        utils.get_text(self.url, tester)
+        time.sleep(0.1)
+        # SUT
+        content = utils.get_text(self.url, tester)
+        # VERIFY
+        self.assertEqual(content, ARTICLE)
+        self.assertEqual(self.server.requests, 2)
+        self.assertTrue(tester.lookup(self.url)[2])
+
+if __name__ == '__main__':
+    unittest.main()
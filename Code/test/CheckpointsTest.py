@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 30 14:07:12 2020
+
+@author: selin
+"""
+import json
+import os
+import psycopg2
+import tempfile
+import unittest
+import src.metrics as metrics
+from src.checkpoints import get_checkpoints
+from src.database import create_tables, drop_tables
+from src.Filler import Filler
+from testconfig import config
+
+class KeyFiller(Filler):
+    """Resumable filler writing a relation for every key; fails at key failing."""
+
+    table = 'p_relation'
+    columns = ('relation_id', 'label')
+    resumable = True
+
+    def __init__(self, failing=None, **kwargs):
+        super().__init__(batch_size=3, **kwargs)
+        self.failing = failing
+
+    def get_rows(self, cursor):
+        yield from ([i] for i in range(1, 11))
+
+    def get_key(self, row):
+        return row[0]
+
+    def get_data(self, row):
+        if row[0] == self.failing:
+            raise ValueError("failing row " + str(row[0]))
+        return [(row[0], 'label ' + str(row[0]))]
+
+    def insert_list(self):
+        pass
+
+def get_labels():
+    connection = psycopg2.connect(**config('testdatabase.ini'))
+    cursor = connection.cursor()
+    cursor.execute("SELECT relation_id FROM p_relation WHERE label LIKE 'label%' ORDER BY 1;")
+    ids = [row[0] for row in cursor.fetchall()]
+    connection.close()
+    return ids
+
+class CheckpointsTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+
+    def test_resume(self):
+        # SETUP
+        self.assertFalse(KeyFiller(failing=7).fill('testdatabase.ini'))
+        self.assertEqual(get_labels(), [1, 2, 3, 4, 5, 6])
+        # SUT
+        result = KeyFiller(resume=True).fill('testdatabase.ini')
+        # VERIFY
+        self.assertTrue(result)
+        self.assertEqual(get_labels(), list(range(1, 11)))
+        self.assertEqual(get_checkpoints('testdatabase.ini')['KeyFiller'],
+                         {'first_key': 1, 'last_key': 10, 'chunks': 4, 'rows': 10, 
+                          'finished': True})
+
+    def test_restart(self):
+        # SETUP
+        KeyFiller(failing=7).fill('testdatabase.ini')
+        # SUT
+        KeyFiller().fill('testdatabase.ini')
+        # VERIFY
+        self.assertEqual(get_checkpoints('testdatabase.ini')['KeyFiller']['rows'], 10)
+        self.assertEqual(get_labels(), list(range(1, 11)))
+
+    def test_stage_metrics(self):
+        # SETUP
+        path = os.path.join(tempfile.mkdtemp(), 'metrics.jsonl')
+        metrics.configure(path)
+        KeyFiller(processes=2).fill('testdatabase.ini')
+        # SUT
+        KeyFiller(processes=2, failing=7).fill('testdatabase.ini')
+        # VERIFY
+        metrics.shutdown()
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        stages = [r for r in records if r['event'] == 'stage' and r['stage'] == 'KeyFiller']
+        self.assertEqual(len(stages), 2)
+        self.assertEqual(stages[0]['rows_in'], 10)
+        # the second run counts its own rows only, it fails writing the third chunk
+        self.assertEqual(stages[1]['rows_in'], 10)
+        self.assertEqual(stages[1]['rows_out'], 6)
+        for record in stages:
+            self.assertLessEqual(record['utilization'], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
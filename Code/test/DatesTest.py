@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 25 14:40:19 2020
+
+@author: selin
+"""
+import dateparser
+import unittest
+import src.dates as dates
+
+class DatesTest (unittest.TestCase):
+
+    def test_format_time(self):
+        # SETUP
+        times = ['+1952-03-11T00:00:00Z', '+2001-05-11T00:00:00Z', '+0800-12-25T00:00:00Z', 
+                 '+1952-03-11T13:45:10Z', '+1952-02-30T00:00:00Z', '+1952-00-00T00:00:00Z',
+                 '+1952-03-00T00:00:00Z', '+13798000000-00-00T00:00:00Z', '11 March 1952']
+        for time in times:
+            date = dateparser.parse(time)
+            expected = ', '.join([date.strftime(f) for f in dates.FORMATS]) if date else None
+            # SUT
+            value = dates.format_time(time)
+            # VERIFY
+            self.assertEqual(value, expected)
+
+    def test_precision(self):
+        # VERIFY
+        self.assertIsNone(dates.format_time('+1952-01-01T00:00:00Z', 9))
+        self.assertIsNone(dates.format_time('-0500-01-01T00:00:00Z'))
+        self.assertEqual(dates.format_time('+1952-03-11T00:00:00Z', 11, ('%d.%m.%Y',)), '11.03.1952')
+
+    def test_stats(self):
+        # SETUP
+        before = dates.get_stats()
+        # SUT
+        for i in range(3):
+            dates.format_time('+1879-03-14T00:00:00Z', 11, ('%Y',))
+        # VERIFY
+        stats = dates.get_stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 2)
+        self.assertEqual(stats['fast'] - before['fast'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
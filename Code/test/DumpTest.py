@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 13 16:20:09 2020
+
+@author: selin
+"""
+import bz2
+import json
+import os
+import psycopg2
+import shutil
+import tempfile
+import unittest
+from src.database import create_tables, drop_tables
+from src.dump import ingest, parse_line, read_dump
+from src.Filler import ObjectFiller, RelationFiller
+from testconfig import config
+
+def entity(item_id, label, claims=None, dewiki=None):
+    data = {'type': 'item', 'id': item_id, 'labels': {'de': {'language': 'de', 'value': label}},
+            'aliases': {}, 'sitelinks': {}, 'claims': claims or {}}
+    if dewiki:
+        data['sitelinks']['dewiki'] = {'site': 'dewiki', 'title': dewiki, 'badges': []}
+    return data
+
+def item_claim(rel, value_id):
+    return {rel: [{'mainsnak': {'snaktype': 'value', 'property': rel, 'datatype': 'wikibase-item',
+                                'datavalue': {'value': {'entity-type': 'item', 'numeric-id': value_id,
+                                                        'id': 'Q%d' % value_id}}}}]}
+
+ENTITIES = [entity('Q42', 'Douglas Adams', item_claim('P31', 5), 'Douglas Adams'),
+            entity('Q5', 'Mensch'),
+            entity('Q1', 'Universum'),
+            dict(entity('P31', 'ist ein'), type='property')]
+
+def write_dump(path):
+    with bz2.open(path, 'wb') as f:
+        f.write(b'[\n')
+        lines = [json.dumps(e).encode() for e in ENTITIES]
+        f.write(b',\n'.join(lines) + b'\n')
+        f.write(b']\n')
+
+class ReadDumpTest (unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.dump = os.path.join(self.path, 'latest-all.json.bz2')
+        write_dump(self.dump)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_filter(self):
+        # SUT
+        lines = list(read_dump(self.dump, {'Q5', 'P31', 'Q404'}))
+        # VERIFY
+        self.assertEqual([l[1] for l in lines], ['Q5', 'P31'])
+        self.assertEqual(parse_line(lines[0][2])['labels']['de']['value'], 'Mensch')
+
+    def test_resume(self):
+        # SETUP
+        first = list(read_dump(self.dump, {'Q42', 'Q5', 'Q1'}))
+        # SUT
+        rest = list(read_dump(self.dump, {'Q42', 'Q5', 'Q1'}, first[0][0]))
+        # VERIFY
+        self.assertEqual(rest, first[1:])
+
+    def test_parse_line(self):
+        # SETUP
+        line = next(read_dump(self.dump, {'Q42'}))[2]
+        # SUT
+        rows = ObjectFiller().parse_line(([42], line))
+        # VERIFY
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][3], 'https://de.wikipedia.org/wiki/Douglas_Adams')
+        self.assertEqual(rows[0][4:7], (31, '?', 5))
+
+class IngestTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+        self.path = tempfile.mkdtemp()
+        self.dump = os.path.join(self.path, 'latest-all.json.bz2')
+        write_dump(self.dump)
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+        shutil.rmtree(self.path)
+
+    def test(self):
+        # SETUP
+        connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = connection.cursor()
+        # SUT
+        ingest([ObjectFiller(seeds=[[42]])], self.dump, 'testdatabase.ini')
+        ingest([ObjectFiller(), RelationFiller()], self.dump, 'testdatabase.ini')
+        # VERIFY
+        cursor.execute("SELECT q_id, label FROM q_item ORDER BY q_id;")
+        self.assertEqual(cursor.fetchall(), [(42, 'Douglas Adams')])
+        cursor.execute("SELECT label FROM p_relation WHERE relation_id = 31;")
+        self.assertEqual(cursor.fetchall(), [('ist ein',)])
+        connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Apr  2 14:22:51 2020
+
+@author: selin
+"""
+import glob
+import os
+import psycopg2
+import pyarrow.parquet as pq
+import tempfile
+import threading
+import time
+import unittest
+from src.database import create_tables, drop_tables
+from src.export import TableExporter, export_tables
+from testconfig import config
+
+def insert_triplets(connection, object_ids):
+    cursor = connection.cursor()
+    cursor.executemany("""INSERT INTO triplets (object_id, relation_id, value_id, context, cindex)
+        VALUES (%s, 19, 0, %s, %s);""", 
+        [(i, 'NOTHING' if i % 5 == 0 else 'context ' + str(i), str(i)) for i in object_ids])
+    connection.commit()
+
+def read(path):
+    return sorted(tuple(row.values()) for row in pq.read_table(path).to_pylist())
+
+class ExportTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+        self.connection = psycopg2.connect(**config('testdatabase.ini'))
+        self.output = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.output.name, 'df-triplets.parquet')
+
+    def tearDown(self):
+        self.connection.close()
+        self.output.cleanup()
+        drop_tables('testdatabase.ini')
+
+    def test_partitions(self):
+        # SETUP
+        insert_triplets(self.connection, range(1, 26))
+        tester = TableExporter('triplets', self.output.name, 'testdatabase.ini', 
+                               partition_size=10, row_group_size=4, compression='snappy')
+        # SUT
+        count = tester.export()
+        # VERIFY
+        self.assertEqual(count, 20)
+        self.assertEqual(sorted(os.listdir(self.path)), 
+                         ['object_range=0', 'object_range=10', 'object_range=20'])
+        metadata = pq.ParquetFile(os.path.join(self.path, 'object_range=10', 
+                                               'part-0.parquet')).metadata
+        self.assertEqual(metadata.num_rows, 8)
+        self.assertTrue(all(metadata.row_group(i).num_rows <= 4 
+                            for i in range(metadata.num_row_groups)))
+        rows = [(i, str(i), 'context ' + str(i)) for i in range(1, 26) if i % 5 != 0]
+        self.assertEqual(read(os.path.join(self.path, 'object_range=0')), 
+                         [r for r in rows if r[0] < 10])
+        self.assertEqual(len(read(self.path)), 20)
+
+    def test_incremental(self):
+        # SETUP
+        insert_triplets(self.connection, range(1, 11))
+        export_tables(self.output.name, incremental=True, config_file='testdatabase.ini', 
+                      partition_size=10)
+        insert_triplets(self.connection, range(11, 16))
+        # SUT
+        counts = export_tables(self.output.name, incremental=True, 
+                               config_file='testdatabase.ini', partition_size=10)
+        # VERIFY
+        self.assertEqual(counts, {'triplets': 4, 'types': 0})
+        self.assertEqual([os.path.relpath(p, self.path) for p in 
+                          sorted(glob.glob(os.path.join(self.path, '*', '*.parquet')))],
+                         ['object_range=0/part-0.parquet', 'object_range=10/part-10.parquet'])
+        self.assertEqual(len(read(self.path)), 12)
+        # a full export replaces the increments
+        self.assertEqual(export_tables(self.output.name, ['triplets'], 
+                                       config_file='testdatabase.ini')['triplets'], 12)
+        self.assertEqual(len(glob.glob(os.path.join(self.path, '*', '*.parquet'))), 1)
+
+    def test_uncommitted(self):
+        # SETUP
+        export_tables(self.output.name, ['triplets'], incremental=True, 
+                      config_file='testdatabase.ini')
+        writer = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = writer.cursor()
+        # takes the lower seq but commits after the later row
+        cursor.execute("""INSERT INTO triplets (object_id, relation_id, value_id, context, cindex)
+            VALUES (1, 19, 0, 'context 1', '1');""")
+        insert_triplets(self.connection, [2])
+        counts = []
+        # SUT
+        thread = threading.Thread(target=lambda: counts.append(export_tables(
+            self.output.name, ['triplets'], incremental=True, 
+            config_file='testdatabase.ini')['triplets']))
+        thread.start()
+        time.sleep(0.5)
+        waiting = thread.is_alive()
+        writer.commit()
+        thread.join()
+        writer.close()
+        # VERIFY
+        self.assertTrue(waiting)
+        self.assertEqual(counts, [2])
+        self.assertEqual(len(read(self.path)), 2)
+
+    def test_single_file(self):
+        # SETUP
+        insert_triplets(self.connection, range(1, 26))
+        tester = TableExporter('triplets', self.output.name, 'testdatabase.ini', 
+                               partition_size=10, compression='gzip', single_file=True)
+        # SUT
+        count = tester.export()
+        # VERIFY
+        path = os.path.join(self.output.name, 'df-triplets.parquet.gzip')
+        self.assertEqual(count, 20)
+        self.assertEqual(read(path), [(i, str(i), 'context ' + str(i)) 
+                                      for i in range(1, 26) if i % 5 != 0])
+        self.assertEqual(pq.ParquetFile(path).metadata.row_group(0).column(0).compression, 
+                         'GZIP')
+        self.assertEqual(tester.export(incremental=True), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar  5 10:02:17 2020
+
+@author: selin
+"""
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from multiprocessing import Pool
+from src.cache import DiskCache
+from src.fetcher import EntityFetcher
+from src.Filler import RelationFiller
+
+ENTITIES = {
+    'Q42': {'id': 'Q42', 'labels': {'de': {'value': 'Douglas Adams'}}},
+    'P19': {'id': 'P19', 'labels': {'de': {'value': 'Geburtsort'}},
+            'aliases': {'de': [{'value': 'geboren in'}]}},
+    'Q5': {'id': 'Q5', 'labels': {'en': {'value': 'human'}}},
+    }
+REDIRECTS = {'Q999': 'Q42'}
+
+class EntityHandler(BaseHTTPRequestHandler):
+    """Stand-in for Special:EntityData serving canned entities."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path.startswith('/w/api.php'):
+                self.send_batch()
+                return
+            item_id = self.path.split('/')[-1].replace('.json', '')
+            item_id = REDIRECTS.get(item_id, item_id)
+            if item_id in server.failures and server.failures[item_id] > 0:
+                server.failures[item_id] -= 1
+                self.send_response(503)
+                self.end_headers()
+                return
+            if item_id not in ENTITIES:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps({'entities': {item_id: ENTITIES[item_id]}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_batch(self):
+        query = parse_qs(urlsplit(self.path).query)
+        entities = {}
+        for item_id in query['ids'][0].split('|'):
+            if item_id in REDIRECTS:
+                target = REDIRECTS[item_id]
+                entities.setdefault(target, dict(ENTITIES[target], 
+                                                 redirects={'from': item_id, 'to': target}))
+            elif item_id in ENTITIES:
+                entities.setdefault(item_id, ENTITIES[item_id])
+            else:
+                entities[item_id] = {'id': item_id, 'missing': ''}
+        body = json.dumps({'entities': entities}).encode()
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(failures=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EntityHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.failures = dict(failures or {})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%d/wiki/Special:EntityData/{}.json' % server.server_port
+    return server, url
+
+def api_url(url):
+    return url.split('/wiki/')[0] + '/w/api.php'
+
+class EntityFetcherTest (unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.url = start_server(failures={'Q5': 2})
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_entities(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, backoff=0.01, rate=None)
+        # SUT
+        entities = tester.get_entities(['Q42', 'P19', 'Q404', 'Q42'])
+        # VERIFY
+        self.assertEqual(sorted(entities), ['P19', 'Q42'])
+        self.assertEqual(entities['Q42']['labels']['de']['value'], 'Douglas Adams')
+
+    def test_retry(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, backoff=0.01, rate=None)
+        # SUT
+        entities = tester.get_entities(['Q5'])
+        # VERIFY
+        self.assertIn('Q5', entities)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_give_up(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, backoff=0.01, rate=None, retries=1)
+        # SUT
+        entities = tester.get_entities(['Q5'])
+        # VERIFY
+        self.assertEqual(entities, {})
+        self.assertEqual(self.server.requests, 2)
+
+    def test_bounded_in_flight(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, max_in_flight=3, rate=None)
+        ids = ['Q42'] + ['Q%d' % i for i in range(1000, 1200)]
+        # SUT
+        entities = tester.get_entities(ids)
+        # VERIFY
+        self.assertEqual(list(entities), ['Q42'])
+        self.assertEqual(self.server.requests, 201)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+
+    def test_rate_limit(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, rate=20.0)
+        ids = ['Q%d' % i for i in range(1000, 1011)]
+        # SUT
+        start_time = time.monotonic()
+        tester.get_entities(ids)
+        seconds = time.monotonic() - start_time
+        # VERIFY
+        self.assertGreaterEqual(seconds, 0.45)
+
+class BatchFetcherTest (unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.url = start_server()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_entities(self):
+        # SETUP
+        tester = EntityFetcher(api_url=api_url(self.url), rate=None)
+        ids = ['Q42', 'P19'] + ['Q%d' % i for i in range(1000, 1118)]
+        # SUT
+        entities = tester.get_entities(ids)
+        # VERIFY
+        self.assertEqual(sorted(entities), ['P19', 'Q42'])
+        self.assertEqual(self.server.requests, 3)
+
+    def test_redirect(self):
+        # SETUP
+        tester = EntityFetcher(api_url=api_url(self.url), rate=None)
+        # SUT
+        entities = tester.get_entities(['Q999', 'Q5'])
+        # VERIFY
+        self.assertEqual(sorted(entities), ['Q5', 'Q999'])
+        self.assertEqual(entities['Q999']['id'], 'Q42')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_redirect_and_target(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, api_url=api_url(self.url), rate=None)
+        for item_ids in (['Q999', 'Q42'], ['Q42', 'Q999']):
+            # SUT
+            entities = tester.get_entities(item_ids)
+            # VERIFY
+            self.assertEqual(sorted(entities), ['Q42', 'Q999'])
+            self.assertEqual(entities['Q999']['id'], 'Q42')
+        # the redirect left out of the second response is requested on its own
+        self.assertEqual(self.server.requests, 3)
+
+    def test_cache(self):
+        # SETUP
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        tester = EntityFetcher(api_url=api_url(self.url), rate=None, 
+                               cache=DiskCache(path))
+        tester.get_entities(['Q42', 'Q404'])
+        # SUT
+        entities = tester.get_entities(['Q42', 'P19'])
+        # VERIFY
+        self.assertEqual(sorted(entities), ['P19', 'Q42'])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_entity_data_redirect(self):
+        # SETUP
+        tester = EntityFetcher(url=self.url, batch_size=1, rate=None)
+        # SUT
+        entities = tester.get_entities(['Q999'])
+        # VERIFY
+        self.assertEqual(entities['Q999']['id'], 'Q42')
+
+class EntityFillerTest (unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.url = start_server()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_process_chunk(self):
+        # SETUP
+        tester = RelationFiller(fetcher=EntityFetcher(url=self.url, batch_size=1, rate=None))
+        # SUT
+        with Pool(2) as pool:
+            result = sorted(tester.process_chunk(pool, [(19,), (404,)]))
+        # VERIFY
+        self.assertEqual(result, [[(19, 'Geburtsort, in\\b.*geboren')],
+                                  [(404, 'INVALID')]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,10 +6,13 @@ Created on Tue Feb 25 09:58:35 2020
 @author: selin
 """
 import locale
+import os
 import psycopg2
 import unittest
+import src.utils as utils
 from src.database import create_tables, drop_tables
 from src.Filler import (ObjectFiller, RelationFiller, TripletFiller, ObjectTypeFiller)
+from multiprocessing import Pool
 from testconfig import config
         
 def join_table_values():
@@ -232,6 +235,31 @@ class TripletFillerTest (unittest.TestCase):
     def tearDown(self):
         drop_tables('testdatabase.ini')
         
+class PidFiller(TripletFiller):
+    """TripletFiller recording the process extracting an article."""
+
+    def get_content(self, row):
+        return 'Text'
+
+    def extract(self, row, content):
+        return [(row[0], os.getpid())]
+
+class TripletFillerPoolTest (unittest.TestCase):
+
+    def test_default(self):
+        # SETUP
+        tester = PidFiller()
+        rows = [(i, 'alias', 'url', []) for i in range(4)]
+        # SUT
+        with Pool(2) as pool:
+            results = list(tester.process_chunk(pool, rows))
+        # VERIFY
+        self.assertFalse(tester.pipe)
+        self.assertEqual(sorted(r[0][0] for r in results), [0, 1, 2, 3])
+        self.assertNotIn(os.getpid(), [r[0][1] for r in results])
+        self.assertTrue(PidFiller(n_process=4).pipe)
+        self.assertFalse(PidFiller(n_process=4, lazy=True).pipe)
+
 class ObjectTypeFillerTest (unittest.TestCase):
     def setUp(self):
         create_tables('testdatabase.ini')
@@ -256,6 +284,68 @@ class ObjectTypeFillerTest (unittest.TestCase):
         
         self.assertEqual(ot, 81)
 
+class GetRowsTest (unittest.TestCase):
+    
+    def setUp(self):
+        create_tables('testdatabase.ini')
+        self.connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = self.connection.cursor()
+        rows = [(1, 31, 'Mensch', 5), (1, 279, 'Lebewesen', 7), (2, 279, 'Lebewesen', 7),
+                (3, 31, '8', 8), (3, 17, 'Schweiz', 39)]
+        cursor.executemany("""INSERT INTO q_item (q_id, label, url, relation_id, 
+            relation_label, value_id, value, value_text, has_context) 
+            VALUES (%s, 'label', '', %s, '?', %s, %s, '?', 0);""", 
+            [(q, r, i, v) for q, r, v, i in rows])
+        self.connection.commit()
+    
+    def tearDown(self):
+        self.connection.close()
+        drop_tables('testdatabase.ini')
+    
+    def test_server_side_cursor(self):
+        # SETUP
+        cursor = self.connection.cursor(name='get_rows')
+        cursor.itersize = 1
+        # SUT
+        rows = ObjectFiller().get_rows(cursor)
+        # VERIFY
+        self.assertEqual(sorted(utils.get_chunks(rows, 2)), [[(5,), (7,)], [(8,), (39,)]])
+    
+    def test_object_types(self):
+        # SETUP
+        tester = ObjectTypeFiller()
+        cursor = self.connection.cursor()
+        tester.create_staging(cursor)
+        # SUT
+        rows = list(tester.get_rows(cursor))
+        tester.write_chunk(self.connection, cursor, 
+                           [tester.get_entity_data(row, {'labels': {'de': {'value': 'Tier'}}}) 
+                            for row in rows])
+        tester.finish(cursor)
+        # VERIFY
+        self.assertEqual(rows, [(8,)])
+        cursor.execute("SELECT object_id, type, type_id, label FROM types;")
+        self.assertEqual(sorted(cursor.fetchall()), [(1, 'Mensch', 5, 'label'), 
+                         (2, 'Lebewesen', 7, 'label'), (3, 'Tier', 8, 'label')])
+        self.assertEqual(list(tester.get_rows(cursor)), [])
+    
+    def test_crawled_object_types(self):
+        # SETUP
+        cursor = self.connection.cursor()
+        cursor.execute("""INSERT INTO q_item (q_id, label, url, relation_id, relation_label, 
+            value_id, value, value_text, has_context) 
+            VALUES (8, 'Saeugetier', '', 17, '?', 39, '39', '?', 0);""")
+        tester = ObjectTypeFiller()
+        # SUT
+        rows = list(tester.get_rows(cursor))
+        tester.finish(cursor)
+        # VERIFY
+        self.assertEqual(rows, [])
+        cursor.execute("SELECT type_id, label FROM type_labels;")
+        self.assertEqual(cursor.fetchall(), [(8, 'Saeugetier')])
+        cursor.execute("SELECT type FROM types WHERE object_id = 3;")
+        self.assertEqual(cursor.fetchall(), [('Saeugetier',)])
+
 class TestDataGenerator (unittest.TestCase):  
     
     def setUp(self):
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 27 14:26:53 2020
+
+@author: selin
+"""
+import psycopg2
+import unittest
+from src.database import create_tables, drop_tables, execute_sql
+from src.frontier import Frontier
+
+# 42 refers to 5 and 7, 5 to 9, 7 to 9, 11 and 15, 9 and 11 to 13
+LINKS = ((42, 5), (42, 7), (5, 9), (7, 9), (7, 11), (7, 15), (9, 13), (11, 13))
+
+def fill_objects(ids):
+    """Insert the objects of a batch like ObjectFiller."""
+    execute_sql('testdatabase.ini', tuple(
+        """INSERT INTO q_item (q_id, label, aliases, url, relation_id, relation_label,
+        value_id, value, value_text, value_type, has_context) VALUES
+        (%d, 'x', 'x', '', 1, '?', %d, '%d', '?', '?', 0);""" % (q, v, v)
+        for q, v in LINKS if q in ids))
+
+def crawl(frontier, size):
+    order = []
+    batch = frontier.claim(size)
+    while batch:
+        order.append([row[0] for row in batch])
+        fill_objects(order[-1])
+        frontier.expand(batch)
+        batch = frontier.claim(size)
+    return order
+
+class FrontierTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+
+    def test_breadth(self):
+        # SETUP
+        tester = Frontier('testdatabase.ini')
+        tester.seed([[42]])
+        # SUT
+        order = crawl(tester, 2)
+        # VERIFY
+        self.assertEqual(order, [[42], [5, 7], [9, 11], [13, 15]])
+        self.assertEqual(tester.get_stats(), {'done': 7})
+
+    def test_budgets(self):
+        # SETUP
+        tester = Frontier('testdatabase.ini', max_depth=1)
+        tester.seed([[42]])
+        # VERIFY
+        self.assertEqual(crawl(tester, 10), [[42], [5, 7]])
+        drop_tables('testdatabase.ini')
+        create_tables('testdatabase.ini')
+        tester = Frontier('testdatabase.ini', max_items=4)
+        tester.seed([[42]])
+        # 9 is referred by two objects, 11 by one only
+        self.assertEqual(crawl(tester, 10), [[42], [5, 7], [9]])
+
+    def test_degree(self):
+        # SETUP
+        tester = Frontier('testdatabase.ini', policy='degree')
+        tester.seed([[42]])
+        # SUT
+        order = crawl(tester, 1)
+        # VERIFY
+        self.assertEqual(order, [[42], [5], [7], [9], [11], [13], [15]])
+        drop_tables('testdatabase.ini')
+        create_tables('testdatabase.ini')
+        tester = Frontier('testdatabase.ini')
+        tester.seed([[42]])
+        self.assertEqual(crawl(tester, 1), [[42], [5], [7], [9], [11], [15], [13]])
+
+    def test_reset(self):
+        # SETUP
+        tester = Frontier('testdatabase.ini')
+        tester.seed([[42], [5]])
+        tester.claim(1)
+        # SUT
+        tester.reset()
+        # VERIFY
+        self.assertEqual(tester.claim(5), [(5,), (42,)])
+
+    def test_error(self):
+        # SETUP
+        tester = Frontier('testdatabase.ini')
+        tester.seed([[42]])
+        execute_sql('testdatabase.ini', ("ALTER TABLE frontier RENAME TO frontier_moved;",))
+        # SUT
+        with self.assertRaises(psycopg2.DatabaseError):
+            tester.claim(1)
+        # VERIFY
+        execute_sql('testdatabase.ini', ("ALTER TABLE frontier_moved RENAME TO frontier;",))
+        self.assertEqual(tester.claim(1), [(42,)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 24 15:03:49 2020
+
+@author: selin
+"""
+import re
+import unittest
+from bs4 import BeautifulSoup
+from src.html_text import normalize, paragraph_text, paragraphs
+
+HTML = ('<p>Douglas <b>Adams</b> &amp; &#150;<script>var p = "<p>x</p>";</script>\n'
+        '<div><p>unclosed <i>nested</div>\n  \n<p class="a"><p>inner</p>outer</p>'
+        '<table><tr><td><p>in; der |Tabelle<!-- c --> [1]</td></tr></table>'
+        '<p>Name ( Aussprache ?/i) geboren "1952"</p>  <P>gross</P>')
+
+def old_normalize(content):
+    """Pre-processing as done before."""
+    content = content.replace(";", ",")
+    content = content.replace(" |", ",")
+    content = re.sub(r"(\s+|\n)", " ", content)
+    return re.sub(r"[\'`\"']|(\[[^]]*\])|(,,)|(\( .*\?\/i\)\s)", "",content)
+
+class HtmlTextTest (unittest.TestCase):
+
+    def test_paragraph_text(self):
+        # SETUP
+        expected = ''.join(p.text for p in BeautifulSoup(HTML, 'html.parser').select('p'))
+        # SUT
+        text = paragraph_text(HTML)
+        # VERIFY
+        self.assertEqual(text, expected)
+        for chunk_size in (1, 7, 64):
+            self.assertEqual(''.join(paragraphs(HTML, chunk_size)), expected)
+
+    def test_normalize(self):
+        # SETUP
+        text = paragraph_text(HTML)
+        # VERIFY
+        self.assertEqual(normalize(text), old_normalize(text))
+        self.assertEqual(normalize(text.replace('?/i)', '')), old_normalize(text.replace('?/i)', '')))
+        self.assertEqual(normalize('\n a;  b |c\t'), ' a, b,c ')
+        self.assertEqual(normalize(''), '')
+
+if __name__ == '__main__':
+    unittest.main()
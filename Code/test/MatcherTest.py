@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Mar 20 15:32:08 2020
+
+@author: selin
+"""
+import re
+import spacy
+import unittest
+from src.matcher import AliasMatcher, LazyWindows, MatchIndex, SentenceWindows
+
+TEXT = ("Douglas Noel Adams war ein britischer Schriftsteller. Er wurde in Cambridge "
+        "geboren. Adams starb am 11. Mai 2001. Die Familie Adams lebte in London. "
+        "Sein Werk umfasst Romane.Adams schrieb auch Hoerspiele. Ende.")
+
+def get_windows(text=TEXT):
+    nlp = spacy.blank('de')
+    nlp.add_pipe('sentencizer')
+    return SentenceWindows(list(nlp(text).sents))
+
+def find_all(windows, aliases):
+    """The search as done before: every alias in every window."""
+    s = windows.sentences
+    return [(i, a) for i in range(1, len(s) - 1) for a in aliases
+            if re.findall(r'\b%s\b' % a, s[i-1].text + ' ' + s[i].text + ' ' + s[i+1].text)]
+
+class SentenceWindowsTest (unittest.TestCase):
+
+    def test_window(self):
+        # SETUP
+        windows = get_windows()
+        s = windows.sentences
+        # SUT
+        texts = [windows.window(i) for i in windows.indexes()]
+        # VERIFY
+        self.assertEqual(texts, [s[i-1].text + ' ' + s[i].text + ' ' + s[i+1].text
+                                 for i in range(1, len(s) - 1)])
+        self.assertEqual(windows.context(1), ' ||| '.join(t.text for t in s[:3]))
+        self.assertEqual(windows.position(s[2]), 2)
+
+class LazyWindowsTest (unittest.TestCase):
+
+    def test_annotation(self):
+        # SETUP
+        nlp = spacy.blank('de')
+        parsed = []
+        windows = get_windows()
+        tester = LazyWindows(windows.sentences, lambda text: parsed.append(text) or nlp(text))
+        # SUT
+        tags = tester.annotation(2, 'text')
+        # VERIFY
+        self.assertEqual(tags, windows.annotation(2, 'text'))
+        self.assertEqual(parsed, [s.text for s in windows.sentences[1:4]])
+        self.assertEqual(tester.window(2), windows.window(2))
+
+class AliasMatcherTest (unittest.TestCase):
+
+    def test_find(self):
+        # SETUP
+        windows = get_windows()
+        for aliases in (['Adams', 'Douglas Adams'], ['Douglas Noel Adams', 'Familie Adams'],
+                        ['Adams|Cambridge', 'Adams'], ['Romane\\.Adams'], ['^Douglas', ''],
+                        ['(?:Adams)+'], ['Sch']):
+            # SUT
+            hits = AliasMatcher(aliases).find(windows)
+            # VERIFY
+            self.assertEqual(hits, find_all(windows, aliases))
+
+    def test_prefilter(self):
+        # VERIFY
+        self.assertIsNotNone(AliasMatcher(['Adams', 'J\\. R\\.']).prefilter())
+        self.assertIsNone(AliasMatcher(['Adams', '^Douglas']).prefilter())
+        self.assertIsNone(AliasMatcher(['(a)\\1']).prefilter())
+
+    def test_invalid_alias(self):
+        # SETUP
+        tester = AliasMatcher(['Adams', 'Ad(ams'])
+        # VERIFY
+        self.assertRaises(re.error, tester.find, get_windows())
+        self.assertEqual(tester.find(get_windows("Adams. Ende.")), [])
+
+class MatchIndexTest (unittest.TestCase):
+
+    def test_add(self):
+        # SETUP
+        tester = MatchIndex()
+        # SUT
+        added = [tester.add(i, key) for i, key in ((2, 'Adams'), (1, 'Adams'), (2, 'DNA'),
+                                                    (2, 'Adams'), (1, ('Adams', 'geboren')))]
+        # VERIFY
+        self.assertEqual(added, [True, True, True, False, True])
+        self.assertEqual(list(tester), [(2, 'Adams'), (1, 'Adams'), (2, 'DNA'),
+                                        (1, ('Adams', 'geboren'))])
+        self.assertIn((2, 'DNA'), tester)
+        self.assertNotIn((1, 'DNA'), tester)
+        self.assertNotIn((1, 'Douglas'), tester)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Mar 31 15:48:09 2020
+
+@author: selin
+"""
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+import src.metrics as metrics
+from multiprocessing import Pool
+
+def square(x):
+    metrics.observe('test_seconds', 0.02, stage='test')
+    return x * x
+
+class MetricsTest (unittest.TestCase):
+
+    def test_registry(self):
+        # SETUP
+        tester = metrics.Registry()
+        # SUT
+        tester.inc('rows_total', 3, stage='a')
+        tester.inc('rows_total', 2, stage='a')
+        tester.observe('request_seconds', 0.3, host='x')
+        tester.observe('request_seconds', 100, host='x')
+        # VERIFY
+        text = tester.to_prometheus()
+        self.assertIn('rows_total{stage="a"} 5.0', text)
+        self.assertIn('request_seconds_bucket{host="x",le="0.25"} 0', text)
+        self.assertIn('request_seconds_bucket{host="x",le="0.5"} 1', text)
+        self.assertIn('request_seconds_bucket{host="x",le="+Inf"} 2', text)
+        self.assertIn('request_seconds_count{host="x"} 2', text)
+        self.assertEqual(tester.total('request_seconds', host='x'), 100.3)
+
+    def test_workers(self):
+        # SETUP
+        registry = metrics.get_registry()
+        before = registry.total('test_seconds', stage='test')
+        # SUT
+        with Pool(2) as pool:
+            results = list(metrics.merged(pool.imap(metrics.Task(square, 'test'), range(5))))
+        # VERIFY
+        self.assertEqual(results, [0, 1, 4, 9, 16])
+        self.assertAlmostEqual(registry.total('test_seconds', stage='test') - before, 0.1)
+        self.assertGreater(registry.total('pipeline_worker_busy_seconds_total', stage='test'), 0)
+
+    def test_exports(self):
+        # SETUP
+        path = os.path.join(tempfile.mkdtemp(), 'metrics.jsonl')
+        metrics.configure(path, 0)
+        metrics.inc('pipeline_rows_in_total', 7, stage='export')
+        # SUT
+        port = metrics._server.server_port
+        with urllib.request.urlopen('http://127.0.0.1:%d/metrics' % port) as response:
+            text = response.read().decode('utf-8')
+        metrics.record('chunk', stage='export', rows_in=7)
+        metrics.shutdown()
+        # VERIFY
+        self.assertIn('pipeline_rows_in_total{stage="export"} 7.0', text)
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['event'] for r in records], ['chunk', 'summary'])
+        self.assertIn({'stage': 'export', 'value': 7}, records[1]['metrics']['pipeline_rows_in_total'])
+
+if __name__ == '__main__':
+    unittest.main()
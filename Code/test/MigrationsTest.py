@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Mar 18 16:41:52 2020
+
+@author: selin
+"""
+import psycopg2
+import unittest
+from src.database import create_tables, drop_tables, execute_sql
+from src.migrations import MIGRATIONS, migrate, report
+from testconfig import config
+
+# schema of databases created before the migrations were introduced
+LEGACY_TABLES = (
+    """CREATE TABLE p_relation (relation_id INTEGER PRIMARY KEY, label TEXT NOT NULL);""",
+    """CREATE TABLE q_item (q_id INTEGER, label VARCHAR(255) NOT NULL, aliases TEXT,
+        url VARCHAR(255) NOT NULL, relation_id INTEGER, relation_label TEXT,
+        value_id INTEGER, value VARCHAR(255) NOT NULL, value_text TEXT NOT NULL,
+        object_type VARCHAR(255), value_type VARCHAR(255), has_context INTEGER NOT NULL,
+        PRIMARY KEY (q_id, relation_id, value));""",
+    """CREATE TABLE triplets (object_id INTEGER NOT NULL, object VARCHAR(255),
+        relation_id INTEGER NOT NULL, relation VARCHAR(255), value_id INTEGER NOT NULL,
+        value VARCHAR(255), object_type VARCHAR(255), value_type VARCHAR(255),
+        context TEXT, pos_tags TEXT, dependencies TEXT, cindex VARCHAR(255) PRIMARY KEY);""",
+    """CREATE TABLE types (object_id INTEGER NOT NULL, label VARCHAR(255),
+        type_id INTEGER NOT NULL, type VARCHAR(255), PRIMARY KEY(object_id, type_id));""",
+    """INSERT INTO q_item VALUES (42, 'Douglas Adams', '', '', 31, '?', 5, '?', '?',
+        NULL, NULL, 0);""")
+
+def get_indexes(cursor):
+    cursor.execute("""SELECT indexname FROM pg_indexes WHERE schemaname = 'public'
+        AND indexname NOT LIKE '%pkey' AND indexname NOT LIKE '%key';""")
+    return {row[0] for row in cursor.fetchall()}
+
+class MigrationsTest (unittest.TestCase):
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+
+    def test_create_tables(self):
+        # SUT
+        create_tables('testdatabase.ini')
+        # VERIFY
+        connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = connection.cursor()
+        cursor.execute("SELECT MAX(version) FROM schema_migrations;")
+        self.assertEqual(cursor.fetchone()[0], MIGRATIONS[-1][0])
+        self.assertIn('q_item_open_context', get_indexes(cursor))
+        connection.close()
+
+    def test_upgrade_in_place(self):
+        # SETUP
+        execute_sql('testdatabase.ini', LEGACY_TABLES)
+        # SUT
+        version = migrate('testdatabase.ini')
+        # VERIFY
+        self.assertEqual(version, MIGRATIONS[-1][0])
+        self.assertEqual(migrate('testdatabase.ini'), version)
+        connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = connection.cursor()
+        cursor.execute("SELECT q_id, seq FROM q_item;")
+        self.assertEqual(cursor.fetchall(), [(42, 1)])
+        cursor.execute("SELECT count(*) FROM pipeline_state;")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(get_indexes(cursor),
+                         {'q_item_value_id', 'q_item_value', 'q_item_open_value', 'q_item_seq',
+                          'q_item_relation_id', 'q_item_object_type', 'q_item_open_context',
+                          'triplets_object_relation_value', 'frontier_pending',
+                          'triplets_seq', 'types_seq', 'work_items_open'})
+        connection.close()
+
+    def test_report(self):
+        # SETUP
+        create_tables('testdatabase.ini')
+        # SUT
+        result = report('testdatabase.ini', analyze=True)
+        # VERIFY
+        self.assertIn('q_item_open_context', result)
+        self.assertIn('-- clean_up_triplets', result)
+        self.assertIn('-- WorkQueue.claim', result)
+        self.assertIn('Execution Time', result)
+
+if __name__ == '__main__':
+    unittest.main()
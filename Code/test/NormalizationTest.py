@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Mar 26 13:17:05 2020
+
+@author: selin
+"""
+import random
+import re
+import unidecode
+import unittest
+import src.normalization as normalization
+
+ALPHABET = ['a', 'B', ' ', '(', ')', '.', '+', '*', '[', ']', ',', '/', '\\', '...', 
+            '.*', 'ä', 'ß', 'é', '–', '中', '†', '\n']
+
+def get_texts(n=2000):
+    rng = random.Random(0)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 20))) for _ in range(n)]
+
+def old_escape(value):
+    """Escaping as done before in ObjectFiller."""
+    value = re.sub(r"\(", "\\(", value)
+    value = re.sub(r"\)", "\\)", value)
+    value = re.sub(r"\.", "\\.", value)
+    value = re.sub(r"\+", "\\+", value)
+    value = re.sub(r"\*", "\\*", value)
+    return value
+
+def old_relation_pattern(label):
+    """Normalization as done before in RelationFiller."""
+    label = label.replace('/', ', ')
+    label = unidecode.unidecode(label)
+    label = re.sub(r"\(.+?\)", "", label)
+    label = re.sub(r" \.\.\.", "", label)
+    label = re.sub(r"\s?\[.+?\]\s?,?", "", label)
+    label = re.sub(r"\+", "\\+", label)
+    label = re.sub(r"\*", "\\*", label)
+    label = re.sub(r"\.", "\\.", label)
+    label = re.sub(r"\\\.\\\*", ".*", label)
+    return label
+
+class NormalizationTest (unittest.TestCase):
+
+    def test_transliterate(self):
+        # SETUP
+        texts = get_texts() + ['Schröder' * 100]
+        # VERIFY
+        for text in texts:
+            self.assertEqual(normalization.transliterate(text), unidecode.unidecode(text))
+
+    def test_escape(self):
+        # VERIFY
+        for text in get_texts():
+            self.assertEqual(normalization.escape(text), old_escape(text))
+        self.assertEqual(normalization.escape('J. R. R. (Tolkien)'), 'J\\. R\\. R\\. \\(Tolkien\\)')
+
+    def test_relation_pattern(self):
+        # SETUP
+        texts = get_texts() + ['Geburtsort, Ort\\b.*geboren, geb. (Ort) ...', 'Lage [1], Position/Ort']
+        # VERIFY
+        for text in texts:
+            self.assertEqual(normalization.relation_pattern(text), old_relation_pattern(text))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Apr  6 14:52:17 2020
+
+@author: selin
+"""
+import asyncio
+import psycopg2
+import unittest
+import src.metrics as metrics
+from src.checkpoints import get_checkpoints
+from src.database import create_tables, drop_tables
+from src.Filler import Filler
+from testconfig import config
+
+class StreamFiller(Filler):
+    """Resumable streaming filler writing a relation for every key; the labels 
+    are fetched by a coroutine and parsed in the pool, fails at key failing."""
+
+    table = 'p_relation'
+    columns = ('relation_id', 'label')
+    resumable = True
+
+    def __init__(self, failing=None, **kwargs):
+        super().__init__(batch_size=3, streaming=True, buffer_size=1, **kwargs)
+        self.failing = failing
+
+    def get_rows(self, cursor):
+        yield from ([i] for i in range(101, 111))
+
+    def get_key(self, row):
+        return row[0]
+
+    async def fetch_chunk(self, chunk):
+        await asyncio.sleep(0.01)
+        return [(row[0], 'label ' + str(row[0])) for row in chunk]
+
+    def get_data(self, item):
+        if item[0] == self.failing:
+            raise ValueError("failing row " + str(item[0]))
+        return [item]
+
+    def insert_list(self):
+        pass
+
+def get_labels():
+    connection = psycopg2.connect(**config('testdatabase.ini'))
+    cursor = connection.cursor()
+    cursor.execute("SELECT relation_id FROM p_relation WHERE label LIKE 'label%' ORDER BY 1;")
+    ids = [row[0] for row in cursor.fetchall()]
+    connection.close()
+    return ids
+
+class StreamingTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+
+    def test_fill(self):
+        # SETUP
+        registry = metrics.get_registry()
+        before = registry.total('pipeline_rows_out_total', stage='StreamFiller')
+        # SUT
+        result = StreamFiller().fill('testdatabase.ini')
+        # VERIFY
+        self.assertTrue(result)
+        self.assertEqual(get_labels(), list(range(101, 111)))
+        self.assertEqual(get_checkpoints('testdatabase.ini')['StreamFiller'],
+                         {'first_key': 101, 'last_key': 110, 'chunks': 4, 'rows': 10, 
+                          'finished': True})
+        self.assertEqual(registry.total('pipeline_rows_out_total', stage='StreamFiller') - 
+                         before, 10)
+        self.assertGreater(registry.total('pipeline_queue_wait_seconds', 
+                                          stage='StreamFiller', queue='write', side='get'), 0)
+
+    def test_failing(self):
+        # SUT
+        result = StreamFiller(failing=107).fill('testdatabase.ini')
+        # VERIFY
+        self.assertFalse(result)
+        self.assertEqual(get_labels(), list(range(101, 107)))
+        self.assertEqual(get_checkpoints('testdatabase.ini')['StreamFiller']['last_key'], 106)
+        self.assertTrue(StreamFiller(resume=True).fill('testdatabase.ini'))
+        self.assertEqual(get_labels(), list(range(101, 111)))
+
+if __name__ == '__main__':
+    unittest.main()
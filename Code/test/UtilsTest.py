@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Apr  1 10:26:14 2020
+
+@author: selin
+"""
+import copy
+import random
+import unittest
+import src.utils as utils
+
+def get_rows(rng, n, ids):
+    return [(rng.randrange(ids), 'alias', 'url', [str(rng.randrange(100))
+             for _ in range(rng.randint(0, 3))]) for _ in range(n)]
+
+def old_merge_rows(l1, l2):
+    """Merging as done before with a nested loop."""
+    long_list = l2 if len(l2) > len(l1) else l1
+    short_list = l1 if len(l2) > len(l1) else l2
+    for x in short_list:
+        is_contained = False
+        for y in long_list:
+            if x[0] == y[0]:
+                is_contained = True
+                for arr in x[3]:
+                    y[3].append(arr)
+                break
+        if not is_contained:
+            long_list.append(x)
+    return long_list
+
+class MergeRowsTest (unittest.TestCase):
+
+    def test_merge_rows(self):
+        # SETUP
+        rng = random.Random(0)
+        for _ in range(200):
+            l1 = get_rows(rng, rng.randint(0, 30), 20)
+            l2 = get_rows(rng, rng.randint(0, 30), 20)
+            expected = old_merge_rows(copy.deepcopy(l1), copy.deepcopy(l2))
+            # SUT
+            result = utils.merge_rows(l1, l2)
+            # VERIFY
+            self.assertEqual(result, expected)
+
+    def test_copy(self):
+        # SETUP
+        l1 = [(5, 'a', 'u', ['x']), (7, 'b', 'u', ['y'])]
+        l2 = [(7, 'b', 'u', ['z']), (9, 'c', 'u', ['w']), (9, 'c', 'u', ['v'])]
+        before = copy.deepcopy((l1, l2))
+        # SUT
+        result = utils.merge_rows(l1, l2, copy=True)
+        # VERIFY
+        self.assertEqual(result, [(7, 'b', 'u', ['z', 'y']), (9, 'c', 'u', ['w']), 
+                                  (9, 'c', 'u', ['v']), (5, 'a', 'u', ['x'])])
+        self.assertEqual((l1, l2), before)
+
+class ResolveEntitiesTest (unittest.TestCase):
+
+    def test_redirect_and_target(self):
+        # SETUP
+        entity = {'id': 'Q1', 'redirects': {'from': 'Q1-redirect', 'to': 'Q1'}}
+        entities = {'Q1': entity, 'Q2': {'id': 'Q2', 'missing': ''}}
+        # SUT
+        result = utils.resolve_entities(['Q1', 'Q1-redirect', 'Q2'], entities)
+        # VERIFY
+        self.assertEqual(result, {'Q1': entity, 'Q1-redirect': entity})
+
+if __name__ == '__main__':
+    unittest.main()
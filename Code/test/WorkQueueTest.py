@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Apr  3 16:40:27 2020
+
+@author: selin
+"""
+import psycopg2
+import time
+import unittest
+from multiprocessing import Process
+from src.database import create_tables, drop_tables
+from src.Filler import Filler
+from src.work_queue import WorkQueue
+from testconfig import config
+
+class QueueFiller(Filler):
+    """Filler writing a relation for every key from 101 to 130."""
+
+    table = 'p_relation'
+    columns = ('relation_id', 'label')
+
+    def get_rows(self, cursor, keys=None):
+        yield from ([i] for i in (keys if keys is not None else range(101, 131)))
+
+    def get_key(self, row):
+        return row[0]
+
+    def get_data(self, row):
+        return [(row[0], 'label ' + str(row[0]))]
+
+    def insert_list(self):
+        pass
+
+def work(name):
+    queue = WorkQueue('QueueFiller', 'testdatabase.ini', worker=name)
+    QueueFiller(processes=1, batch_size=2, queue=queue).fill('testdatabase.ini')
+
+class WorkQueueTest (unittest.TestCase):
+
+    def setUp(self):
+        create_tables('testdatabase.ini')
+
+    def tearDown(self):
+        drop_tables('testdatabase.ini')
+
+    def test_workers(self):
+        # SETUP
+        queue = WorkQueue('QueueFiller', 'testdatabase.ini')
+        self.assertEqual(queue.enqueue(QueueFiller()), 30)
+        workers = [Process(target=work, args=('worker ' + str(i),)) for i in range(3)]
+        # SUT
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # VERIFY
+        connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = connection.cursor()
+        cursor.execute("SELECT relation_id FROM p_relation WHERE label LIKE 'label%' ORDER BY 1;")
+        ids = [row[0] for row in cursor.fetchall()]
+        connection.close()
+        self.assertEqual(ids, list(range(101, 131)))
+        self.assertEqual(queue.get_stats(), {'done': 30})
+        stats = queue.get_workers()
+        self.assertEqual(sum(worker['rows_in'] for worker in stats), 30)
+        self.assertEqual(sum(worker['rows_out'] for worker in stats), 30)
+
+    def test_lease_expiry(self):
+        # SETUP
+        first = WorkQueue('QueueFiller', 'testdatabase.ini', lease_seconds=-1, 
+                          max_attempts=2, worker='first')
+        second = WorkQueue('QueueFiller', 'testdatabase.ini', lease_seconds=-1, 
+                           max_attempts=2, worker='second')
+        first.enqueue(QueueFiller())
+        # SUT
+        claimed = first.claim(5)
+        reclaimed = second.claim(5)
+        # VERIFY
+        self.assertEqual(claimed, [101, 102, 103, 104, 105])
+        self.assertEqual(reclaimed, [101, 102, 103, 104, 105])
+        self.assertEqual(first.claim(5), [106, 107, 108, 109, 110])
+        self.assertEqual(second.get_stats(), {'failed': 5, 'expired': 5, 'pending': 20})
+
+    def test_renewal(self):
+        # SETUP
+        first = WorkQueue('QueueFiller', 'testdatabase.ini', lease_seconds=1, worker='first')
+        second = WorkQueue('QueueFiller', 'testdatabase.ini', worker='second')
+        first.enqueue(QueueFiller())
+        first.claim(30)
+        # SUT
+        first.start_renewal()
+        time.sleep(1.5)
+        reclaimed = second.claim(30)
+        first.stop_renewal()
+        # VERIFY
+        self.assertEqual(reclaimed, [])
+        self.assertEqual(second.get_stats(), {'leased': 30})
+
+    def test_error(self):
+        # SETUP
+        queue = WorkQueue('QueueFiller', 'testdatabase.ini')
+        queue.enqueue(QueueFiller())
+        connection = psycopg2.connect(**config('testdatabase.ini'))
+        cursor = connection.cursor()
+        cursor.execute("ALTER TABLE work_items RENAME TO work_items_moved;")
+        connection.commit()
+        # SUT
+        result = QueueFiller(processes=1, queue=queue).fill('testdatabase.ini')
+        # VERIFY
+        cursor.execute("ALTER TABLE work_items_moved RENAME TO work_items;")
+        connection.commit()
+        connection.close()
+        self.assertFalse(result)
+        with self.assertRaises(psycopg2.DatabaseError):
+            queue.execute("SELECT * FROM work_items_moved;")
+
+if __name__ == '__main__':
+    unittest.main()